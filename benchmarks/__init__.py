@@ -0,0 +1,6 @@
+"""
+Benchmarks of the game systems, run them from the root of the project, for example:
+    python -m benchmarks.maze_generation
+All the scenarios together (with json output to compare commits) are run by:
+    python -m benchmarks.suite --json results.json
+"""
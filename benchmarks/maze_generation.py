@@ -0,0 +1,44 @@
+"""
+Compares the maze generation algorithms.
+The original algorithm (RANDOM_RETRY) also creates the doors of the rooms while generating, so it is compared
+with FRONTIER both with the rooms built and with only the grid data
+"""
+import argparse
+import sys
+import time
+
+from maze import Maze, MazeAlgorithm
+
+DEFAULT_SIZES = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+RANDOM_RETRY_MAX_SIZE = 5_000  # the original algorithm is quadratic, bigger mazes take minutes
+
+
+def time_maze(maze_size: int, seed: int, algorithm: MazeAlgorithm, build_rooms: bool) -> float:
+    start = time.perf_counter()
+    Maze(maze_size, seed, algorithm, build_rooms)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--random-retry-max-size", type=int, default=RANDOM_RETRY_MAX_SIZE)
+    args = parser.parse_args()
+
+    print(f"{'rooms':>10} {'random retry':>14} {'frontier':>10} {'frontier grid':>14}")
+    for maze_size in args.sizes:
+        random_retry_time = frontier_time = "-"
+        if maze_size <= args.random_retry_max_size:
+            try:
+                random_retry_time = f"{time_maze(maze_size, args.seed, MazeAlgorithm.RANDOM_RETRY, True):.4f}"
+            except RecursionError:
+                random_retry_time = "recursion"
+            frontier_time = f"{time_maze(maze_size, args.seed, MazeAlgorithm.FRONTIER, True):.4f}"
+        frontier_grid_time = f"{time_maze(maze_size, args.seed, MazeAlgorithm.FRONTIER, False):.4f}"
+        print(f"{maze_size:>10} {random_retry_time:>14} {frontier_time:>10} {frontier_grid_time:>14}")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Measures how many bytes every room, door and bullet takes (the object, its collider and its place in the
+registries of the game), for different maze sizes.
+A door is measured together with its share of the Room that holds it.
+Every maze size is measured in a new process, so the objects of one size don't change the results of the next
+"""
+import argparse
+import multiprocessing
+import sys
+import tracemalloc
+from typing import Dict
+
+from collision import CollisionMasks
+from game_objects import Object, Bullet
+from game_settings import WHITE, BLACK, BULLET_SIZE
+from maze import Maze
+from renderer import RenderLayer, RenderMode
+from utilitiez import get_room_rect
+
+DEFAULT_SIZES = (10, 100, 1_000, 10_000, 100_000)
+
+
+def measure_bytes(create) -> (int, int):
+    #  returns how many bytes are still allocated after calling create and how many objects it created
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    created = create()
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return end - start, len(created)
+
+
+def measure_maze(maze_size: int, seed: int) -> Dict[str, float]:
+    maze = Maze(maze_size, seed, build_rooms=False)
+    room_bytes, rooms_count = measure_bytes(lambda: [
+        Object(*get_room_rect(room_index), WHITE, RenderLayer.ROOM, RenderMode.NORMAL)
+        for room_index in maze.rooms_position])
+    door_bytes, doors_count = measure_bytes(lambda: [door for room in maze.build_rooms() for door in room.doors])
+    bullet_bytes, bullets_count = measure_bytes(lambda: [
+        Bullet(0, 0, BULLET_SIZE, BULLET_SIZE, BLACK, CollisionMasks.BULLET, (), 1, 1, 0) for _ in range(maze_size)])
+    return {"room": room_bytes / rooms_count, "door": door_bytes / doors_count, "bullet": bullet_bytes / bullets_count}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{'rooms':>10} {'bytes/room':>12} {'bytes/door':>12} {'bytes/bullet':>13}")
+    for maze_size in args.sizes:
+        with context.Pool(1) as pool:
+            result = pool.apply(measure_maze, (maze_size, args.seed))
+        print(f"{maze_size:>10} {result['room']:>12.0f} {result['door']:>12.0f} {result['bullet']:>13.0f}")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Runs the benchmark scenarios of the game and prints their results, or writes them to a json file so the results
+of different commits can be compared, for example:
+    python -m benchmarks.suite --scenarios maze collision --json results.json
+Scenarios:
+    maze - Maze construction for every size in --maze-sizes
+    collision - the collision detection of a frame (Game update) with every count in --sprites moving sprites
+    update - a tick of the game (mostly the late update) with every count in --bullets bullets,
+             as Bullet objects and as ProjectileSystem projectiles
+    render - a rendered frame with every count in --objects visible objects, drawn on an offscreen surface
+    doors - passing through --transitions doors, including the rooms that are streamed in and out
+    enemies - a tick of the game with every count in --enemies enemies seeking the player in its room
+Every scenario runs in a new process, so the objects of one scenario don't change the results of the next
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+DEFAULT_MAZE_SIZES = (10, 100, 1_000, 10_000, 100_000, 1_000_000)
+DEFAULT_SPRITES = (100, 1_000, 5_000)
+DEFAULT_BULLETS = (100, 1_000, 10_000)
+DEFAULT_OBJECTS = (100, 1_000, 5_000)
+DEFAULT_ENEMIES = (1_000, 10_000, 20_000)
+DEFAULT_COLLISION_MODES = ("spatial_hash", "vectorized")
+SCENARIOS = ("maze", "collision", "update", "render", "doors", "enemies")
+
+
+def get_frame_stats(frame_times: List[float]) -> Dict[str, float]:
+    #  the statistics of the frame times (in seconds) in milliseconds
+    frame_times_ms = np.array(frame_times) * 1000
+    return {"mean_ms": float(frame_times_ms.mean()), "median_ms": float(np.median(frame_times_ms)),
+            "p95_ms": float(np.percentile(frame_times_ms, 95)), "max_ms": float(frame_times_ms.max())}
+
+
+def get_room_center() -> (int, int):
+    from camera import Camera
+    return Camera().x, Camera().y
+
+
+def bench_maze(maze_size: int, seed: int) -> Dict:
+    from maze import Maze
+    start = time.perf_counter()
+    Maze(maze_size, seed, build_rooms=False)
+    return {"rooms": maze_size, "seconds": time.perf_counter() - start}
+
+
+def bench_collision(sprites_count: int, collision_mode: str, frames: int, seed: int) -> Dict:
+    import game_settings
+    game_settings.COLLISION_MODE = collision_mode
+    from collision import CollisionMasks, CollisionWorld, CollisionMode
+    from game import Game
+    from game_objects import ObjectMetaClass, Sprite
+    from renderer import RenderLayer, RenderMode
+    from game_settings import ROOM_SIZE
+
+    Game(headless=True)
+    CollisionWorld().set_mode(CollisionMode(collision_mode))
+    rng = random.Random(seed)
+    center_x, center_y = get_room_center()
+    sprites = [Sprite(center_x + rng.uniform(-ROOM_SIZE / 2, ROOM_SIZE / 2),
+                      center_y + rng.uniform(-ROOM_SIZE / 2, ROOM_SIZE / 2), 10, 10, (0, 0, 0), RenderLayer.BULLET,
+                      RenderMode.NORMAL, CollisionMasks.ENEMY, (CollisionMasks.ENEMY, CollisionMasks.PLAYER))
+               for _ in range(sprites_count)]
+    collision_world = CollisionWorld()
+    frame_times = []
+    for _ in range(frames):
+        for sprite in sprites:
+            sprite.collider.update(sprite.collider.x + rng.randint(-3, 3), sprite.collider.y + rng.randint(-3, 3))
+        start = time.perf_counter()
+        collision_world.detect_collisions(ObjectMetaClass.sprites)  # the same as the update of the game
+        frame_times.append(time.perf_counter() - start)
+        collision_world.reset_collisions()
+    return {"sprites": sprites_count, "collision_mode": collision_mode, "pair_checks": collision_world.pair_checks,
+            **get_frame_stats(frame_times)}
+
+
+def bench_update(bullets_count: int, bullets_kind: str, frames: int, seed: int) -> Dict:
+    from game import Game
+    from game_objects import BulletPool
+    from projectiles import ProjectileSystem
+
+    game = Game(headless=True)
+    rng = np.random.default_rng(seed)
+    center_x, center_y = get_room_center()
+    target_x = center_x + rng.uniform(-100, 100, bullets_count)
+    target_y = center_y + rng.uniform(-100, 100, bullets_count)
+    if bullets_kind == "projectiles":
+        ProjectileSystem().fire_many(np.full(bullets_count, center_x), np.full(bullets_count, center_y),
+                                     target_x, target_y, 60)
+    else:
+        bullet_pool = BulletPool()
+        for bullet_target_x, bullet_target_y in zip(target_x.tolist(), target_y.tolist()):
+            bullet_pool.fire(center_x, center_y, bullet_target_x, bullet_target_y, 1)
+    game.run_ticks(1)  # the bullets are added to the game
+    frame_times = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        game.run_ticks(1)
+        frame_times.append(time.perf_counter() - start)
+    return {"bullets": bullets_count, "kind": bullets_kind, **get_frame_stats(frame_times)}
+
+
+def bench_render(objects_count: int, frames: int, seed: int) -> Dict:
+    import pygame as pg
+    from camera import Camera
+    from game import Game
+    from game_objects import Object, ObjectMetaClass
+    from projectiles import ProjectileSystem
+    from renderer import Renderer, RenderLayer, RenderMode
+    from game_settings import WINDOW_WIDTH, WINDOW_HEIGHT
+
+    game = Game(headless=True)
+    pg.display.set_mode((1, 1))  # the renderer updates the display, the frame itself is drawn offscreen
+    screen = pg.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+    renderer = Renderer(screen, Camera(), ObjectMetaClass.render_indexes, ObjectMetaClass.ui_objects,
+                        ObjectMetaClass.layer_caches, array_systems=(ProjectileSystem(),))
+    rng = random.Random(seed)
+    view_rect = Camera().get_view_rect()
+    colors = [(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(8)]
+    for _ in range(objects_count):
+        Object(rng.randrange(view_rect.left, view_rect.right), rng.randrange(view_rect.top, view_rect.bottom),
+               rng.randint(5, 40), rng.randint(5, 40), rng.choice(colors), RenderLayer.PLAYER, RenderMode.NORMAL)
+    game.run_ticks(1)
+    renderer.render(lambda: [])  # the cached layers are drawn in the first frame
+    frame_times = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        renderer.render(lambda: [])
+        frame_times.append(time.perf_counter() - start)
+    return {"objects": objects_count, "drawn_objects": renderer.drawn_objects_count,
+            "draw_calls": renderer.draw_calls_count, **get_frame_stats(frame_times)}
+
+
+def bench_doors(transitions: int, seed: int) -> Dict:
+    from game import Game
+    from game_objects import ObjectMetaClass, Door, Player
+    from utilitiez import get_room_index, get_room_rect
+    import pygame as pg
+
+    game = Game(headless=True)
+    player = next(iter(ObjectMetaClass.get_objects_of_type(Player)))
+    rng = random.Random(seed)
+    frame_times = []
+    for _ in range(transitions):
+        room_rect = pg.Rect(get_room_rect(get_room_index(*get_room_center())))
+        doors = [door for door in ObjectMetaClass.get_objects_of_type(Door) if room_rect.colliderect(door.rect)]
+        door = rng.choice(doors)
+        #  the player is placed on the door, so it passes through it in the next tick
+        player.set_position(door.rect.x, door.rect.y)
+        player.collider.update(door.rect.x, door.rect.y)
+        start = time.perf_counter()
+        game.run_ticks(1)
+        frame_times.append(time.perf_counter() - start)
+    return {"transitions": transitions, **get_frame_stats(frame_times)}
+
+
+def bench_enemies(enemies_count: int, frames: int, seed: int) -> Dict:
+    from enemies import EnemyCrowd
+    from game import Game
+    from game_settings import ENEMY_SIZE
+    from utilitiez import get_room_index, get_room_rect
+
+    game = Game(headless=True)
+    rng = np.random.default_rng(seed)
+    room_x, room_y, room_width, room_height = get_room_rect(get_room_index(*get_room_center()))
+    enemy_crowd = EnemyCrowd()
+    enemy_crowd.spawn_many(rng.uniform(room_x, room_x + room_width - ENEMY_SIZE, enemies_count),
+                           rng.uniform(room_y, room_y + room_height - ENEMY_SIZE, enemies_count))
+    game.run_ticks(1)
+    frame_times = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        game.run_ticks(1)
+        frame_times.append(time.perf_counter() - start)
+    return {"enemies": enemies_count, "alive": len(enemy_crowd), **get_frame_stats(frame_times)}
+
+
+def run_in_new_process(function, *args) -> Dict:
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        result = pool.apply(function, args)
+        #  the process should end by itself, pygame catches the signal that terminates it
+        pool.close()
+        pool.join()
+    return result
+
+
+def get_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--maze-sizes", type=int, nargs="+", default=DEFAULT_MAZE_SIZES)
+    parser.add_argument("--sprites", type=int, nargs="+", default=DEFAULT_SPRITES)
+    parser.add_argument("--collision-modes", nargs="+", default=DEFAULT_COLLISION_MODES)
+    parser.add_argument("--bullets", type=int, nargs="+", default=DEFAULT_BULLETS)
+    parser.add_argument("--objects", type=int, nargs="+", default=DEFAULT_OBJECTS)
+    parser.add_argument("--transitions", type=int, default=50)
+    parser.add_argument("--enemies", type=int, nargs="+", default=DEFAULT_ENEMIES)
+    parser.add_argument("--frames", type=int, default=100, help="how many frames every scenario measures")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="the file to write the results to")
+    args = parser.parse_args()
+    os.environ["SDL_VIDEODRIVER"] = "dummy"  # the new processes get it too
+
+    scenario_runs = {
+        "maze": [(bench_maze, maze_size, args.seed) for maze_size in args.maze_sizes],
+        "collision": [(bench_collision, sprites_count, collision_mode, args.frames, args.seed)
+                      for collision_mode in args.collision_modes for sprites_count in args.sprites],
+        "update": [(bench_update, bullets_count, bullets_kind, args.frames, args.seed)
+                   for bullets_kind in ("objects", "projectiles") for bullets_count in args.bullets],
+        "render": [(bench_render, objects_count, args.frames, args.seed) for objects_count in args.objects],
+        "doors": [(bench_doors, args.transitions, args.seed)],
+        "enemies": [(bench_enemies, enemies_count, args.frames, args.seed) for enemies_count in args.enemies],
+    }
+    results = {"commit": get_commit(), "python": platform.python_version(), "platform": platform.platform(),
+               "arguments": vars(args), "scenarios": {}}
+    for scenario in args.scenarios:
+        results["scenarios"][scenario] = []
+        for function, *function_args in scenario_runs[scenario]:
+            result = run_in_new_process(function, *function_args)
+            results["scenarios"][scenario].append(result)
+            print(scenario, " ".join(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}"
+                                     for key, value in result.items()))
+            sys.stdout.flush()
+
+    if args.json:
+        with open(args.json, "w") as results_file:
+            json.dump(results, results_file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,11 @@ class Camera(metaclass=Singleton):
         #  for example the screen have range bentween (0,0) to (width, height) the world can position adds offset to this
         return self.x -int(WINDOW_WIDTH/2) , self.y-int(WINDOW_HEIGHT/2)
 
+    def get_view_rect(self, margin: int = 0) -> pg.Rect:
+        #  returns the part of the world (in world position) that is shown in the screen, grown by margin on every side
+        offset_x, offset_y = self.screen_offset()
+        return pg.Rect(offset_x - margin, offset_y - margin, WINDOW_WIDTH + 2 * margin, WINDOW_HEIGHT + 2 * margin)
+
     def update(self,target_x,target_y) -> None:
 
         x = -target_x + int(WINDOW_WIDTH/2)
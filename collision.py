@@ -1,5 +1,11 @@
 from enum import Enum
+from itertools import count
+from typing import Dict, List, Set
+import numpy as np
 from utilitiez import on_object
+from meta_classes import Singleton
+from spatial_hash import SpatialHash
+from game_settings import COLLISION_MODE, COLLISION_CELL_SIZE
 
 class CollisionMasks(Enum):
     WALLS = 1
@@ -17,27 +23,73 @@ class CollisionPositions(Enum):
     LEFT = 3
     RIGHT = 4
 
+class CollisionMode(Enum):
+    BRUTE_FORCE = "brute_force"  # every sprite is checked against every sprite
+    SPATIAL_HASH = "spatial_hash"  # only sprites that share a cell in the collision world are checked
+    VECTORIZED = "vectorized"  # all the sprites are checked together with numpy arrays
+
+#  The collision layer matrix - every mask gets its own bit, so "can these two masks collide" is one AND operation
+MASK_BITS: Dict[CollisionMasks, int] = {mask: 1 << mask.value for mask in CollisionMasks}
+
+
+def get_mask_bits(masks) -> int:
+    #  turns masks into one integer where every mask has its own bit
+    bits = 0
+    for mask in masks:
+        bits |= MASK_BITS[mask]
+    return bits
+
 class Collider:
     """
     An object that responsible for checking collision between objects
     """
+    __slots__ = ("__x", "__y", "__width", "__height", "__mask", "__masks_to_collide_with", "__mask_bit",
+                 "__collide_with_bits", "__static", "__collision", "__collistion_positions", "__owner", "__world")
 
-    def __init__(self, x, y, width, height, mask: CollisionMasks, masks_to_collide_with: tuple):
+    def __init__(self, x, y, width, height, mask: CollisionMasks, masks_to_collide_with: tuple, owner=None,
+                 static: bool = False):
         self.__x = x
         self.__y = y
         self.__width = width
         self.__height = height
         self.__mask = mask
         self.__masks_to_collide_with = masks_to_collide_with
+        self.__mask_bit = MASK_BITS[mask]
+        self.__collide_with_bits = get_mask_bits(masks_to_collide_with)
+        self.__static = static  # Static colliders never move, so two static colliders are never checked
         self.__collision = None # Will be equal to the sprite this object collided with in current frame
         self.__collistion_positions = []# In which border of the collider did the collide occurred
+        self.__owner = owner  # The sprite this collider belongs to
+        self.__world = None
+        if owner is not None:
+            #  only colliders of sprites can be found by other colliders
+            self.add_to_world()
 
     def update(self, x, y):
         """
         Update the collider position
         """
+        if x == self.__x and y == self.__y:
+            return  # the collider didn't move so it can keep sleeping
         self.__x = x
         self.__y = y
+        if self.__world is not None:
+            self.__world.move(self)
+
+    def add_to_world(self):
+        #  colliders are added when they are created, a destroyed collider can be added again (like a pooled bullet)
+        if self.__world is None:
+            self.__world = CollisionWorld()
+            self.__world.add(self)
+
+    def destroy(self):
+        if self.__world is not None:
+            self.__world.remove(self)
+            self.__world = None
+
+    @property
+    def owner(self):
+        return self.__owner
 
     @property
     def collision(self):
@@ -63,6 +115,22 @@ class Collider:
     def mask(self):
         return self.__mask
 
+    @property
+    def masks_to_collide_with(self):
+        return self.__masks_to_collide_with
+
+    @property
+    def mask_bit(self):
+        return self.__mask_bit
+
+    @property
+    def collide_with_bits(self):
+        return self.__collide_with_bits
+
+    @property
+    def static(self):
+        return self.__static
+
     @property
     def collistion_positions(self):
         return self.__collistion_positions
@@ -74,13 +142,21 @@ class Collider:
         self.__collision = None
         self.__collistion_positions = []
 
-    def _get_collision_pos(self) -> list:
+    def _set_collision(self, sprite, collistion_positions: list):
+        #  used by collision checks that are done outside of the collider (like the ColliderStore)
+        self.__collision = sprite
+        self.__collistion_positions = collistion_positions
+
+    def _get_collision_pos(self, other=None) -> list:
+        #  other is the collider this collider collided with (the collider of the collision by default)
+        if other is None:
+            other = self.collision.collider
         collistions = []
-        if self.__y > self.collision.collider.y:
+        if self.__y > other.y:
             collistions.append(CollisionPositions.TOP)
         else:
             collistions.append(CollisionPositions.BOTTOM)
-        if self.__x > self.collision.collider.x:
+        if self.__x > other.x:
             collistions.append(CollisionPositions.LEFT)
         else:
             collistions.append(CollisionPositions.RIGHT)
@@ -95,7 +171,279 @@ class Collider:
         """
         for sprite in sprites:
             collider = sprite.collider
-            if collider is not self and collider.mask in self.__masks_to_collide_with:
+            if collider is not self and collider.mask_bit & self.__collide_with_bits:
                 if on_object(self.__x, self.__y, self.__width, self.__height, collider.x, collider.y, collider.width, collider.height):
                     self.__collision = sprite
-                    self.__collistion_positions = self._get_collision_pos()
\ No newline at end of file
+                    self.__collistion_positions = self._get_collision_pos()
+
+
+class ColliderStore:
+    """
+    Keeps the bounding box and the masks of every collider in numpy arrays (one row per collider),
+    so the collisions of all the colliders in a frame are found in a few vectorized operations
+    instead of calling on_object for every pair of sprites
+    """
+    INITIAL_CAPACITY = 256
+    ROWS_PER_BATCH = 512  # how many colliders are checked together, limits the size of the temporary arrays
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self.__size = 0
+        self.__x = np.zeros(capacity, dtype=np.float64)
+        self.__y = np.zeros(capacity, dtype=np.float64)
+        self.__width = np.zeros(capacity, dtype=np.float64)
+        self.__height = np.zeros(capacity, dtype=np.float64)
+        self.__mask_bits = np.zeros(capacity, dtype=np.int64)
+        self.__collide_with_bits = np.zeros(capacity, dtype=np.int64)
+        self.__order = np.zeros(capacity, dtype=np.int64)  # when there are few collisions the newest collider wins
+        self.__static = np.zeros(capacity, dtype=np.bool_)
+        self.__colliders: List[Collider] = []  # the collider of every row
+        self.__rows: Dict[Collider, int] = {}
+
+    def __len__(self):
+        return self.__size
+
+    @staticmethod
+    def __grow_array(array: np.ndarray, capacity: int, size: int) -> np.ndarray:
+        new_array = np.zeros(capacity, dtype=array.dtype)
+        new_array[:size] = array[:size]
+        return new_array
+
+    def __grow(self) -> None:
+        capacity, size = max(len(self.__x) * 2, ColliderStore.INITIAL_CAPACITY), self.__size
+        self.__x = ColliderStore.__grow_array(self.__x, capacity, size)
+        self.__y = ColliderStore.__grow_array(self.__y, capacity, size)
+        self.__width = ColliderStore.__grow_array(self.__width, capacity, size)
+        self.__height = ColliderStore.__grow_array(self.__height, capacity, size)
+        self.__mask_bits = ColliderStore.__grow_array(self.__mask_bits, capacity, size)
+        self.__collide_with_bits = ColliderStore.__grow_array(self.__collide_with_bits, capacity, size)
+        self.__order = ColliderStore.__grow_array(self.__order, capacity, size)
+        self.__static = ColliderStore.__grow_array(self.__static, capacity, size)
+
+    def add(self, collider: Collider, order: int) -> None:
+        if self.__size == len(self.__x):
+            self.__grow()
+        row = self.__size
+        self.__rows[collider] = row
+        self.__colliders.append(collider)
+        self.__size += 1
+        self.__x[row] = collider.x
+        self.__y[row] = collider.y
+        self.__width[row] = collider.width
+        self.__height[row] = collider.height
+        self.__mask_bits[row] = collider.mask_bit
+        self.__collide_with_bits[row] = collider.collide_with_bits
+        self.__order[row] = order
+        self.__static[row] = collider.static
+
+    def move(self, collider: Collider) -> None:
+        row = self.__rows[collider]
+        self.__x[row] = collider.x
+        self.__y[row] = collider.y
+
+    def remove(self, collider: Collider) -> None:
+        #  the last row is moved to the place of the removed row so the arrays stay contiguous
+        row = self.__rows.pop(collider)
+        last_row = self.__size - 1
+        last_collider = self.__colliders.pop()
+        if row != last_row:
+            self.__colliders[row] = last_collider
+            self.__rows[last_collider] = row
+            for array in (self.__x, self.__y, self.__width, self.__height, self.__mask_bits, self.__collide_with_bits,
+                          self.__order, self.__static):
+                array[row] = array[last_row]
+        self.__size -= 1
+
+    def clear(self) -> None:
+        self.__size = 0
+        self.__colliders.clear()
+        self.__rows.clear()
+
+    def detect_collisions(self) -> List[Collider]:
+        """
+        Find the collision of every collider and write it into the collider, the same way get_collision does.
+        Returns the colliders that collided
+        """
+        collided_colliders = []
+        size = self.__size
+        if size == 0:
+            return collided_colliders
+        x, y = self.__x[:size], self.__y[:size]
+        right, bottom = x + self.__width[:size], y + self.__height[:size]
+        mask_bits, order, static = self.__mask_bits[:size], self.__order[:size], self.__static[:size]
+
+        for start in range(0, size, ColliderStore.ROWS_PER_BATCH):
+            stop = min(start + ColliderStore.ROWS_PER_BATCH, size)
+            rows = np.arange(stop - start)
+            row_x, row_y = x[start:stop, None], y[start:stop, None]
+            row_right, row_bottom = right[start:stop, None], bottom[start:stop, None]
+
+            #  the same checks as on_object, every row against every collider
+            collide = (self.__collide_with_bits[start:stop, None] & mask_bits) != 0
+            collide &= ~(self.__static[start:stop, None] & static)
+            collide &= ((y <= row_y) & (row_y <= bottom)) | ((row_y <= y) & (y <= row_bottom))
+            collide &= ((x <= row_x) & (row_x <= right)) | ((row_x <= x) & (x <= row_right))
+            collide[rows, rows + start] = False  # a collider can't collide with itself
+
+            scores = np.where(collide, order, -1)
+            other_rows = scores.argmax(axis=1)
+            collided = np.flatnonzero(scores[rows, other_rows] >= 0)
+            if len(collided) == 0:
+                continue
+            other_rows = other_rows[collided]
+            is_top = y[collided + start] > y[other_rows]
+            is_left = x[collided + start] > x[other_rows]
+            for row, other_row, top, left in zip((collided + start).tolist(), other_rows.tolist(), is_top.tolist(),
+                                                  is_left.tolist()):
+                self.__colliders[row]._set_collision(self.__colliders[other_row].owner, [
+                    CollisionPositions.TOP if top else CollisionPositions.BOTTOM,
+                    CollisionPositions.LEFT if left else CollisionPositions.RIGHT])
+                collided_colliders.append(self.__colliders[row])
+        return collided_colliders
+
+
+class CollisionWorld(metaclass=Singleton):
+    """
+    Holds the colliders of all the sprites and finds their collisions every frame.
+    In SPATIAL_HASH mode the colliders are kept in a grid, and only colliders that moved since the last frame
+    (awake colliders) are checked, against the colliders that share a cell with them.
+    The contacts of colliders that didn't move are kept from the last frames, so static colliders (like doors)
+    and sleeping colliders cost nothing, and two static colliders are never checked.
+    In VECTORIZED mode the colliders are kept in a ColliderStore and all of them are checked together
+    """
+
+    def __init__(self, mode: CollisionMode = CollisionMode(COLLISION_MODE), cell_size: int = COLLISION_CELL_SIZE):
+        self.__mode = mode
+        self.__spatial_hash = SpatialHash(cell_size)
+        self.__collider_store = ColliderStore()
+        self.__insertion_order: Dict[Collider, int] = {}  # colliders are checked in the order they were created
+        self.__order_counter = count()
+        self.__awake_colliders: Set[Collider] = set()  # colliders that moved (or were added) since the last frame
+        self.__contacts: Dict[Collider, Set[Collider]] = {}  # maps every touching collider to the colliders it touches
+        self.__collided_colliders: List[Collider] = []  # the colliders that got a collision in this frame
+        self.__pair_checks = 0
+
+    @property
+    def mode(self):
+        return self.__mode
+
+    @property
+    def pair_checks(self):
+        #  how many pairs of colliders were checked in the last frame
+        return self.__pair_checks
+
+    @property
+    def awake_colliders_count(self):
+        return len(self.__awake_colliders)
+
+    def set_mode(self, mode: CollisionMode) -> None:
+        #  switching modes in the middle of the game is allowed, only the structure of the current mode is kept updated
+        self.__spatial_hash.clear()
+        self.__collider_store.clear()
+        self.__awake_colliders.clear()
+        self.__contacts.clear()
+        self.__mode = mode
+        for collider, order in self.__insertion_order.items():
+            self.__add_to_mode(collider, order)
+
+    def __add_to_mode(self, collider: Collider, order: int) -> None:
+        if self.__mode == CollisionMode.SPATIAL_HASH:
+            self.__spatial_hash.insert(collider, collider.x, collider.y, collider.width, collider.height)
+            self.__awake_colliders.add(collider)
+        elif self.__mode == CollisionMode.VECTORIZED:
+            self.__collider_store.add(collider, order)
+
+    def add(self, collider: Collider) -> None:
+        order = next(self.__order_counter)
+        self.__insertion_order[collider] = order
+        self.__add_to_mode(collider, order)
+
+    def move(self, collider: Collider) -> None:
+        if self.__mode == CollisionMode.SPATIAL_HASH:
+            self.__spatial_hash.move(collider, collider.x, collider.y, collider.width, collider.height)
+            self.__awake_colliders.add(collider)
+        elif self.__mode == CollisionMode.VECTORIZED:
+            self.__collider_store.move(collider)
+
+    def remove(self, collider: Collider) -> None:
+        del self.__insertion_order[collider]
+        if self.__mode == CollisionMode.SPATIAL_HASH:
+            self.__spatial_hash.remove(collider)
+            self.__awake_colliders.discard(collider)
+            self.__forget_contacts(collider)
+        elif self.__mode == CollisionMode.VECTORIZED:
+            self.__collider_store.remove(collider)
+
+    def __forget_contacts(self, collider: Collider) -> None:
+        for other in self.__contacts.pop(collider, ()):
+            other_contacts = self.__contacts[other]
+            other_contacts.discard(collider)
+            if not other_contacts:
+                del self.__contacts[other]
+
+    def __add_contact(self, collider: Collider, other: Collider) -> None:
+        #  contacts are kept on both sides, so when one of the colliders moves the other one forgets it too
+        self.__contacts.setdefault(collider, set()).add(other)
+        self.__contacts.setdefault(other, set()).add(collider)
+
+    def __update_contacts(self) -> None:
+        awake_colliders = self.__awake_colliders
+        for collider in awake_colliders:
+            self.__forget_contacts(collider)
+
+        checked_colliders = set()  # both colliders of a pair can be awake, but the pair is checked only once
+        for collider in awake_colliders:
+            checked_colliders.add(collider)
+            x, y, width, height = collider.x, collider.y, collider.width, collider.height
+            mask_bit, collide_with_bits, static = collider.mask_bit, collider.collide_with_bits, collider.static
+            for other in self.__spatial_hash.query_item(collider):
+                if other in checked_colliders or (static and other.static):
+                    continue
+                if not (collide_with_bits & other.mask_bit or other.collide_with_bits & mask_bit):
+                    continue  # the layers of the colliders don't collide with each other
+                self.__pair_checks += 1
+                if on_object(x, y, width, height, other.x, other.y, other.width, other.height):
+                    self.__add_contact(collider, other)
+        awake_colliders.clear()
+
+    def __detect_spatial_hash_collisions(self) -> None:
+        self.__update_contacts()
+        insertion_order = self.__insertion_order
+        for collider, contacts in self.__contacts.items():
+            collide_with_bits = collider.collide_with_bits
+            collision = None
+            for other in contacts:
+                if other.mask_bit & collide_with_bits and (
+                        collision is None or insertion_order[other] > insertion_order[collision]):
+                    collision = other  # like get_collision, the newest collider wins
+            if collision is not None:
+                collider._set_collision(collision.owner, collider._get_collision_pos(collision))
+                self.__collided_colliders.append(collider)
+
+    def detect_collisions(self, sprites: list) -> None:
+        """
+        Update the collision of every sprite in the current frame
+        Attributes:
+            sprites - all the sprites in the game
+        """
+        self.__pair_checks = 0
+        if self.__mode == CollisionMode.BRUTE_FORCE:
+            #  the sprites list doesn't keep the order the sprites were created in (it removes by swapping),
+            #  and the newest sprite wins like in the other modes
+            sprites = [collider.owner for collider in self.__insertion_order]
+            self.__pair_checks = len(sprites) * len(sprites)
+            for sprite in sprites:
+                sprite.collider.get_collision(sprites)
+            self.__collided_colliders.extend(sprite.collider for sprite in sprites
+                                             if sprite.collider.collision is not None)
+        elif self.__mode == CollisionMode.SPATIAL_HASH:
+            self.__detect_spatial_hash_collisions()
+        elif self.__mode == CollisionMode.VECTORIZED:
+            self.__pair_checks = len(self.__collider_store) * len(self.__collider_store)
+            self.__collided_colliders.extend(self.__collider_store.detect_collisions())
+
+    def reset_collisions(self) -> None:
+        #  resets the collisions of this frame, should be called once a frame after the sprites used them.
+        #  only the colliders that collided are touched, so sprites far from everything cost nothing
+        for collider in self.__collided_colliders:
+            collider.late_update()
+        self.__collided_colliders.clear()
@@ -0,0 +1,301 @@
+from enum import IntEnum
+from typing import List
+import numpy as np
+import pygame as pg
+from collision import CollisionMasks, MASK_BITS, get_mask_bits
+from game_time import GlobalTime
+from meta_classes import Singleton
+from renderer import RenderLayer
+from utilitiez import get_room_index
+from game_settings import ENEMY_SIZE, ENEMY_COLOR, ENEMY_SPEED, ENEMY_ACCELERATION, ENEMY_SEPARATION_CELL_SIZE, \
+    ENEMY_SEPARATION_STRENGTH, ROOM_SIZE, SPACE_BETWEEN_ROOM, START_ROOM_POSITION
+
+
+class EnemyState(IntEnum):
+    IDLE = 0  # the target is in another room, the enemy doesn't move
+    SEEK = 1  # the enemy moves towards the target and away from the crowd around it
+
+
+class EnemyCrowd(metaclass=Singleton):
+    """
+    Keeps all the enemies in numpy arrays (one row per enemy) like the ProjectileSystem, so every frame the steering
+    of the whole crowd is a few vectorized operations: the enemies in the room of the target seek it, and are
+    separated by counting the crowd in a grid of cells instead of checking every pair of enemies.
+    Every enemy stays in the room it was spawned in. Enemies hit sprites with the masks they collide with
+    (the sprites that were hit are kept in hits), an enemy that touches a bullet (a sprite or a projectile) dies
+    Attributes:
+        width, height - the size of every enemy
+        color - the color of every enemy
+        render_layer - the layer the enemies are drawn in
+        masks_to_collide_with - the masks of the sprites the enemies hit
+        max_speed - how many pixels an enemy moves in a second at most
+        acceleration - how fast (pixels in a second squared) an enemy can change its velocity
+        separation_cell_size - the size of the cells of the grid the crowd is counted in
+        separation_strength - how hard (pixels in a second) enemies are pushed away from crowded cells
+    """
+    INITIAL_CAPACITY = 256
+    ROWS_PER_BATCH = 512  # how many enemies are checked together, limits the size of the temporary arrays
+    MASK = CollisionMasks.ENEMY
+    KILLED_BY = CollisionMasks.BULLET
+
+    def __init__(self, width: int = ENEMY_SIZE, height: int = ENEMY_SIZE, color=ENEMY_COLOR,
+                 render_layer: RenderLayer = RenderLayer.ENEMY,
+                 masks_to_collide_with=(CollisionMasks.PLAYER, CollisionMasks.BULLET), max_speed=ENEMY_SPEED,
+                 acceleration=ENEMY_ACCELERATION, separation_cell_size=ENEMY_SEPARATION_CELL_SIZE,
+                 separation_strength=ENEMY_SEPARATION_STRENGTH):
+        self.__width = width
+        self.__height = height
+        self.__color = color
+        self.__render_layer = render_layer
+        self.__collide_with_bits = get_mask_bits(masks_to_collide_with)
+        self.__max_speed = max_speed
+        self.__acceleration = acceleration
+        self.__separation_cell_size = separation_cell_size
+        self.__separation_strength = separation_strength
+
+        self.__size = 0
+        self.__positions = np.zeros((EnemyCrowd.INITIAL_CAPACITY, 2), dtype=np.float64)  # the top left corner
+        self.__previous_positions = np.zeros((EnemyCrowd.INITIAL_CAPACITY, 2), dtype=np.float64)  # last update
+        self.__velocities = np.zeros((EnemyCrowd.INITIAL_CAPACITY, 2), dtype=np.float64)
+        self.__rooms = np.zeros((EnemyCrowd.INITIAL_CAPACITY, 2), dtype=np.int64)  # the room index of every enemy
+        self.__states = np.zeros(EnemyCrowd.INITIAL_CAPACITY, dtype=np.int8)
+        self.__hits: List = []  # the sprites that were hit in the last frame
+        self.__killed_count = 0
+
+    def __len__(self):
+        return self.__size
+
+    @property
+    def color(self):
+        return self.__color
+
+    @property
+    def render_layer(self):
+        return self.__render_layer
+
+    @property
+    def hits(self):
+        return self.__hits
+
+    @property
+    def killed_count(self):
+        #  how many enemies were killed since the crowd was created
+        return self.__killed_count
+
+    @property
+    def positions(self) -> np.ndarray:
+        #  the top left corner of every live enemy (a view, don't keep it after the next update)
+        return self.__positions[:self.__size]
+
+    @property
+    def velocities(self) -> np.ndarray:
+        return self.__velocities[:self.__size]
+
+    @property
+    def states(self) -> np.ndarray:
+        return self.__states[:self.__size]
+
+    @staticmethod
+    def __grow_array(array: np.ndarray, capacity: int, size: int) -> np.ndarray:
+        new_array = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+        new_array[:size] = array[:size]
+        return new_array
+
+    def __reserve(self, count: int) -> None:
+        #  makes sure there is room for count more enemies, the capacity is doubled so growing is rare
+        capacity, size = len(self.__states), self.__size
+        if size + count <= capacity:
+            return
+        while capacity < size + count:
+            capacity *= 2
+        self.__positions = EnemyCrowd.__grow_array(self.__positions, capacity, size)
+        self.__previous_positions = EnemyCrowd.__grow_array(self.__previous_positions, capacity, size)
+        self.__velocities = EnemyCrowd.__grow_array(self.__velocities, capacity, size)
+        self.__rooms = EnemyCrowd.__grow_array(self.__rooms, capacity, size)
+        self.__states = EnemyCrowd.__grow_array(self.__states, capacity, size)
+
+    def spawn(self, x, y) -> None:
+        self.spawn_many(np.array([x]), np.array([y]))
+
+    def spawn_many(self, x: np.ndarray, y: np.ndarray) -> None:
+        """
+        Adds an idle enemy with its top left corner in every (x, y), it stays in the room of its center
+        """
+        count = len(x)
+        self.__reserve(count)
+        rows = slice(self.__size, self.__size + count)
+        self.__positions[rows, 0] = x
+        self.__positions[rows, 1] = y
+        self.__previous_positions[rows] = self.__positions[rows]
+        self.__velocities[rows] = 0
+        #  the same as get_room_index for every center (np.rint rounds halves to even like round)
+        centers = self.__positions[rows] + (self.__width / 2, self.__height / 2)
+        self.__rooms[rows] = np.rint((centers - START_ROOM_POSITION - ROOM_SIZE / 2) / SPACE_BETWEEN_ROOM)
+        self.__states[rows] = EnemyState.IDLE
+        self.__size += count
+
+    def clear(self) -> None:
+        self.__size = 0
+        self.__hits = []
+
+    def update(self, sprites: List, target, projectile_system=None) -> None:
+        """
+        Steers and moves all the enemies and removes the ones that were killed, should be called once a frame
+        Attributes:
+            sprites - the sprites the enemies may hit
+            target - the object the enemies seek (like the player), only the enemies in its room move
+            projectile_system - the projectiles that may kill the enemies
+        """
+        self.__hits = []
+        size = self.__size
+        if size == 0:
+            return
+        delta_time = GlobalTime().delta_time
+        positions, velocities = self.__positions[:size], self.__velocities[:size]
+        self.__previous_positions[:size] = positions
+
+        target_x, target_y = target.rect.center
+        target_room = get_room_index(target_x, target_y)
+        rooms = self.__rooms[:size]
+        seeking = (rooms[:, 0] == target_room[0]) & (rooms[:, 1] == target_room[1])
+        self.__states[:size] = np.where(seeking, EnemyState.SEEK, EnemyState.IDLE)
+        velocities[~seeking] = 0  # the enemies of other rooms wait for the target
+        seeking_rows = np.flatnonzero(seeking)
+        if len(seeking_rows) == 0:
+            return
+
+        seeking_positions = positions[seeking_rows]
+        seeking_velocities = velocities[seeking_rows]
+        centers = seeking_positions + (self.__width / 2, self.__height / 2)
+        to_target = np.array((target_x, target_y), dtype=np.float64) - centers
+        distances = np.maximum(np.hypot(to_target[:, 0], to_target[:, 1]), 1)[:, None]
+        desired_velocities = to_target / distances * self.__max_speed
+        desired_velocities += self.__get_separation(centers) * self.__separation_strength
+
+        #  the velocity turns towards the desired velocity, but not faster than the acceleration
+        steering = desired_velocities - seeking_velocities
+        steering_length = np.maximum(np.hypot(steering[:, 0], steering[:, 1]), 1e-9)[:, None]
+        seeking_velocities += steering * np.minimum(1, self.__acceleration * delta_time / steering_length)
+        speeds = np.maximum(np.hypot(seeking_velocities[:, 0], seeking_velocities[:, 1]), 1e-9)[:, None]
+        seeking_velocities *= np.minimum(1, self.__max_speed / speeds)
+        seeking_positions += seeking_velocities * delta_time
+
+        #  the enemies stay inside their room
+        room_x = rooms[seeking_rows, 0] * SPACE_BETWEEN_ROOM + START_ROOM_POSITION[0]
+        room_y = rooms[seeking_rows, 1] * SPACE_BETWEEN_ROOM + START_ROOM_POSITION[1]
+        np.clip(seeking_positions[:, 0], room_x, room_x + ROOM_SIZE - self.__width, out=seeking_positions[:, 0])
+        np.clip(seeking_positions[:, 1], room_y, room_y + ROOM_SIZE - self.__height, out=seeking_positions[:, 1])
+        positions[seeking_rows] = seeking_positions
+        velocities[seeking_rows] = seeking_velocities
+
+        killed = np.zeros(size, dtype=np.bool_)
+        killed[seeking_rows] = self.__detect_hits(seeking_positions, sprites)
+        if projectile_system is not None and len(projectile_system) and \
+                projectile_system.collide_with_bits & MASK_BITS[EnemyCrowd.MASK]:
+            killed[seeking_rows] |= self.__detect_projectile_hits(seeking_positions, projectile_system)
+        if killed.any():
+            self.__keep(~killed)
+
+    def __keep(self, alive: np.ndarray) -> None:
+        #  the live enemies are moved to the start of the arrays
+        size = self.__size
+        self.__size = int(np.count_nonzero(alive))
+        self.__killed_count += size - self.__size
+        for array in (self.__positions, self.__previous_positions, self.__velocities, self.__rooms, self.__states):
+            array[:self.__size] = array[:size][alive]
+
+    def __get_separation(self, centers: np.ndarray) -> np.ndarray:
+        """
+        Returns the direction every enemy is pushed in to get away from the crowd around it.
+        The enemies are counted in a grid of cells (a sort instead of checking every pair), inside a cell an enemy is
+        pushed away from the center of the enemies in it, and between cells from the more crowded neighbor cells
+        """
+        cells = np.floor(centers / self.__separation_cell_size).astype(np.int64)
+        keys = (cells[:, 0] << 32) | (cells[:, 1] & 0xFFFFFFFF)
+        cell_keys, cell_rows, cell_counts = np.unique(keys, return_inverse=True, return_counts=True)
+        cell_rows = cell_rows.ravel()
+        cell_centers = np.column_stack((np.bincount(cell_rows, centers[:, 0], len(cell_keys)),
+                                        np.bincount(cell_rows, centers[:, 1], len(cell_keys)))) / cell_counts[:, None]
+        separation = (centers - cell_centers[cell_rows]) / self.__separation_cell_size
+        separation *= (cell_counts[cell_rows] - 1)[:, None]
+
+        #  the neighbor counts are the same for every enemy in a cell, so they are found once per cell
+        cell_x, cell_y = cell_keys >> 32, (cell_keys & 0xFFFFFFFF).astype(np.int32).astype(np.int64)
+
+        def get_neighbor_counts(x_offset: int, y_offset: int) -> np.ndarray:
+            neighbor_keys = ((cell_x + x_offset) << 32) | ((cell_y + y_offset) & 0xFFFFFFFF)
+            rows = np.minimum(np.searchsorted(cell_keys, neighbor_keys), len(cell_keys) - 1)
+            return np.where(cell_keys[rows] == neighbor_keys, cell_counts[rows], 0)
+
+        cell_gradients = np.column_stack((get_neighbor_counts(-1, 0) - get_neighbor_counts(1, 0),
+                                          get_neighbor_counts(0, -1) - get_neighbor_counts(0, 1))) / 2
+        separation += cell_gradients[cell_rows]
+        return separation
+
+    def __detect_hits(self, positions: np.ndarray, sprites: List) -> np.ndarray:
+        """
+        Returns which enemies touched a sprite that kills them (the same checks as on_object),
+        the hit sprites are added to hits
+        """
+        killed = np.zeros(len(positions), dtype=np.bool_)
+        targets = [sprite for sprite in sprites if sprite.collider.mask_bit & self.__collide_with_bits]
+        if not targets:
+            return killed
+        target_rects = np.array([(target.collider.x, target.collider.y, target.collider.width,
+                                  target.collider.height) for target in targets], dtype=np.float64)
+        kills = np.array([target.collider.mask == EnemyCrowd.KILLED_BY for target in targets], dtype=np.bool_)
+        hit_targets = np.zeros(len(targets), dtype=np.bool_)
+
+        for start, stop, collide in self.__overlaps(positions, target_rects):
+            killed[start:stop] = (collide & kills).any(axis=1)
+            hit_targets |= collide.any(axis=0)
+
+        self.__hits = [target for target, was_hit in zip(targets, hit_targets.tolist()) if was_hit]
+        return killed
+
+    def __detect_projectile_hits(self, positions: np.ndarray, projectile_system) -> np.ndarray:
+        #  returns which enemies were hit by a projectile, the projectiles that hit are removed
+        killed = np.zeros(len(positions), dtype=np.bool_)
+        projectile_positions = projectile_system.positions
+        projectile_rects = np.empty((len(projectile_positions), 4), dtype=np.float64)
+        projectile_rects[:, :2] = projectile_positions
+        projectile_rects[:, 2:] = projectile_system.size
+        hit_projectiles = np.zeros(len(projectile_rects), dtype=np.bool_)
+        for start, stop, collide in self.__overlaps(positions, projectile_rects):
+            killed[start:stop] = collide.any(axis=1)
+            hit_projectiles |= collide.any(axis=0)
+        projectile_system.remove(hit_projectiles)
+        return killed
+
+    def __overlaps(self, positions: np.ndarray, rects: np.ndarray):
+        #  yields which rects every batch of enemies touches (a row per enemy and a column per rect)
+        rect_x, rect_y = rects[:, 0], rects[:, 1]
+        rect_right, rect_bottom = rect_x + rects[:, 2], rect_y + rects[:, 3]
+        x, y = np.floor(positions[:, 0]), np.floor(positions[:, 1])
+        for start in range(0, len(positions), EnemyCrowd.ROWS_PER_BATCH):
+            stop = min(start + EnemyCrowd.ROWS_PER_BATCH, len(positions))
+            row_x, row_y = x[start:stop, None], y[start:stop, None]
+            row_right, row_bottom = row_x + self.__width, row_y + self.__height
+            collide = ((rect_y <= row_y) & (row_y <= rect_bottom)) | ((row_y <= rect_y) & (rect_y <= row_bottom))
+            collide &= ((rect_x <= row_x) & (row_x <= rect_right)) | ((row_x <= rect_x) & (rect_x <= row_right))
+            yield start, stop, collide
+
+    def get_rects_in_view(self, view_rect: pg.Rect, interpolation: float = 1) -> np.ndarray:
+        """
+        Returns the (x, y, width, height) of the enemies that touch the view rect (in world position)
+        Attributes:
+            interpolation - where to place the enemies between their previous position (0) and their position (1)
+        """
+        positions = self.__positions[:self.__size]
+        if interpolation < 1:
+            previous_positions = self.__previous_positions[:self.__size]
+            positions = previous_positions + (positions - previous_positions) * interpolation
+        positions = np.floor(positions).astype(np.int64)
+        x, y = positions[:, 0], positions[:, 1]
+        in_view = (x + self.__width > view_rect.x) & (x < view_rect.right)
+        in_view &= (y + self.__height > view_rect.y) & (y < view_rect.bottom)
+        rects = np.empty((int(np.count_nonzero(in_view)), 4), dtype=np.int64)
+        rects[:, :2] = positions[in_view]
+        rects[:, 2] = self.__width
+        rects[:, 3] = self.__height
+        return rects
@@ -1,6 +1,7 @@
 from meta_classes import Singleton
-from collections import defaultdict
-from typing import DefaultDict, Callable, List, Tuple
+from bisect import bisect_right
+from functools import partial
+from typing import Dict, Callable, List, Tuple, NamedTuple, Optional, Any
 from enum import Enum
 
 
@@ -10,24 +11,92 @@ class EventNumber(Enum):
     W_KEY_HOLD = 2
     D_KEY_HOLD = 3
     S_KEY_HOLD = 4
+    QUIT = 5
+    MOUSE_CLICK = 6
+    NEXT_LEVEL = 7
+
+
+class MousePayload(NamedTuple):
+    position: Tuple[int, int]  # the position of the mouse in the screen
+    button: int
+
+
+#  the type of the payload every event is fired with, events that are not here are fired without a payload
+EVENT_PAYLOAD_TYPES: Dict[EventNumber, type] = {EventNumber.MOUSE_CLICK: MousePayload}
+
 
 class Handler:
-    def __init__(self, handler_function: Callable, *args: Tuple):
-        self.__handler_function = handler_function
-        self.__args = args
+    __slots__ = ("__callback", "__priority", "__wants_payload")
+
+    def __init__(self, handler_function: Callable, *args: Tuple, priority: int = 0, wants_payload: bool = False):
+        #  the arguments are bound once, so activating the handler doesn't unpack them every time
+        self.__callback = partial(handler_function, *args) if args else handler_function
+        self.__priority = priority
+        self.__wants_payload = wants_payload  # the payload of the event is passed after the arguments
 
-    def activate_handler(self):
-        self.__handler_function(*self.__args)
+    @property
+    def priority(self):
+        return self.__priority
+
+    def activate_handler(self, payload=None):
+        if self.__wants_payload:
+            self.__callback(payload)
+        else:
+            self.__callback()
 
 
 class EventManager(metaclass=Singleton):
+    """
+    Calls the handlers of every event.
+    Events can be fired right away (fire_event) or queued and fired together once a frame (queue_event and
+    dispatch_events). The handlers of an event are called by their priority (higher first), and handlers with the
+    same priority by the order they were added
+    """
+
     def __init__(self):
-        self.__handlers: defaultdict[EventNumber, List[Handler]] = defaultdict(lambda: [])
+        #  the handler lists are replaced (not changed) when a handler is added or removed,
+        #  so a handler can be added or removed while the event is fired
+        self.__handlers: Dict[EventNumber, List[Handler]] = {}
+        self.__queued_events: List[EventNumber] = []
+        self.__queued_payloads: List[Any] = []
+
+    def add_handler(self, event_number: EventNumber, handler: Callable, *args: Tuple, priority: int = 0,
+                    wants_payload: bool = False) -> Handler:
+        #  returns the new handler, it is needed to remove the handler
+        new_handler = Handler(handler, *args, priority=priority, wants_payload=wants_payload)
+        handlers = list(self.__handlers.get(event_number, ()))
+        priorities = [-old_handler.priority for old_handler in handlers]
+        handlers.insert(bisect_right(priorities, -priority), new_handler)
+        self.__handlers[event_number] = handlers
+        return new_handler
 
-    def add_handler(self, event_number: EventNumber, handler: Callable, *args: Tuple):
-        new_handler = Handler(handler, *args)
-        self.__handlers[event_number].append(new_handler)
+    def remove_handler(self, event_number: EventNumber, handler: Handler) -> None:
+        self.__handlers[event_number] = [old_handler for old_handler in self.__handlers[event_number]
+                                         if old_handler is not handler]
 
-    def fire_event(self, event_number):
+    def fire_event(self, event_number: EventNumber, payload=None):
         #  activate all handlers that have the same event
-        [handler.activate_handler() for handler in self.__handlers[event_number]]
+        for handler in self.__handlers.get(event_number, ()):
+            handler.activate_handler(payload)
+
+    def queue_event(self, event_number: EventNumber, payload=None) -> None:
+        """
+        Adds the event to the events that will be fired in the next dispatch_events
+        Attributes:
+            payload - the data of the event, must be of the type in EVENT_PAYLOAD_TYPES
+        """
+        payload_type: Optional[type] = EVENT_PAYLOAD_TYPES.get(event_number)
+        if payload_type is not None and not isinstance(payload, payload_type):
+            raise TypeError(f"{event_number} payload must be {payload_type.__name__} got {type(payload).__name__}")
+        self.__queued_events.append(event_number)
+        self.__queued_payloads.append(payload)
+
+    def dispatch_events(self) -> None:
+        #  fires all the queued events by the order they were queued, events that are queued by handlers are fired too
+        queued_events, queued_payloads = self.__queued_events, self.__queued_payloads
+        index = 0
+        while index < len(queued_events):
+            self.fire_event(queued_events[index], queued_payloads[index])
+            index += 1
+        queued_events.clear()
+        queued_payloads.clear()
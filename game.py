@@ -1,110 +1,363 @@
+import os
+import time
+import numpy as np
 import pygame as pg
 from game_time import GlobalTime
 from game_settings import WINDOW_WIDTH, WINDOW_HEIGHT, WHITE, RED, BLACK, GREEN, MAZE_SIZE, SPACE_BETWEEN_ROOM, \
     ROOM_SIZE, START_ROOM_POSITION, DOOR_WIDTH, DOOR_HEIGHT, SPACE_BETWEEN_ROOM_MINI_MAP, ROOM_MINI_MAP_SIZE, \
-    START_MINI_MAP_ROOM_POSITION
-from game_objects import Object, Sprite, Player,ObjectMetaClass
-from typing import List, Dict
+    START_MINI_MAP_ROOM_POSITION, MAZE_SEED, MAZE_FILE, ROOM_STREAMING, PROFILER_DUMP_PATH, START_ROOM_ENEMIES, ENEMY_SIZE
+from game_objects import Object, Sprite, Player, ObjectMetaClass, BulletPool
+from typing import List, Dict, Iterable, Tuple
 from maze import Maze
-from renderer import RenderMode, RenderLayer
+from maze_graph import MazeGraph
+from level_loader import LevelLoader
+from room_streamer import RoomStreamer
+from simulation_scope import SimulationScope
+from utilitiez import get_room_index, get_room_rect
+from renderer import RenderMode, RenderLayer, Renderer, STATIC_RENDER_LAYERS
 from camera import Camera
 from collections import defaultdict
-from collision import CollisionMasks
+from collision import CollisionMasks, CollisionWorld
+from projectiles import ProjectileSystem
+from enemies import EnemyCrowd
 from event_system import EventManager,EventNumber
+from input_handler import InputHandler
+from profiler import FrameProfiler
 import game_debug
 
 
 class Game:
-    def __init__(self):
-        pg.init()
-        pg.font.init()
+    """
+    Attributes:
+        headless - runs the game without a window and without rendering (only run_ticks can be used), for tests
+                   and benchmarks on machines without a display
+        maze_size - how many rooms the maze has
+        maze_file - a maze file to load the maze from instead of generating it (maze_size is not used)
+        load_async - the maze is loaded in the background and the game starts right away in a maze of one room,
+                     the maze replaces it when it is ready
+    """
+    def __init__(self, headless: bool = False, maze_size: int = MAZE_SIZE, maze_file: str = MAZE_FILE,
+                 load_async: bool = False):
+        self.__headless = headless
+        if headless:
+            #  only the events of pygame are used, and they still need a video driver
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            pg.display.init()
+        else:
+            pg.init()
 
-        self.__font = pg.font.Font(None,30)
+        self.__font = None
+        self.__screen = None
+        if not headless:
+            pg.font.init()
+            self.__font = pg.font.Font(None,30)
 
-        pg.display.set_caption("My Game")
-        self.__screen = pg.display.set_mode() #  same as pg.display.get_surface()
+            pg.display.set_caption("My Game")
+            self.__screen = pg.display.set_mode() #  same as pg.display.get_surface()
 
         self.__camera = Camera()
-        self.__maze = Maze(MAZE_SIZE)
+        self.__level_loader = LevelLoader()
+        if load_async:
+            self.__level_loader.load(maze_size, MAZE_SEED, maze_file)
+            self.__maze = Maze(1, build_rooms=not ROOM_STREAMING)
+        elif maze_file is not None:
+            self.__maze = Maze.load(maze_file, build_rooms=not ROOM_STREAMING)
+        else:
+            self.__maze = Maze(maze_size, MAZE_SEED, build_rooms=not ROOM_STREAMING)
+        self.__maze_graph = MazeGraph(self.__maze)
         self.__event_manager = EventManager()
+        self.__input_handler = InputHandler(self.__event_manager)
+        self.__event_manager.add_handler(EventNumber.QUIT, self.__quit)
+        #  the next level is a new random maze of the size the game started with, or the same maze file again
+        self.__event_manager.add_handler(EventNumber.NEXT_LEVEL, self.load_level, maze_size, None, maze_file)
+        self.__collision_world = CollisionWorld()
 
         self.__game_clock = GlobalTime()
         self.__is_playing = True
+        self.__phase_times: Dict[str, float] = {}  # how long (in ms) every phase of the last frame took
+        self.__previous_positions: Dict = {}  # the position of every moving object before the last tick
+        self.__projectile_system = ProjectileSystem()
+        self.__enemy_crowd = EnemyCrowd()
+        self.__profiler = FrameProfiler()
+        self.__renderer = None
+        if not headless:
+            self.__renderer = Renderer(self.__screen, self.__camera, ObjectMetaClass.render_indexes,
+                                       ObjectMetaClass.ui_objects, ObjectMetaClass.layer_caches,
+                                       array_systems=(self.__enemy_crowd, self.__projectile_system),
+                                       profiler=self.__profiler if self.__profiler.details else None)
 
-        for room_position in self.__maze.generate_visual_rooms(SPACE_BETWEEN_ROOM,START_ROOM_POSITION):
-            #  create all the rooms in the game
-            Object(room_position[0], room_position[1], ROOM_SIZE, ROOM_SIZE, WHITE, RenderLayer.ROOM, RenderMode.NORMAL)
+        self.__bullet_pool = BulletPool()
 
-        for mini_map_room_position in self.__maze.generate_visual_rooms(SPACE_BETWEEN_ROOM_MINI_MAP,START_MINI_MAP_ROOM_POSITION):
-            #  create all the rooms in the mini map
-            Object(mini_map_room_position[0], mini_map_room_position[1], ROOM_MINI_MAP_SIZE, ROOM_MINI_MAP_SIZE,RED,RenderLayer.MINI_MAP,RenderMode.UI)
+        self.__room_streamer = None
+        self.__level_objects: List[Object] = []  # the rooms (without streaming) and the mini map of the maze
+        self.__build_level()
 
-        p = Player(WINDOW_WIDTH/2,WINDOW_HEIGHT/2)
+        self.__player = Player(WINDOW_WIDTH/2,WINDOW_HEIGHT/2)
+        self.__simulation_scope = SimulationScope()
+        self.__spawn_enemies(START_ROOM_ENEMIES)
+        ObjectMetaClass.flush_destroy_queue()  # doors that were removed while the maze was built
 
 
+    @property
+    def maze(self):
+        return self.__maze
+
+    @property
+    def maze_graph(self):
+        #  its tracked field leads to the room of the player
+        return self.__maze_graph
+
+    def __build_level(self) -> None:
+        #  creates the game objects of the maze
+        self.__level_objects = []
+        self.__room_streamer = None
+        if ROOM_STREAMING:
+            #  the rooms near the camera are created now, and the rest when the camera gets near them
+            self.__room_streamer = RoomStreamer(self.__maze)
+            self.__room_streamer.update(self.__camera)
+        else:
+            self.__maze.build_rooms()
+            for room_position in self.__maze.generate_visual_rooms(SPACE_BETWEEN_ROOM,START_ROOM_POSITION):
+                #  create all the rooms in the game
+                self.__level_objects.append(Object(room_position[0], room_position[1], ROOM_SIZE, ROOM_SIZE, WHITE,
+                                                   RenderLayer.ROOM, RenderMode.NORMAL))
+
+        for mini_map_room_position in self.__get_mini_map_rooms_on_screen():
+            #  create the rooms of the mini map that can be seen
+            self.__level_objects.append(Object(mini_map_room_position[0], mini_map_room_position[1], ROOM_MINI_MAP_SIZE,
+                                               ROOM_MINI_MAP_SIZE, RED, RenderLayer.MINI_MAP, RenderMode.UI))
+
+    def __get_mini_map_rooms_on_screen(self) -> List[Tuple[int, int]]:
+        """
+        Returns the position of the rooms of the mini map that touch the screen. The mini map doesn't move (only the
+        icon of the player does), so the other rooms are never seen and the objects don't grow with the maze
+        """
+        screen_rect = self.__screen.get_rect() if self.__screen is not None else \
+            pg.Rect(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT)
+        x, y, _ = self.__maze.get_room_arrays()
+        x = x.astype(np.int64) * SPACE_BETWEEN_ROOM_MINI_MAP + START_MINI_MAP_ROOM_POSITION[0]
+        y = y.astype(np.int64) * SPACE_BETWEEN_ROOM_MINI_MAP + START_MINI_MAP_ROOM_POSITION[1]
+        on_screen = (x + ROOM_MINI_MAP_SIZE > screen_rect.left) & (x < screen_rect.right)
+        on_screen &= (y + ROOM_MINI_MAP_SIZE > screen_rect.top) & (y < screen_rect.bottom)
+        return list(zip(x[on_screen].tolist(), y[on_screen].tolist()))
+
+    def __destroy_level(self) -> None:
+        if self.__room_streamer is not None:
+            self.__room_streamer.unload_all()
+        else:
+            for room in self.__maze.rooms:
+                room.destroy()
+        for level_object in self.__level_objects:
+            level_object.destroy()
+        self.__level_objects = []
+
+    def load_level(self, maze_size: int = MAZE_SIZE, seed=None, maze_file: str = None) -> None:
+        #  starts loading a level in the background, it replaces the current level between frames when it is ready
+        self.__level_loader.load(maze_size, seed, maze_file)
+
+    def __swap_loaded_level(self) -> None:
+        #  called between frames, the level the worker finished replaces the current one (the main loop never waits)
+        level = self.__level_loader.get_loaded_level()
+        if level is None:
+            return
+        self.__destroy_level()
+        self.__maze, self.__maze_graph = level
+        self.__projectile_system.clear()
+        self.__bullet_pool.release_all()
+        self.__enemy_crowd.clear()
+        #  the player starts the new level in its first room
+        self.__camera.update(int(WINDOW_WIDTH / 2), int(WINDOW_HEIGHT / 2))
+        self.__player.reset(WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2)
+        self.__build_level()
+        self.__spawn_enemies(START_ROOM_ENEMIES)
+        self.__previous_positions = {}
+        ObjectMetaClass.flush_destroy_queue()
+
+    def __spawn_enemies(self, count: int) -> None:
+        #  the enemies are spread over the room of the player
+        room_x, room_y, room_width, room_height = get_room_rect(get_room_index(*self.__player.rect.center))
+        rng = np.random.default_rng(MAZE_SEED)
+        self.__enemy_crowd.spawn_many(rng.uniform(room_x, room_x + room_width - ENEMY_SIZE, count),
+                                      rng.uniform(room_y, room_y + room_height - ENEMY_SIZE, count))
+
     def start(self):
+        if self.__headless:
+            raise RuntimeError("a headless game can't be started, use run_ticks")
         self.__game_loop()
+        self.close()
+        if self.__profiler.enabled and PROFILER_DUMP_PATH is not None:
+            self.__profiler.dump(PROFILER_DUMP_PATH)
+
+    def run_ticks(self, ticks: int, scripted_input: Dict[int, Iterable[pg.event.Event]] = None) -> float:
+        """
+        Runs the simulation for the number of ticks as fast as possible, without rendering and without waiting
+        for the real time of the ticks (every tick is a frame of the profiler). Returns how many ticks were
+        simulated in a second
+        Attributes:
+            scripted_input - maps a tick to the pygame events that are given to the game before it
+        """
+        scripted_input = scripted_input if scripted_input is not None else {}
+        ticks_done = 0
+        start = time.perf_counter()
+        while ticks_done < ticks and self.__is_playing:
+            for event in scripted_input.get(ticks_done, ()):
+                self.__input_handler.handle_event(event)
+            tick_start = time.perf_counter()
+            self.__game_clock.simulate_tick()
+            phase_times = self.__tick(dict.fromkeys(("events", "update", "late update"), 0))
+            self.__swap_loaded_level()
+            if self.__profiler.enabled:
+                self.__end_profiler_frame(phase_times, tick_start)
+            ticks_done += 1
+        return ticks_done / max(time.perf_counter() - start, 1e-9)
 
 
     def __update(self):
 
+        #  the timers that ended are activated first, only they are touched
+        self.__game_clock.run_timers()
+
         #collision
-        for sprite in ObjectMetaClass.sprites:
-            sprite.collider.get_collision(ObjectMetaClass.sprites)
+        self.__collision_world.detect_collisions(ObjectMetaClass.sprites)
 
 
+    def __tick(self, phase_times: Dict[str, float]) -> Dict[str, float]:
+        #  runs the phases of a tick and adds how long (in ms) every phase took to phase_times
+        phase_start = time.perf_counter()
+        self.__events()
+        events_end = time.perf_counter()
+        self.__update()
+        update_end = time.perf_counter()
+        self.__late_update()
+        late_update_end = time.perf_counter()
+
+        phase_times["events"] += (events_end - phase_start) * 1000
+        phase_times["update"] += (update_end - events_end) * 1000
+        phase_times["late update"] += (late_update_end - update_end) * 1000
+        return phase_times
+
     def __late_update(self):
 
-        self.__game_clock.update()
+        #  only the objects near the player are updated
+        self.__simulation_scope.update(*self.__player.rect.center)
+        self.__maze_graph.track_target(self.__simulation_scope.center_room_index)
+        if self.__profiler.details:
+            self.__update_objects_profiled()
+        else:
+            for render_layer in ObjectMetaClass.objects:
+                for obj in self.__simulation_scope.get_objects_to_update(render_layer):
+                    obj.update()
+
+        #  all the projectiles are moved together, before the collisions of this frame are reset
+        self.__projectile_system.update(ObjectMetaClass.sprites)
+        self.__enemy_crowd.update(ObjectMetaClass.sprites, self.__player, self.__projectile_system)
+        for sprite in self.__enemy_crowd.hits:
+            if sprite.alive and sprite.collider.mask == CollisionMasks.BULLET:
+                #  a bullet that killed an enemy goes back to the pool
+                self.__bullet_pool.release(sprite)
+
+        self.__collision_world.reset_collisions()
+
+        self.__bullet_pool.flush()
+
+        if self.__room_streamer is not None:
+            #  rooms are created and destroyed only after all the objects were updated
+            self.__room_streamer.update(self.__camera)
 
-        for objects_in_layer in ObjectMetaClass.objects.values():
-            for obj in objects_in_layer:
+        #  the objects that were destroyed in this frame are removed only now, when nothing iterates over them
+        ObjectMetaClass.flush_destroy_queue()
+
+    def __update_objects_profiled(self):
+        #  the same as updating the objects, but the profiler gets how long the objects of every type took
+        type_times: Dict[type, float] = defaultdict(float)
+        for render_layer in ObjectMetaClass.objects:
+            for obj in self.__simulation_scope.get_objects_to_update(render_layer):
+                update_start = time.perf_counter()
                 obj.update()
+                type_times[type(obj)] += time.perf_counter() - update_start
+        for object_type, update_time in type_times.items():
+            self.__profiler.add_sample(f"type {object_type.__name__}", update_time * 1000)
 
-        for sprite in ObjectMetaClass.sprites:
-            sprite.collider.late_update()
+    def __end_profiler_frame(self, phase_times: Dict[str, float], frame_start: float) -> None:
+        for phase, phase_time in phase_times.items():
+            self.__profiler.add_sample(phase, phase_time)
+        self.__profiler.end_frame((time.perf_counter() - frame_start) * 1000)
 
     def __render(self):
-        self.__screen.fill(BLACK)
-        for render_layer in RenderLayer:
-            for object in ObjectMetaClass.objects[render_layer]:
-                object.render(self.__screen,self.__camera)
-
-        self.__debug()
+        if self.__game_clock.fixed_timestep:
+            #  the moving objects are drawn between the last two ticks, so they move smoothly in any FPS
+            self.__renderer.render(self.__debug, self.__game_clock.interpolation, self.__previous_positions)
+        else:
+            self.__renderer.render(self.__debug)
 
-        pg.display.flip()
+    def __save_previous_positions(self):
+        self.__previous_positions = {obj: (obj.rect.x, obj.rect.y) for render_layer in RenderLayer
+                                     if render_layer not in STATIC_RENDER_LAYERS
+                                     for obj in ObjectMetaClass.objects[render_layer]}
 
-    def __debug(self):
-        game_debug.debugging("fps: " + str(self.__game_clock.get_fps_rate()),self.__font)
-        game_debug.debugging("avg fps: " + str(self.__game_clock.get_avg_fps_rate()),self.__font, y = 40)
+    def __debug(self) -> List[pg.Rect]:
+        #  returns the parts of the screen the debug info was drawn on
+        render_stats = [("drawn: ", self.__renderer.drawn_objects_count),
+                        (" culled: ", self.__renderer.culled_objects_count),
+                        (" draw calls: ", self.__renderer.draw_calls_count)]
+        if self.__renderer.dirty_rects_mode:
+            render_stats.append((" dirty rects: ", self.__renderer.dirty_rects_count))
+        objects_count = sum(len(objects_in_layer) for objects_in_layer in ObjectMetaClass.objects.values())
+        debug_rects = [
+            game_debug.debugging_stats([("fps: ", self.__game_clock.get_fps_rate())], self.__font),
+            game_debug.debugging_stats([("avg fps: ", self.__game_clock.get_avg_fps_rate())], self.__font, y = 40),
+            game_debug.debugging_stats([("objects: ", objects_count), (" sprites: ", len(ObjectMetaClass.sprites)),
+                                        (" collision pairs: ", self.__collision_world.pair_checks),
+                                        (" bullets: ", f"{self.__bullet_pool.active_bullets_count}/"
+                                                       f"{self.__bullet_pool.size}"),
+                                        (" pool hit rate: ", f"{self.__bullet_pool.hit_rate:.0%}"),
+                                        (" projectiles: ", len(self.__projectile_system)),
+                                        (" enemies: ", len(self.__enemy_crowd))], self.__font,
+                                       y = 70),
+            game_debug.debugging_stats(render_stats, self.__font, y = 100),
+            game_debug.debugging_stats([(f"{phase}: ", f"{phase_time:.2f}ms ") for phase, phase_time in
+                                        self.__phase_times.items()], self.__font, y = 130)]
+        if self.__profiler.enabled:
+            frame_percentiles = "/".join(f"{percentile:.2f}" for percentile in self.__profiler.get_percentiles())
+            debug_rects.append(game_debug.debugging_stats([("frame p50/p95/p99: ", f"{frame_percentiles}ms")],
+                                                          self.__font, y = 160))
+        if self.__level_loader.loading:
+            debug_rects.append(game_debug.debugging_stats([("loading level: ", f"{self.__level_loader.progress:.0%}")],
+                                                          self.__font, y = 190))
+        return debug_rects
 
     def __events(self):
-        self.__keys_to_events()
-        pg.event.pump()
-
-    def __keys_to_events(self):
-        keys_pressed = pg.event.get()
-        for event in keys_pressed:
-            if event.type == pg.KEYDOWN:
-                if event.key == pg.K_SPACE:
-                    self.__event_manager.fire_event(EventNumber.SPACE_BAR_CLICK)
-
-        keys = pg.key.get_pressed()
-        if keys[pg.K_a]:
-            self.__event_manager.fire_event(EventNumber.A_KEY_HOLD)
-        if keys[pg.K_w]:
-            self.__event_manager.fire_event(EventNumber.W_KEY_HOLD)
-        if keys[pg.K_d]:
-            self.__event_manager.fire_event(EventNumber.D_KEY_HOLD)
-        if keys[pg.K_s]:
-            self.__event_manager.fire_event(EventNumber.S_KEY_HOLD)
+        #  the input is turned into events, and all the events of the frame are fired together
+        self.__input_handler.process_input()
+        self.__event_manager.dispatch_events()
+
+    def close(self) -> None:
+        #  stops the level that is loading, so the worker doesn't keep running after the game (also for run_ticks)
+        self.__level_loader.cancel()
+
+    def __quit(self):
+        self.__is_playing = False
+        self.close()
 
     def __game_loop(self):
         while self.__is_playing:
-            self.__events()
-            self.__update()
+            #  the simulation runs as many ticks as the time of the frame has (with a fixed timestep), and then
+            #  the frame is rendered once
+            frame_start = time.perf_counter()
+            self.__game_clock.update()
+            phase_times = dict.fromkeys(("events", "update", "late update"), 0)
+            while self.__is_playing and self.__game_clock.consume_tick():
+                if self.__game_clock.fixed_timestep:
+                    self.__save_previous_positions()
+                self.__tick(phase_times)
+            self.__swap_loaded_level()
+
+            render_start = time.perf_counter()
             self.__render()
-            self.__late_update()
+            phase_times["render"] = (time.perf_counter() - render_start) * 1000
+            self.__phase_times = phase_times
+            if self.__profiler.enabled:
+                self.__end_profiler_frame(phase_times, frame_start)
 
 if __name__ == "__main__":
-    Game().start()
+    Game(load_async=True).start()
@@ -1,9 +1,81 @@
+from collections import OrderedDict
+from typing import Tuple
 import pygame as pg
+from game_settings import DEBUG_TEXT_CACHE_SIZE
 
 
-def debugging(info, font, y = 10, x = 10):
+class TextCache:
+    """
+    Keeps the surfaces of texts that were rendered, so the same text is rendered by the font only once.
+    When the cache is full the text that wasn't used for the longest time is removed
+    """
+
+    def __init__(self, max_size: int = DEBUG_TEXT_CACHE_SIZE):
+        self.__max_size = max_size
+        self.__surfaces: OrderedDict[Tuple, pg.Surface] = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+
+    @property
+    def hits(self):
+        return self.__hits
+
+    @property
+    def misses(self):
+        return self.__misses
+
+    def __len__(self):
+        return len(self.__surfaces)
+
+    def get_text(self, text: str, font: pg.font.Font, color='White') -> pg.Surface:
+        key = (text, font, color)
+        surface = self.__surfaces.get(key)
+        if surface is not None:
+            self.__hits += 1
+            self.__surfaces.move_to_end(key)
+            return surface
+
+        self.__misses += 1
+        surface = font.render(text, True, color)
+        self.__surfaces[key] = surface
+        if len(self.__surfaces) > self.__max_size:
+            self.__surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.__surfaces.clear()
+
+
+text_cache = TextCache()
+
+
+def debugging(info, font, y = 10, x = 10) -> pg.Rect:
+    #  returns the part of the screen the info was drawn on
     display_surface = pg.display.get_surface()
-    debug_surf = font.render(info, True, 'White')
+    debug_surf = text_cache.get_text(info, font)
     debug_rect = debug_surf.get_rect(topleft = (x,y))
     pg.draw.rect(display_surface,'Black',debug_rect)
     display_surface.blit(debug_surf,debug_rect)
+    return debug_rect
+
+
+def debugging_stats(stats, font, y = 10, x = 10) -> pg.Rect:
+    """
+    Same as debugging but for values that change often (like the fps).
+    The labels are rendered once and the values are drawn from the cached surfaces of their characters,
+    so new values don't render anything new
+    Attributes:
+        stats - (label, value) pairs that are drawn one after the other in the same line
+    """
+    display_surface = pg.display.get_surface()
+    surfaces = []
+    for label, value in stats:
+        surfaces.append(text_cache.get_text(label, font))
+        surfaces.extend(text_cache.get_text(character, font) for character in str(value))
+    debug_rect = pg.Rect(x, y, sum(surface.get_width() for surface in surfaces),
+                         max((surface.get_height() for surface in surfaces), default=0))
+    pg.draw.rect(display_surface,'Black',debug_rect)
+    for surface in surfaces:
+        display_surface.blit(surface, (x, y))
+        x += surface.get_width()
+    return debug_rect
@@ -4,50 +4,178 @@ from game_settings import PLAYER_SPEED, GREEN, GUN_COLOR, START_MINI_MAP_ROOM_PO
     ROOM_MINI_MAP_SIZE, \
     WINDOW_WIDTH, WINDOW_HEIGHT, WHITE, RED, BLACK, GREEN, MAZE_SIZE, SPACE_BETWEEN_ROOM, \
     ROOM_SIZE, START_ROOM_POSITION, DOOR_WIDTH, DOOR_HEIGHT, SPACE_BETWEEN_ROOM_MINI_MAP, ROOM_MINI_MAP_SIZE, \
-    START_MINI_MAP_ROOM_POSITION, PLAYER_WIDTH, PLAYER_HEIGHT
+    START_MINI_MAP_ROOM_POSITION, PLAYER_WIDTH, PLAYER_HEIGHT, RENDER_CELL_SIZE, BULLET_SIZE, BULLET_SPEED, \
+    BULLET_LIFETIME, BULLET_POOL_SIZE, VECTORIZED_PROJECTILES, \
+    PROJECTILE_SPEED
 from collision import Collider, CollisionMasks
-from typing import Tuple, List, DefaultDict
+from typing import Tuple, List, DefaultDict, Dict
 from camera import Camera
 from event_system import EventManager, EventNumber
+from game_time import Timer
+from meta_classes import Singleton
+from projectiles import ProjectileSystem
+from utilitiez import get_room_index, get_room_rect
 from renderer import RenderLayer
 from collections import defaultdict
+from itertools import chain, count
+from object_list import ObjectList
+from spatial_hash import SpatialHash
 import numpy as np
 
 from enums import DoorPlacement
 
 
+def get_door_room_offset(placement: DoorPlacement) -> Tuple[float, float]:
+    #  returns the offset position of the door in the room (not in pixels), for example in the door is TOP it will be (0.5,0)
+    if placement == DoorPlacement.TOP:
+        return 0.5, 0
+    if placement == DoorPlacement.RIGHT:
+        return 1 - np.round(DOOR_HEIGHT / WINDOW_HEIGHT,
+                            2), 0.5  # some calculation to adjust the door to be in a good position
+    if placement == DoorPlacement.BOTTOM:
+        return 0.5, 1 - np.round(DOOR_HEIGHT / WINDOW_HEIGHT,
+                                 2)  # some calculation to adjust the door to be in a good position
+    if placement == DoorPlacement.LEFT:
+        return 0, 0.5
+
+
 class ObjectMetaClass(type):
     """
-    An metaclass for all objects in game
+    An metaclass for all objects in game.
+    Keeps the registries of the objects in the game, an object is removed from them in O(1),
+    and only when the destroy queue is flushed (once a frame) so the registries can be iterated safely
     """
-    objects: DefaultDict[RenderLayer, List] = defaultdict(lambda: [])
-    sprites: List = []
+    objects: DefaultDict[RenderLayer, ObjectList] = defaultdict(ObjectList)
+    sprites: ObjectList = ObjectList()
+    #  the NORMAL objects of every layer by their position in the world, used to find the objects in the camera view
+    render_indexes: DefaultDict[RenderLayer, SpatialHash] = defaultdict(lambda: SpatialHash(RENDER_CELL_SIZE))
+    ui_objects: DefaultDict[RenderLayer, ObjectList] = defaultdict(ObjectList)  # UI objects are always rendered
+    layer_caches: Dict = {}  # maps static layers to their cache (TileCache or SurfaceCache), set by the game
+    objects_by_type: DefaultDict[type, ObjectList] = defaultdict(ObjectList)  # the objects of every class
+    #  the objects of every layer that have an update (their class overrides Object.update), the rest are never updated
+    updatable_objects: DefaultDict[RenderLayer, ObjectList] = defaultdict(ObjectList)
+    handles: Dict[int, "Object"] = {}  # maps the handle of every object in the game to the object
+    handles_counter = count()
+    destroy_queue: Dict["Object", None] = {}  # the objects that will be removed when the queue is flushed, in order
 
     def __call__(cls, *args, **kwargs):
         new_obj = super(ObjectMetaClass, cls).__call__(*args, **kwargs)
-        cls.objects[new_obj.layer].append(new_obj)
-        if isinstance(new_obj, Sprite):
-            cls.sprites.append(new_obj)
+        ObjectMetaClass.register(new_obj)
         return new_obj
 
+    @staticmethod
+    def register(obj):
+        #  adds the object to the game, every object is registered when it is created
+        ObjectMetaClass.handles[obj.handle] = obj
+        ObjectMetaClass.objects[obj.layer].append(obj)
+        ObjectMetaClass.objects_by_type[type(obj)].append(obj)
+        if type(obj).update is not Object.update:
+            ObjectMetaClass.updatable_objects[obj.layer].append(obj)
+        if obj.render_mode == RenderMode.NORMAL:
+            ObjectMetaClass.render_indexes[obj.layer].insert(obj, *obj.rect)
+        else:
+            ObjectMetaClass.ui_objects[obj.layer].append(obj)
+        if isinstance(obj, Sprite):
+            ObjectMetaClass.sprites.append(obj)
+        obj.mark_dirty()
+
+    @staticmethod
+    def get_object(handle: int):
+        #  returns the object of the handle, or None if the object was destroyed
+        return ObjectMetaClass.handles.get(handle)
+
+    @staticmethod
+    def get_objects_of_type(object_type: type):
+        #  returns all the objects of the class and its subclasses, only the lists of those classes are iterated
+        return chain.from_iterable(objects for registered_type, objects in ObjectMetaClass.objects_by_type.items()
+                                   if issubclass(registered_type, object_type))
+
+    @staticmethod
+    def flush_destroy_queue() -> None:
+        """
+        Removes the destroyed objects from the game, should be called once a frame after all the objects were updated
+        """
+        destroy_queue = ObjectMetaClass.destroy_queue
+        while destroy_queue:
+            #  destroying an object may destroy other objects, they are removed too
+            ObjectMetaClass.destroy_queue = {}
+            for obj in destroy_queue:
+                obj._remove_from_game()
+            destroy_queue = ObjectMetaClass.destroy_queue
+
 
 class Object(metaclass=ObjectMetaClass):
+    #  there are thousands of rooms and doors in big mazes, so the hot types keep their attributes in slots
+    __slots__ = ("_rect", "_color", "_render_layer", "_render_mode", "_handle")
+
     def __init__(self, x, y, width, height, color, render_layer: RenderLayer, render_mode: RenderMode):
         self._rect = pg.Rect((x, y), (width, height))
         self._color = color
         self._render_layer = render_layer
         self._render_mode = render_mode
+        self._handle = next(ObjectMetaClass.handles_counter)  # stays the same even if the object is revived
 
     @property
     def rect(self):
         return self._rect
 
+    @property
+    def handle(self):
+        return self._handle
+
+    @property
+    def alive(self):
+        #  if the object is in the game and wasn't destroyed
+        return self._handle in ObjectMetaClass.handles and self not in ObjectMetaClass.destroy_queue
+
+    @property
+    def render_mode(self):
+        return self._render_mode
+
+    @property
+    def color(self):
+        return self._color
+
+    def mark_dirty(self):
+        #  if the layer of the object is cached, the cache will draw the object again
+        layer_cache = ObjectMetaClass.layer_caches.get(self._render_layer)
+        if layer_cache is not None:
+            layer_cache.mark_dirty(self, self._rect)
+
     def destroy(self):
+        #  the object stays in the game until the end of the frame (ObjectMetaClass.flush_destroy_queue)
+        if self._handle in ObjectMetaClass.handles:
+            ObjectMetaClass.destroy_queue[self] = None
+
+    def _remove_from_game(self):
+        self.mark_dirty()
+        del ObjectMetaClass.handles[self._handle]
         ObjectMetaClass.objects[self.layer].remove(self)
+        ObjectMetaClass.objects_by_type[type(self)].remove(self)
+        if type(self).update is not Object.update:
+            ObjectMetaClass.updatable_objects[self.layer].remove(self)
+        if self._render_mode == RenderMode.NORMAL:
+            ObjectMetaClass.render_indexes[self.layer].remove(self)
+        else:
+            ObjectMetaClass.ui_objects[self.layer].remove(self)
+
+    def revive(self):
+        #  adds a destroyed object back to the game (used by object pools)
+        if self in ObjectMetaClass.destroy_queue:
+            del ObjectMetaClass.destroy_queue[self]  # it wasn't removed yet
+        elif self._handle not in ObjectMetaClass.handles:
+            ObjectMetaClass.register(self)
 
     def set_position(self, new_x, new_y):
         self._rect.x = new_x
         self._rect.y = new_y
+        self._moved()
+
+    def _moved(self):
+        #  should be called every time the rect of the object is changed, so the object can still be found in the view
+        if self._render_mode == RenderMode.NORMAL:
+            ObjectMetaClass.render_indexes[self._render_layer].move(self, *self._rect)
+        self.mark_dirty()
 
     def update(self):
         pass
@@ -70,24 +198,33 @@ class Object(metaclass=ObjectMetaClass):
 
 
 class Sprite(Object):
+    __slots__ = ("_collider",)
+
     def __init__(self, x, y, width, height, color, render_layer: RenderLayer, render_mode: RenderMode,
                  mask: CollisionMasks,
-                 masks_to_collide_with: Tuple[CollisionMasks]):
+                 masks_to_collide_with: Tuple[CollisionMasks], static: bool = False):
         super().__init__(x, y, width, height, color, render_layer, render_mode)
         self._collider = Collider(x, y, width, height, mask,
-                                  masks_to_collide_with)  # The collider is an
+                                  masks_to_collide_with, self, static)  # The collider is an
         # object that gives you the information about the sprite collision
 
     @property
     def collider(self):
         return self._collider
 
-    def destroy(self):
-        super().destroy()
+    def _remove_from_game(self):
+        super()._remove_from_game()
         ObjectMetaClass.sprites.remove(self)
+        self._collider.destroy()
+
+    def revive(self):
+        super().revive()
+        self._collider.add_to_world()
 
 
 class Door(Sprite):
+    __slots__ = ("__placement",)
+
     def __init__(self, x, y, width, height, color, door_placement: DoorPlacement):
         self.__placement = door_placement
 
@@ -104,24 +241,14 @@ class Door(Sprite):
             x -= DOOR_WIDTH / 2
 
         super().__init__(x, y, width, height, color, RenderLayer.DOOR, RenderMode.NORMAL, CollisionMasks.DOOR,
-                         (CollisionMasks.PLAYER,))
+                         (CollisionMasks.PLAYER,), static=True)
 
     @property
     def placement(self):
         return self.__placement
 
     def get_door_room_offset(self) -> Tuple[float, float]:
-        #  returns the offset position of the door in the room (not in pixels), for example in the door is TOP it will be (0.5,0)
-        if self.__placement == DoorPlacement.TOP:
-            return 0.5, 0
-        if self.__placement == DoorPlacement.RIGHT:
-            return 1 - np.round(DOOR_HEIGHT / WINDOW_HEIGHT,
-                                2), 0.5  # some calculation to adjust the door to be in a good position
-        if self.__placement == DoorPlacement.BOTTOM:
-            return 0.5, 1 - np.round(DOOR_HEIGHT / WINDOW_HEIGHT,
-                                     2)  # some calculation to adjust the door to be in a good position
-        if self.__placement == DoorPlacement.LEFT:
-            return 0, 0.5
+        return get_door_room_offset(self.__placement)
 
     def update(self):
         CAMERA_OFFSET_ADJUSMENT = DOOR_WIDTH  # some adjusments to the camera y position
@@ -149,13 +276,16 @@ class Door(Sprite):
 
 
 class Player(Sprite):
+    #  the icon starts in the middle of the first room of the mini map
+    ICON_START_POSITION = (START_MINI_MAP_ROOM_POSITION[0] + (ROOM_MINI_MAP_SIZE - PLAYER_ICON_SIZE) / 2,
+                           START_MINI_MAP_ROOM_POSITION[1] + (ROOM_MINI_MAP_SIZE - PLAYER_ICON_SIZE) / 2)
+
     def __init__(self, x, y):
         super().__init__(x, y, PLAYER_WIDTH, PLAYER_HEIGHT, GREEN, RenderLayer.PLAYER, RenderMode.NORMAL,
                          CollisionMasks.PLAYER, (CollisionMasks.DOOR,))
         self.__vx, self.__vy = 0, 0  # The velocity of the object
-        self.__player_icon = Object(START_MINI_MAP_ROOM_POSITION[0] + (ROOM_MINI_MAP_SIZE - PLAYER_ICON_SIZE) / 2,
-                                    START_MINI_MAP_ROOM_POSITION[1] + (ROOM_MINI_MAP_SIZE - PLAYER_ICON_SIZE) / 2
-                                    , PLAYER_ICON_SIZE, PLAYER_ICON_SIZE, GREEN, RenderLayer.MINI_MAP, RenderMode.UI)
+        self.__player_icon = Object(*Player.ICON_START_POSITION, PLAYER_ICON_SIZE, PLAYER_ICON_SIZE, GREEN,
+                                    RenderLayer.PLAYER_ICON, RenderMode.UI)
         self.__gun = Gun(x + PLAYER_WIDTH / 4, y + PLAYER_HEIGHT / 4, PLAYER_WIDTH / 2, PLAYER_HEIGHT / 2, GUN_COLOR,
                          RenderLayer.GUN,
                          RenderMode.NORMAL, self)
@@ -191,6 +321,7 @@ class Player(Sprite):
         self._rect.y += int(self.__vy)  # Move the bullet
         self.__vx -= int(self.__vx)  # Subtract from velocity
         self.__vy -= int(self.__vy)  # Subtract from velocity
+        self._moved()
 
     def __move(self):
         if self.__vx != 0 and self.__vy != 0:
@@ -198,9 +329,18 @@ class Player(Sprite):
             self.__vx *= 0.707
             self.__vy *= 0.707
 
+    def reset(self, x, y):
+        #  places the player in the first room of a new level, and its icon in the first room of the mini map
+        self.set_position(x, y)
+        self.collider.update(x, y)
+        self.__vx, self.__vy = 0, 0
+        self.__player_icon.set_position(*Player.ICON_START_POSITION)
+        self.__gun.stick_to_holder()
+
     def pass_trought_door(self, new_x, new_y, camera_x_offset, camera_y_offset):
         self._rect.x = new_x
         self._rect.y = new_y
+        self._moved()
 
         self.collider.update(new_x, new_y)  # Place the camera in the middle of the room
         camera = Camera()
@@ -218,32 +358,147 @@ class Gun(Object):
     def stick_to_holder(self):
         self._rect.x = self.__x_offset_from_holder + self.__holder.rect.x
         self._rect.y = self.__y_offset_from_holder + self.__holder.rect.y
+        self._moved()
 
     def __fire(self):
-        Bullet(self.rect.x, self.rect.y, 10, 10, BLACK, CollisionMasks.BULLET, (),
-               pg.mouse.get_pos()[0] + Camera().screen_offset()[0],
-               pg.mouse.get_pos()[1] + + Camera().screen_offset()[1], 10)
+        target_x = pg.mouse.get_pos()[0] + Camera().screen_offset()[0]
+        target_y = pg.mouse.get_pos()[1] + Camera().screen_offset()[1]
+        if VECTORIZED_PROJECTILES:
+            ProjectileSystem().fire(self.rect.x, self.rect.y, target_x, target_y, PROJECTILE_SPEED)
+        else:
+            BulletPool().fire(self.rect.x, self.rect.y, target_x, target_y, BULLET_SPEED)
 
 
 class Bullet(Sprite):
+    __slots__ = ("__lifetime", "__lifetime_timer", "__vx", "__vy", "__speed", "__movement_direction_x",
+                 "__movement_direction_y")
+
     def __init__(self, x, y, width, height, color, mask: CollisionMasks, masks_to_collide_with: Tuple[CollisionMasks],
-                 target_x, target_y, speed):
+                 target_x, target_y, speed, lifetime: float = BULLET_LIFETIME):
         super().__init__(x, y, width, height, color, RenderLayer.BULLET, RenderMode.NORMAL, mask, masks_to_collide_with)
+        self.__lifetime = lifetime  # How many seconds the bullet lives before it is destroyed
+        self.__lifetime_timer = None
+        self.fire(x, y, target_x, target_y, speed)
+
+    def fire(self, x, y, target_x, target_y, speed):
+        """
+        Shoot the bullet from (x, y) towards the target, a pooled bullet is fired again instead of creating a new one.
+        Should be called before the bullet is added to the game (created or revived)
+        """
+        self._rect.x, self._rect.y = x, y
+        if self._handle in ObjectMetaClass.handles:
+            #  a bullet released in this frame is still in the game, it is moved in the render index by hand. Other
+            #  bullets get their place in the index when they are registered
+            self._moved()
+        self.collider.update(self._rect.x, self._rect.y)
         self.__vx, self.__vy = 0, 0  # The velocity of the object
         self.__speed = speed
-        self.__movement_direction_x = (target_x - x) / (abs(target_x - x) + abs(target_y - y))
-        self.__movement_direction_y = (target_y - y) / (abs(target_x - x) + abs(target_y - y))
+        if self.__lifetime_timer is None:
+            self.__lifetime_timer = Timer(self.__lifetime, self.__lifetime_over)
+        else:
+            self.__lifetime_timer.restart_timer()
+        distance = abs(target_x - x) + abs(target_y - y)
+        if distance == 0:
+            distance = 1  # the target is on the bullet, so the bullet doesn't move
+        self.__movement_direction_x = (target_x - x) / distance
+        self.__movement_direction_y = (target_y - y) / distance
 
     def update(self):
+        if not self.alive:
+            return  # released by its lifetime timer in this tick, it is still in the update lists until the flush
         self.__vx += self.__movement_direction_x * self.__speed
         self.__vy += self.__movement_direction_y * self.__speed
         self.__movement()
 
+        bullet_pool = BulletPool()
+        if self.collider.collision is not None or not self._rect.colliderect(bullet_pool.room_rect):
+            bullet_pool.release(self)
+
+    def destroy(self):
+        #  a destroyed bullet doesn't need its lifetime anymore, it starts again when the bullet is fired again
+        self.__lifetime_timer.cancel_timer()
+        super().destroy()
+
+    def __lifetime_over(self):
+        BulletPool().release(self)
+
     def __movement(self):
         self._rect.x += int(self.__vx)  # Move the bullet
         self._rect.y += int(self.__vy)  # Move the bullet
         self.__vx -= int(self.__vx)  # Subtract from velocity
         self.__vy -= int(self.__vy)  # Subtract from velocity
+        self._moved()
+        self.collider.update(self._rect.x, self._rect.y)
 
-    def __del__(self):
-        print("I'm being automatically destroyed. Goodbye!")
+
+class BulletPool(metaclass=Singleton):
+    """
+    Keeps the bullets that are not used, so firing a bullet reuses an old bullet instead of creating a new one.
+    A bullet is released back to the pool when its lifetime is over, when it leaves the room of the camera
+    or when it collides with something. The pool grows when all of its bullets are used
+    """
+
+    def __init__(self, size: int = BULLET_POOL_SIZE):
+        self.__free_bullets: List[Bullet] = []
+        self.__active_bullets_count = 0
+        self.__size = 0
+        self.__hits = 0  # how many times a fired bullet was taken from the pool
+        self.__misses = 0  # how many times a new bullet had to be created
+        self.__room_rect = pg.Rect(get_room_rect(get_room_index(Camera().x, Camera().y)))
+        for _ in range(size):
+            bullet = self.__create_bullet(0, 0, 0, 0, BULLET_SPEED)
+            bullet.destroy()
+            self.__free_bullets.append(bullet)
+
+    @property
+    def size(self):
+        #  how many bullets were created
+        return self.__size
+
+    @property
+    def active_bullets_count(self):
+        return self.__active_bullets_count
+
+    @property
+    def hit_rate(self):
+        fired_bullets = self.__hits + self.__misses
+        return self.__hits / fired_bullets if fired_bullets else 1
+
+    @property
+    def room_rect(self):
+        #  bullets that leave this rect (the room of the camera) are released
+        return self.__room_rect
+
+    def __create_bullet(self, x, y, target_x, target_y, speed) -> Bullet:
+        self.__size += 1
+        return Bullet(x, y, BULLET_SIZE, BULLET_SIZE, BLACK, CollisionMasks.BULLET,
+                      (CollisionMasks.WALLS, CollisionMasks.BUILDINGS, CollisionMasks.ENEMY), target_x, target_y, speed)
+
+    def fire(self, x, y, target_x, target_y, speed) -> Bullet:
+        self.__active_bullets_count += 1
+        if not self.__free_bullets:
+            self.__misses += 1
+            return self.__create_bullet(x, y, target_x, target_y, speed)
+
+        self.__hits += 1
+        bullet = self.__free_bullets.pop()
+        bullet.fire(x, y, target_x, target_y, speed)
+        bullet.revive()
+        return bullet
+
+    def release(self, bullet: Bullet) -> None:
+        #  the bullet is removed from the game when the destroy queue is flushed, but it can be fired again before that
+        if not bullet.alive:
+            return  # it was already released
+        bullet.destroy()
+        self.__free_bullets.append(bullet)
+        self.__active_bullets_count -= 1
+
+    def release_all(self) -> None:
+        #  releases every bullet that was fired (like when the level changes)
+        for bullet in list(ObjectMetaClass.get_objects_of_type(Bullet)):
+            self.release(bullet)
+
+    def flush(self) -> None:
+        #  should be called once a frame after all the objects were updated, the camera may be in a new room
+        self.__room_rect = pg.Rect(get_room_rect(get_room_index(Camera().x, Camera().y)))
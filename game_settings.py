@@ -1,4 +1,8 @@
-FPS = 500
+FPS = 500  # the highest rate the game renders in, with a fixed timestep it doesn't change the speed of the game
+FIXED_TIMESTEP = True  # the simulation runs TICK_RATE ticks in a second, no matter how many frames are rendered
+TICK_RATE = 120
+MAX_TICKS_PER_FRAME = 8  # a slow frame runs at most this many ticks, so the game can't fall behind forever
+MAX_INTERPOLATION_DISTANCE = 100  # objects that moved more than this in a tick (through a door) are not interpolated
 WINDOW_WIDTH =  1920
 WINDOW_HEIGHT = 1080
 
@@ -11,6 +15,13 @@ GUN_COLOR = (100,100,100)
 CAMERA_SPEED=20
 
 MAZE_SIZE = 10
+MAZE_SEED = None  # set a number to get the same maze in every run
+MAZE_FILE = None  # a maze file (see maze_file.py) to load instead of generating a maze of MAZE_SIZE rooms
+ROOM_STREAMING = True  # only the rooms near the camera are created, so big mazes cost as much as small ones
+ROOM_VIEW_DISTANCE = 1  # how many rooms in every direction from the camera's room are created when streaming
+SIMULATION_DISTANCE = 1  # how many rooms in every direction from the player's room are updated every tick
+FAR_ROOMS_UPDATE_INTERVAL = 0  # the objects of the other rooms are updated once in this many ticks, 0 freezes them
+DISTANCE_FIELD_CACHE_SIZE = 16  # how many distance fields (paths to a room) the maze graph keeps
 DOOR_WIDTH = 60
 DOOR_HEIGHT = 20
 ROOM_MINI_MAP_SIZE = 10
@@ -26,4 +37,41 @@ DOOR_SIZE = 20
 PLAYER_SPEED = 5
 PLAYER_ICON_SIZE = 6
 PLAYER_HEIGHT = 30
-PLAYER_WIDTH = 30
\ No newline at end of file
+PLAYER_WIDTH = 30
+
+COLLISION_MODE = "spatial_hash"  # "brute_force" checks every sprite against every sprite (useful to compare results)
+#  "vectorized" checks all the sprites together with numpy, best when there are thousands of moving sprites
+COLLISION_CELL_SIZE = SPACE_BETWEEN_ROOM // 2  # a room and the space next to it fall in their own cells
+
+RENDER_CELL_SIZE = SPACE_BETWEEN_ROOM // 2  # the cell size of the spatial index of every render layer
+CULLING_MARGIN = 100  # objects that are this many pixels outside of the camera view are still rendered
+
+LAYER_CACHE = True  # static layers (rooms, doors, mini map) are drawn from cached surfaces
+LAYER_CACHE_TILE_SIZE = 512  # the size in pixels of a cached tile of the world
+LAYER_CACHE_MAX_TILES = 48  # how many tiles every layer keeps (the tiles that were used last)
+LAYER_CACHE_COLORKEY = (255, 0, 255)  # the transparent color of the cached surfaces, objects can't use this color
+
+DISPLAY_UPDATE_MODE = "flip"  # "dirty_rects" updates only the parts of the screen that changed (faster on slow machines)
+MAX_DIRTY_RECTS = 100  # when more parts of the screen changed the whole screen is drawn again
+
+BULLET_SIZE = 10
+BULLET_SPEED = 10
+BULLET_LIFETIME = 2  # how many seconds a bullet lives if it didn't hit anything or left the room
+BULLET_POOL_SIZE = 64  # how many bullets are created when the game starts, more are created when they are all used
+PROJECTILE_SPEED = 600  # how many pixels a projectile of the ProjectileSystem moves in a second
+VECTORIZED_PROJECTILES = True  # bullets are kept in the numpy arrays of the ProjectileSystem instead of Bullet objects
+
+ENEMY_SIZE = 12
+ENEMY_COLOR = (150, 0, 150)
+ENEMY_SPEED = 150  # the highest speed of an enemy in pixels in a second
+ENEMY_ACCELERATION = 600  # how fast (pixels in a second squared) an enemy can change its velocity
+ENEMY_SEPARATION_CELL_SIZE = 2 * ENEMY_SIZE  # the size of the cells the crowd is counted in to keep enemies apart
+ENEMY_SEPARATION_STRENGTH = 80  # how hard (pixels in a second) enemies are pushed away from crowded places
+START_ROOM_ENEMIES = 0  # how many enemies are spawned in the first room when the game starts
+
+DEBUG_TEXT_CACHE_SIZE = 256  # how many rendered texts the debug overlay keeps
+
+PROFILER = False  # measures how long every phase of the game loop takes, shown in the debug overlay
+PROFILER_DETAILS = False  # the profiler measures every render layer and object type too (slows the game down)
+PROFILER_FRAMES = 1000  # how many frames the profiler keeps
+PROFILER_DUMP_PATH = None  # the file the profiler writes its frames to when the game ends (.json or .csv)
@@ -1,28 +1,159 @@
+from heapq import heappush, heappop, heapify
+from itertools import count
+from typing import Callable, List, Optional
 import pygame as pg
 from meta_classes import Singleton
-from game_settings import FPS
+from game_settings import FPS, FIXED_TIMESTEP, TICK_RATE, MAX_TICKS_PER_FRAME
 
 
-class GlobalTime(metaclass=Singleton):
+TIMER_TOLERANCE = 1e-9  # the running time is a sum of ticks, so a timer of whole ticks may be a bit after its tick
+
+
+class TimerScheduler:
     """
-    GlobalTime stores important time varibles
+    Activates the timers when the running time reaches them.
+    The timers are kept in a min heap by the running time they end in, so every update touches only the timers
+    that ended. A timer that is paused or canceled is only marked as removed in the heap (O(1)), and the marked
+    entries are dropped when they reach the top of the heap or when they are most of the heap
     """
+
     def __init__(self):
+        self.__heap: List[List] = []  # [end time, order, timer or None if it was removed]
+        self.__order = count()  # timers that end in the same time are activated by the order they were added
+        self.__removed_count = 0  # how many entries of the heap were removed
+        self.__now = 0
+
+    def __len__(self):
+        #  how many timers are waiting
+        return len(self.__heap) - self.__removed_count
+
+    @property
+    def now(self):
+        #  the running time of the last update
+        return self.__now
+
+    def _push(self, timer: "Timer", end_time: float) -> List:
+        #  returns the entry of the timer, it is needed to remove the timer
+        entry = [end_time, next(self.__order), timer]
+        heappush(self.__heap, entry)
+        return entry
+
+    def _remove(self, entry: List) -> None:
+        entry[2] = None
+        self.__removed_count += 1
+        if self.__removed_count > len(self.__heap) // 2:
+            #  rebuilt in place, an update that runs now (a timer that removes other timers) keeps using the heap
+            self.__heap[:] = [entry for entry in self.__heap if entry[2] is not None]
+            heapify(self.__heap)
+            self.__removed_count = 0
+
+    def update(self, now: float) -> None:
+        #  activates all the timers that end until now (in running time), by the time they end in
+        self.__now = now
+        heap = self.__heap
+        while heap and heap[0][0] <= now + TIMER_TOLERANCE:
+            end_time, _, timer = heappop(heap)
+            if timer is None:
+                self.__removed_count -= 1
+                continue
+            timer._activate(end_time)
+
+    def clear(self) -> None:
+        self.__heap.clear()
+        self.__removed_count = 0
+
+
+class GlobalTime(metaclass=Singleton):
+    """
+    GlobalTime stores important time varibles.
+    With a fixed timestep the time of every frame is added to an accumulator, and the simulation runs a tick
+    (of 1 / tick_rate seconds) for every whole tick in it, so the speed of the game doesn't depend on the FPS
+    Attributes:
+        fixed_timestep - if the simulation runs in ticks of the same length
+        tick_rate - how many ticks the simulation runs in a second
+    """
+    def __init__(self, fixed_timestep: bool = FIXED_TIMESTEP, tick_rate: int = TICK_RATE):
         self.__delta_time = 0  # Fixed time that doesn't affected by the FPS rate
         self.__running_time = 0  # How much time does the game run
         self.__clock = pg.time.Clock()
-        self.__sum_fps = 0
-        self.__frames_passed = 1
+        self.__sum_frame_time = 0  # the real time of all the frames
+        self.__frames_passed = 0
         self._running_time = self.__delta_time
+        self.__fixed_timestep = fixed_timestep
+        self.__tick_time = 1 / tick_rate
+        self.__frame_time = 0  # the real time of the last frame
+        self.__accumulator = 0  # the time that wasn't simulated yet
+        self.__ticks = 0  # how many ticks were simulated
+        self.__frame_ticked = False  # without a fixed timestep every frame is one tick
+        self.__timer_scheduler = TimerScheduler()
 
     def update(self):
-        self.__delta_time = self.__clock.tick(FPS) / 1000
-        self.__running_time += self.delta_time
+        #  should be called once at the start of every frame
+        self.__frame_time = self.__clock.tick(FPS) / 1000
         self.__frames_passed += 1
-        self.__sum_fps += self.get_fps_rate()
+        self.__sum_frame_time += self.__frame_time
+        if not self.__fixed_timestep:
+            self.__delta_time = self.__frame_time
+            self.__running_time += self.delta_time
+            self.__frame_ticked = False
+            return
+        self.__delta_time = self.__tick_time
+        #  after a long frame (like loading) the game doesn't try to catch up with all of it
+        self.__accumulator = min(self.__accumulator + self.__frame_time, self.__tick_time * MAX_TICKS_PER_FRAME)
+
+    def consume_tick(self) -> bool:
+        """
+        Returns if another tick should be simulated in this frame (always one tick without a fixed timestep)
+        """
+        if not self.__fixed_timestep:
+            if self.__frame_ticked:
+                return False
+            self.__frame_ticked = True
+            self.__ticks += 1
+            return True
+        if self.__accumulator < self.__tick_time:
+            return False
+        self.__accumulator -= self.__tick_time
+        self.__running_time += self.__tick_time
+        self.__ticks += 1
+        return True
+
+    def simulate_tick(self) -> None:
+        #  moves the time one tick forward without waiting for it (the simulation runs faster than the real time)
+        self.__delta_time = self.__tick_time
+        self.__running_time += self.__tick_time
+        self.__ticks += 1
+
+    def run_timers(self) -> None:
+        #  activates the timers that ended until the running time, should be called once a tick
+        self.__timer_scheduler.update(self.__running_time)
+
+    @property
+    def timer_scheduler(self):
+        return self.__timer_scheduler
+
+    @property
+    def fixed_timestep(self):
+        return self.__fixed_timestep
+
+    @property
+    def interpolation(self):
+        #  how far the rendered frame is between the last two ticks (0 is the previous tick and 1 is the last tick)
+        if not self.__fixed_timestep:
+            return 1
+        return self.__accumulator / self.__tick_time
+
+    @property
+    def frame_time(self):
+        return self.__frame_time
+
+    @property
+    def ticks(self):
+        return self.__ticks
 
     @property
     def delta_time(self):
+        #  the time of a tick, or of the last frame without a fixed timestep
         return self.__delta_time
 
     @property
@@ -36,36 +167,91 @@ class GlobalTime(metaclass=Singleton):
         return int(self.__clock.get_fps())
 
     def get_avg_fps_rate(self):
-        return int(self.__sum_fps/self.__frames_passed)
+        #  the frames divided by their time, an average of the fps of every frame would hide the slow frames
+        if self.__sum_frame_time == 0:
+            return 0
+        return int(self.__frames_passed / self.__sum_frame_time)
 
 class Timer:
     """
-    The Timer used to determain time of actions in game, like the time between gun shoot for example
+    The Timer used to determain time of actions in game, like the time between gun shoot for example.
+    The timer starts when it is created, and its scheduler activates it when the time is over (it is not polled)
     Attributes:
-        function_to_activate - which function to call when the timer reaches to zero
+        start_time - how many seconds (of running time) until the timer ends
+        function_to_activate - which function to call when the timer reaches to zero, called with args
+        repeat - the timer starts again every time it ends (until it is canceled)
+        scheduler - the TimerScheduler of the timer, the scheduler of the GlobalTime if None
     """
+    __slots__ = ("__time", "__function_to_activate", "__args", "__repeat", "__scheduler", "__entry", "__pause",
+                 "__finish", "__time_left_when_paused")
 
-    def __init__(self, start_time, function_to_activate=None):
+    def __init__(self, start_time, function_to_activate: Optional[Callable] = None, *args, repeat: bool = False,
+                 scheduler: TimerScheduler = None):
+        if repeat and start_time <= 0:
+            raise ValueError(f"a repeating timer must have a positive time got {start_time}")
         self.__time = start_time
         self.__function_to_activate = function_to_activate
+        self.__args = args
+        self.__repeat = repeat
+        self.__scheduler = scheduler if scheduler is not None else GlobalTime().timer_scheduler
         self.__pause = False  # Timer can be paused
         self.__finish = False
+        self.__time_left_when_paused = 0
+        self.__entry = self.__scheduler._push(self, self.__scheduler.now + start_time)
 
     @property
     def finish(self):
         return self.__finish
 
-    def update_timer(self):
-        if not self.__pause:
-            if self.__time <= 0:
-                self.__finish = True
-                if self.__function_to_activate is not None:
-                    self.__function_to_activate()
-            else:
-                self.__time -= GlobalTime.delta_time()
+    @property
+    def paused(self):
+        return self.__pause
+
+    @property
+    def time_left(self):
+        if self.__pause:
+            return self.__time_left_when_paused
+        if self.__entry is None:
+            return 0
+        return max(self.__entry[0] - self.__scheduler.now, 0)
+
+    def _activate(self, end_time: float):
+        #  called by the scheduler when the time is over
+        if self.__repeat:
+            #  the next end is counted from this end, so a repeating timer doesn't drift
+            self.__entry = self.__scheduler._push(self, end_time + self.__time)
+        else:
+            self.__entry = None
+            self.__finish = True
+        if self.__function_to_activate is not None:
+            self.__function_to_activate(*self.__args)
 
     def pause_timer(self):
+        if self.__pause or self.__entry is None:
+            return
+        self.__time_left_when_paused = self.time_left
+        self.__scheduler._remove(self.__entry)
+        self.__entry = None
         self.__pause = True
 
     def resume_timer(self):
+        if not self.__pause:
+            return
+        self.__pause = False
+        self.__entry = self.__scheduler._push(self, self.__scheduler.now + self.__time_left_when_paused)
+
+    def cancel_timer(self):
+        #  the timer ends without activating its function
+        if self.__entry is not None:
+            self.__scheduler._remove(self.__entry)
+            self.__entry = None
         self.__pause = False
+        self.__finish = True
+
+    def restart_timer(self, start_time=None):
+        #  starts the timer again (from start_time if given), so a timer can be reused instead of creating a new one
+        self.cancel_timer()
+        if start_time is not None:
+            self.__time = start_time
+        self.__finish = False
+        self.__entry = self.__scheduler._push(self, self.__scheduler.now + self.__time)
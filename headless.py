@@ -0,0 +1,69 @@
+"""
+Runs the game without a display for a number of ticks and reports how many ticks were simulated in a second,
+for example:
+    python headless.py --ticks 10000 --maze-size 100000 --script walk_right.json --profile profile.csv
+    python headless.py --ticks 10000 --maze-file big.maze
+The script is a json list of the input events and the tick they are given in, for example:
+    [{"tick": 0, "type": "key_down", "key": "d"}, {"tick": 120, "type": "key_up", "key": "d"}]
+"""
+import argparse
+import json
+from collections import defaultdict
+from typing import DefaultDict, Dict, List
+import pygame as pg
+
+from game import Game
+from game_objects import ObjectMetaClass
+from game_settings import MAZE_SIZE
+from profiler import FrameProfiler
+
+SCRIPT_EVENT_TYPES = {"key_down": pg.KEYDOWN, "key_up": pg.KEYUP, "mouse_click": pg.MOUSEBUTTONDOWN, "quit": pg.QUIT}
+
+
+def load_scripted_input(path: str) -> Dict[int, List[pg.event.Event]]:
+    #  returns the pygame events of every tick in the script
+    with open(path) as script_file:
+        script = json.load(script_file)
+    scripted_input: DefaultDict[int, List[pg.event.Event]] = defaultdict(list)
+    for entry in script:
+        event_type = SCRIPT_EVENT_TYPES[entry["type"]]
+        if event_type in (pg.KEYDOWN, pg.KEYUP):
+            event = pg.event.Event(event_type, key=pg.key.key_code(entry["key"]))
+        elif event_type == pg.MOUSEBUTTONDOWN:
+            event = pg.event.Event(event_type, pos=tuple(entry.get("pos", (0, 0))), button=entry.get("button", 1))
+        else:
+            event = pg.event.Event(event_type)
+        scripted_input[entry["tick"]].append(event)
+    return scripted_input
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ticks", type=int, default=1000)
+    parser.add_argument("--maze-size", type=int, default=MAZE_SIZE)
+    parser.add_argument("--maze-file", help="a maze file to load instead of generating a maze")
+    parser.add_argument("--save-maze", help="writes the maze of the run to this maze file")
+    parser.add_argument("--script", help="a json file of scripted input")
+    parser.add_argument("--profile", help="profiles every tick and writes the ticks to this file (.json or .csv)")
+    parser.add_argument("--profile-details", action="store_true", help="profiles every object type too")
+    args = parser.parse_args()
+
+    profiler = FrameProfiler(enabled=args.profile is not None, details=args.profile_details,
+                             frames=max(args.ticks, 1))
+    game = Game(headless=True, maze_size=args.maze_size, maze_file=args.maze_file)
+    if args.save_maze:
+        game.maze.save(args.save_maze)
+    scripted_input = load_scripted_input(args.script) if args.script else None
+    ticks_per_second = game.run_ticks(args.ticks, scripted_input)
+    game.close()
+    objects_count = sum(len(objects_in_layer) for objects_in_layer in ObjectMetaClass.objects.values())
+    print(f"ticks: {args.ticks} ticks per second: {ticks_per_second:.1f} objects: {objects_count} "
+          f"sprites: {len(ObjectMetaClass.sprites)}")
+    if args.profile:
+        tick_percentiles = "/".join(f"{percentile:.3f}" for percentile in profiler.get_percentiles())
+        print(f"tick p50/p95/p99: {tick_percentiles}ms")
+        profiler.dump(args.profile)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+from typing import Callable, Dict, Set
+import pygame as pg
+from event_system import EventManager, EventNumber, MousePayload
+from meta_classes import Singleton
+
+#  the default tables of the game, more bindings can be added with the bind methods of the InputHandler
+DEFAULT_KEY_DOWN_BINDINGS: Dict[int, EventNumber] = {pg.K_SPACE: EventNumber.SPACE_BAR_CLICK,
+                                                     pg.K_n: EventNumber.NEXT_LEVEL}
+DEFAULT_KEY_HOLD_BINDINGS: Dict[int, EventNumber] = {pg.K_a: EventNumber.A_KEY_HOLD, pg.K_w: EventNumber.W_KEY_HOLD,
+                                                     pg.K_d: EventNumber.D_KEY_HOLD, pg.K_s: EventNumber.S_KEY_HOLD}
+DEFAULT_EVENT_TYPE_BINDINGS: Dict[int, EventNumber] = {pg.QUIT: EventNumber.QUIT,
+                                                       pg.MOUSEBUTTONDOWN: EventNumber.MOUSE_CLICK}
+#  creates the payload of the pygame event types that are fired with a payload
+EVENT_TYPE_PAYLOADS: Dict[int, Callable[[pg.event.Event], object]] = {
+    pg.MOUSEBUTTONDOWN: lambda event: MousePayload(event.pos, event.button)}
+
+
+class InputHandler(metaclass=Singleton):
+    """
+    Turns the pygame input into events of the EventManager by looking them up in tables,
+    so the cost of every input doesn't depend on how many keys are bound.
+    The events are queued, the EventManager fires them when it dispatches its events
+    Attributes:
+        event_manager - the EventManager the events are queued in
+    """
+
+    def __init__(self, event_manager: EventManager = None):
+        self.__event_manager = event_manager if event_manager is not None else EventManager()
+        self.__key_down_bindings: Dict[int, EventNumber] = dict(DEFAULT_KEY_DOWN_BINDINGS)
+        self.__key_hold_bindings: Dict[int, EventNumber] = dict(DEFAULT_KEY_HOLD_BINDINGS)
+        self.__event_type_bindings: Dict[int, EventNumber] = dict(DEFAULT_EVENT_TYPE_BINDINGS)
+        self.__held_keys: Set[int] = set()  # only the held keys that are bound, so every frame checks only them
+
+    def bind_key_down(self, key: int, event_number: EventNumber) -> None:
+        self.__key_down_bindings[key] = event_number
+
+    def bind_key_hold(self, key: int, event_number: EventNumber) -> None:
+        self.__key_hold_bindings[key] = event_number
+
+    def bind_event_type(self, event_type: int, event_number: EventNumber) -> None:
+        self.__event_type_bindings[event_type] = event_number
+
+    def unbind_key(self, key: int) -> None:
+        self.__key_down_bindings.pop(key, None)
+        self.__key_hold_bindings.pop(key, None)
+        self.__held_keys.discard(key)
+
+    def unbind_event_type(self, event_type: int) -> None:
+        self.__event_type_bindings.pop(event_type, None)
+
+    def process_input(self) -> None:
+        #  queues the events of the input since the last call, should be called once a frame
+        event_manager = self.__event_manager
+        for event in pg.event.get():
+            self.handle_event(event)
+        for key in self.__held_keys:
+            event_manager.queue_event(self.__key_hold_bindings[key])
+
+    def handle_event(self, event: pg.event.Event) -> None:
+        #  queues the event of a single pygame event (also used to give the game scripted input)
+        event_type = event.type
+        if event_type == pg.KEYDOWN:
+            event_number = self.__key_down_bindings.get(event.key)
+            if event_number is not None:
+                self.__event_manager.queue_event(event_number)
+            if event.key in self.__key_hold_bindings:
+                self.__held_keys.add(event.key)
+        elif event_type == pg.KEYUP:
+            self.__held_keys.discard(event.key)
+        elif event_type == pg.WINDOWFOCUSLOST:
+            self.__held_keys.clear()  # the key up events of the held keys will not arrive
+
+        event_number = self.__event_type_bindings.get(event_type)
+        if event_number is not None:
+            create_payload = EVENT_TYPE_PAYLOADS.get(event_type)
+            self.__event_manager.queue_event(event_number, create_payload(event) if create_payload else None)
@@ -0,0 +1,198 @@
+import math
+from collections import OrderedDict, defaultdict
+from typing import DefaultDict, Dict, Iterable, List, Optional, Set, Tuple
+import pygame as pg
+from game_settings import LAYER_CACHE_TILE_SIZE, LAYER_CACHE_MAX_TILES, LAYER_CACHE_COLORKEY
+from spatial_hash import SpatialHash
+
+TileIndex = Tuple[int, int]
+
+
+def _create_layer_surface(width, height) -> pg.Surface:
+    #  a surface that only shows the pixels that were drawn on it
+    surface = pg.Surface((width, height))
+    if pg.display.get_surface() is not None:
+        surface = surface.convert()  # same pixel format as the screen makes the blits faster
+    surface.fill(LAYER_CACHE_COLORKEY)
+    surface.set_colorkey(LAYER_CACHE_COLORKEY, pg.RLEACCEL)
+    return surface
+
+
+class TileCache:
+    """
+    Caches a static layer of NORMAL objects as tiles (surfaces) of the world.
+    Every frame the tiles in the camera view are drawn with one blit each, and a tile is drawn again
+    only after one of its objects was marked dirty. Only the last used tiles are kept, so the world can be huge
+    Attributes:
+        render_index - the spatial index of the objects in the layer
+    """
+
+    def __init__(self, render_index: SpatialHash, tile_size: int = LAYER_CACHE_TILE_SIZE,
+                 max_tiles: int = LAYER_CACHE_MAX_TILES):
+        self.__render_index = render_index
+        self.__tile_size = tile_size
+        self.__max_tiles = max_tiles
+        self.__tiles: OrderedDict[TileIndex, Optional[pg.Surface]] = OrderedDict()  # None is an empty tile
+        self.__tile_objects: Dict[TileIndex, List] = {}  # the objects that were drawn on every tile
+        self.__object_tiles: DefaultDict[object, Set[TileIndex]] = defaultdict(set)  # the tiles every object is on
+        self.__changed_rects: List[pg.Rect] = []  # the parts of the world that changed since the last frame
+
+    @property
+    def tiles_count(self):
+        return len(self.__tiles)
+
+    def __get_tiles_in_rect(self, rect: pg.Rect) -> Iterable[TileIndex]:
+        tile_size = self.__tile_size
+        for column in range(math.floor(rect.left / tile_size), math.floor((rect.right - 1) / tile_size) + 1):
+            for row in range(math.floor(rect.top / tile_size), math.floor((rect.bottom - 1) / tile_size) + 1):
+                yield column, row
+
+    def __rasterize_tile(self, tile_index: TileIndex) -> Optional[pg.Surface]:
+        tile_rect = self.__get_tile_rect(tile_index)
+        objects_on_tile = [obj for obj in self.__render_index.query(*tile_rect) if tile_rect.colliderect(obj.rect)]
+        self.__tile_objects[tile_index] = objects_on_tile
+        if not objects_on_tile:
+            return None
+
+        tile = _create_layer_surface(self.__tile_size, self.__tile_size)
+        for obj in objects_on_tile:
+            self.__object_tiles[obj].add(tile_index)
+            pg.draw.rect(tile, obj.color, obj.rect.move(-tile_rect.x, -tile_rect.y))
+        return tile
+
+    def __get_tile(self, tile_index: TileIndex) -> Optional[pg.Surface]:
+        if tile_index in self.__tiles:
+            self.__tiles.move_to_end(tile_index)
+            return self.__tiles[tile_index]
+
+        tile = self.__rasterize_tile(tile_index)
+        self.__tiles[tile_index] = tile
+        if len(self.__tiles) > self.__max_tiles:
+            self.__drop_tile(next(iter(self.__tiles)), False)  # the tile that wasn't used for the longest time
+        return tile
+
+    def __get_tile_rect(self, tile_index: TileIndex) -> pg.Rect:
+        return pg.Rect(tile_index[0] * self.__tile_size, tile_index[1] * self.__tile_size, self.__tile_size,
+                       self.__tile_size)
+
+    def __drop_tile(self, tile_index: TileIndex, changed: bool = True) -> None:
+        #  changed - the tile is dropped because it looks different now (and not only to free memory)
+        tile = self.__tiles.pop(tile_index, False)
+        if tile is False:
+            return  # the tile is not cached
+        if changed and tile is not None:
+            self.__changed_rects.append(self.__get_tile_rect(tile_index))
+        for obj in self.__tile_objects.pop(tile_index):
+            object_tiles = self.__object_tiles[obj]
+            object_tiles.discard(tile_index)
+            if not object_tiles:
+                del self.__object_tiles[obj]
+
+    def mark_dirty(self, obj, rect: pg.Rect) -> None:
+        """
+        The tiles the object was drawn on and the tiles in the rect will be drawn again when they are shown
+        Attributes:
+            obj - the object that changed
+            rect - the current rect of the object
+        """
+        for tile_index in list(self.__object_tiles.get(obj, ())):
+            self.__drop_tile(tile_index)
+        for tile_index in self.__get_tiles_in_rect(rect):
+            self.__drop_tile(tile_index)
+        self.__changed_rects.append(rect.copy())
+
+    def pop_changed_rects(self) -> List[pg.Rect]:
+        #  returns the parts of the world (in world position) that look different since the last call
+        changed_rects, self.__changed_rects = self.__changed_rects, []
+        return changed_rects
+
+    def clear(self) -> None:
+        self.__tiles.clear()
+        self.__tile_objects.clear()
+        self.__object_tiles.clear()
+        self.__changed_rects.clear()
+
+    def render(self, screen: pg.Surface, view_rect: pg.Rect, screen_offset: Tuple[int, int]) -> int:
+        """
+        Draws the tiles in the view rect and returns how many tiles were drawn
+        Attributes:
+            view_rect - the part of the world to draw (in world position)
+            screen_offset - the world position of the top left corner of the screen
+        """
+        blits = []
+        for tile_index in self.__get_tiles_in_rect(view_rect):
+            tile = self.__get_tile(tile_index)
+            if tile is not None:
+                blits.append((tile, (tile_index[0] * self.__tile_size - screen_offset[0],
+                                     tile_index[1] * self.__tile_size - screen_offset[1])))
+        screen.blits(blits, doreturn=False)
+        return len(blits)
+
+
+class SurfaceCache:
+    """
+    Caches a static layer of UI objects (like the mini map) as one surface that is drawn again only when it is dirty.
+    Only the part of the layer on the screen is kept, so a huge layer costs as much as the screen at most
+    Attributes:
+        objects - the list of the objects in the layer, the list is kept updated by the game
+    """
+
+    def __init__(self, objects: List):
+        self.__objects = objects
+        self.__surface: Optional[pg.Surface] = None
+        self.__position = (0, 0)
+        self.__clip_rect: Optional[pg.Rect] = None  # the part of the screen the surface was drawn for
+        self.__dirty = True
+        self.__changed_rects: List[pg.Rect] = []  # the parts of the screen that changed since the last frame
+
+    def mark_dirty(self, obj=None, rect: pg.Rect = None) -> None:
+        #  the arguments are the same as TileCache.mark_dirty, the whole surface is drawn again anyway
+        if not self.__dirty and self.__surface is not None:
+            self.__changed_rects.append(self.__surface.get_rect(topleft=self.__position))
+        self.__dirty = True
+
+    def pop_changed_rects(self) -> List[pg.Rect]:
+        #  returns the parts of the screen that look different since the last call
+        if self.__dirty:
+            #  the screen the layer was drawn on last, or the display before the first frame
+            clip_rect = self.__clip_rect
+            if clip_rect is None and pg.display.get_surface() is not None:
+                clip_rect = pg.display.get_surface().get_rect()
+            self.__rasterize(clip_rect)
+        changed_rects, self.__changed_rects = self.__changed_rects, []
+        return changed_rects
+
+    def clear(self) -> None:
+        self.mark_dirty()
+
+    def __rasterize(self, clip_rect: Optional[pg.Rect]) -> None:
+        """
+        Draws the objects that touch the clip rect (the screen) on a surface of the part of their bounding rect
+        in it, without a clip rect all the objects are drawn
+        """
+        self.__dirty = False
+        self.__clip_rect = clip_rect
+        objects = self.__objects
+        if clip_rect is not None:
+            objects = [objects[index] for index in clip_rect.collidelistall([obj.rect for obj in objects])]
+        if not objects:
+            self.__surface = None
+            return
+        bounding_rect = objects[0].rect.unionall([obj.rect for obj in objects[1:]])
+        if clip_rect is not None:
+            bounding_rect = bounding_rect.clip(clip_rect)
+        self.__surface = _create_layer_surface(bounding_rect.width, bounding_rect.height)
+        self.__position = bounding_rect.topleft
+        for obj in objects:
+            pg.draw.rect(self.__surface, obj.color, obj.rect.move(-bounding_rect.x, -bounding_rect.y))
+        self.__changed_rects.append(bounding_rect)
+
+    def render(self, screen: pg.Surface, view_rect: pg.Rect = None, screen_offset: Tuple[int, int] = None) -> int:
+        #  UI objects are in screen position so the view rect and the screen offset are not used
+        clip_rect = screen.get_rect()
+        if self.__dirty or clip_rect != self.__clip_rect:
+            self.__rasterize(clip_rect)
+        if self.__surface is None:
+            return 0
+        screen.blit(self.__surface, self.__position)
+        return 1
@@ -0,0 +1,117 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import NamedTuple, Optional
+from maze import Maze
+from maze_graph import MazeGraph
+from meta_classes import Singleton
+from game_settings import MAZE_SIZE
+
+MAZE_PROGRESS_PART = 0.9  # the part of the progress that generating the maze takes, the rest is building its graph
+
+
+class LevelLoadCancelled(Exception):
+    """Raised in the worker when the load of a level was cancelled, so the generation stops early"""
+
+
+class Level(NamedTuple):
+    maze: Maze  # only the grid data, the rooms are created when the level is swapped in
+    maze_graph: MazeGraph
+
+
+class LoadProgress:
+    """
+    The progress of a single load, written by the worker and read by the game
+    """
+    __slots__ = ("__fraction", "__cancelled")
+
+    def __init__(self):
+        self.__fraction = 0.0
+        self.__cancelled = False
+
+    @property
+    def fraction(self):
+        #  how much of the level was loaded (0 to 1)
+        return self.__fraction
+
+    @property
+    def cancelled(self):
+        return self.__cancelled
+
+    def cancel(self) -> None:
+        self.__cancelled = True
+
+    def report(self, fraction: float) -> None:
+        #  called by the worker, stops the load if it was cancelled
+        if self.__cancelled:
+            raise LevelLoadCancelled()
+        self.__fraction = fraction
+
+
+def build_level(maze_size: int, seed, maze_file: Optional[str], progress: LoadProgress) -> Level:
+    """
+    Generates (or opens) the maze of a level and builds its graph, runs in the worker so it doesn't create
+    any game objects
+    """
+    if maze_file is not None:
+        maze = Maze.load(maze_file)
+    else:
+        maze = Maze(maze_size, seed, build_rooms=False,
+                    on_progress=lambda fraction: progress.report(fraction * MAZE_PROGRESS_PART))
+    progress.report(MAZE_PROGRESS_PART)
+    maze_graph = MazeGraph(maze)
+    progress.report(1)
+    return Level(maze, maze_graph)
+
+
+class LevelLoader(metaclass=Singleton):
+    """
+    Loads the next level in a worker thread while the game keeps running, the game takes the level between frames
+    with get_loaded_level when it is ready.
+    A thread is used and not a process, so the loaded maze reaches the game without copying all of its rooms and the
+    progress is shared without a pipe. Only one level is loaded at a time, a new load cancels the last one
+    """
+
+    def __init__(self):
+        self.__executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="level_loader")
+        self.__future: Optional[Future] = None
+        self.__progress: Optional[LoadProgress] = None
+
+    @property
+    def loading(self):
+        #  if a level is loaded or waits to be taken
+        return self.__future is not None
+
+    @property
+    def progress(self):
+        return self.__progress.fraction if self.__progress is not None else 0.0
+
+    def load(self, maze_size: int = MAZE_SIZE, seed=None, maze_file: str = None) -> None:
+        """
+        Starts loading a level in the worker
+        Attributes:
+            maze_size - how many rooms the maze of the level has
+            seed - the seed of the maze, None for a random maze
+            maze_file - a maze file to open instead of generating a maze (maze_size and seed are not used)
+        """
+        self.cancel()
+        self.__progress = LoadProgress()
+        self.__future = self.__executor.submit(build_level, maze_size, seed, maze_file, self.__progress)
+
+    def cancel(self) -> None:
+        #  the worker stops in its next progress report, its level is never taken
+        if self.__future is not None:
+            self.__progress.cancel()
+            self.__future.cancel()
+        self.__future = None
+        self.__progress = None
+
+    def get_loaded_level(self) -> Optional[Level]:
+        """
+        Returns the loaded level once (None while it is loading or if nothing is loaded), an error of the worker is
+        raised here
+        """
+        if self.__future is None or not self.__future.done():
+            return None
+        future = self.__future
+        self.__future = None
+        self.__progress = None
+        return future.result()
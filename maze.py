@@ -1,18 +1,20 @@
 import math
 import random
 import enum
-from typing import List, Dict, Tuple
+from typing import Callable, List, Dict, Tuple, Mapping
 import logging
+import numpy as np
 from game_objects import Sprite
 from renderer import RenderMode, RenderLayer
 from game_settings import WINDOW_WIDTH, WINDOW_HEIGHT, WHITE, RED, BLACK, GREEN, MAZE_SIZE, SPACE_BETWEEN_ROOM, \
     ROOM_SIZE, START_ROOM_POSITION, DOOR_WIDTH, DOOR_HEIGHT, SPACE_BETWEEN_ROOM_MINI_MAP, ROOM_MINI_MAP_SIZE, \
     START_MINI_MAP_ROOM_POSITION
 
-from game_objects import Door
+from game_objects import Door, get_door_room_offset
 from collision import Collider, CollisionMasks
 
 from enums import DoorPlacement
+from maze_file import MappedRoomDoors, read_maze_file, write_maze_file
 
 
 def get_opposite_door_placement(
@@ -27,19 +29,52 @@ def get_opposite_door_placement(
         return DoorPlacement.RIGHT
 
 
+#  every door placement gets its own bit, so all the doors of a room fit in one 4 bit integer (the door mask)
+DOOR_BITS: Dict[DoorPlacement, int] = {placement: 1 << placement.value for placement in DoorPlacement if
+                                       placement != DoorPlacement.NO_PLACEMENT}
+
+
+def get_door_placements(door_mask: int) -> List[DoorPlacement]:
+    #  returns the placements of all the doors in the door mask
+    return [placement for placement, bit in DOOR_BITS.items() if door_mask & bit]
+
+
+class MazeAlgorithm(enum.Enum):
+    RANDOM_RETRY = "random_retry"  # the original algorithm, picks random rooms until a new room can be added
+    FRONTIER = "frontier"  # keeps a list of the free places next to the maze, every room is added in O(1)
+
+
 class Room:
-    def __init__(self,room_placement):
+    def __init__(self, room_placement, rng: random.Random = random):
         self.__doors: List[Door] = []
         self.__room_placement = room_placement
+        self.__rng = rng
 
     @property
     def doors(self):
         return self.__doors
 
+    @property
+    def position(self):
+        #  the index of the room in the maze grid
+        return self.__room_placement
+
+    def get_door_mask(self) -> int:
+        door_mask = 0
+        for door in self.__doors:
+            door_mask |= DOOR_BITS[door.placement]
+        return door_mask
+
     def get_doors_position(self) -> List[Tuple[float, float]]:
         #  returns the offset position of the doors in the room (not in pixels), for example in the door is TOP it will be (0.5,0)
         return [door.get_door_room_offset() for door in self.__doors]
 
+    def destroy(self):
+        #  removes the doors of the room from the game
+        for door in self.__doors:
+            door.destroy()
+        self.__doors = []
+
     def is_available(self):
         #  if the room has already 4 doors you can't add any more to it
         return len(self.__doors) != 4
@@ -48,6 +83,7 @@ class Room:
         for door in self.__doors:
             if door.placement == door_placement_to_remove:
                 self.__doors.remove(door)
+                door.destroy()  # the door was already added to the game
                 return
         logging.warning("no such door placement was found")
 
@@ -67,33 +103,98 @@ class Room:
                                placement.value != DoorPlacement.NO_PLACEMENT.value]
         for door in self.__doors:
             possible_placements.remove(door.placement.value)
-        return DoorPlacement(possible_placements[random.randint(0, len(possible_placements) - 1)])
+        return DoorPlacement(possible_placements[self.__rng.randint(0, len(possible_placements) - 1)])
 
 
 class Maze:
     FIRST_ROOM_POSITION = (0, 0)
-
-    def __init__(self, maze_size: int):
+    PROGRESS_INTERVAL = 4096  # how many rooms are generated between two calls of on_progress
+
+    def __init__(self, maze_size: int, seed=None, algorithm: MazeAlgorithm = MazeAlgorithm.FRONTIER,
+                 build_rooms: bool = True, room_doors: Mapping[Tuple[int, int], int] = None,
+                 on_progress: Callable[[float], None] = None):
+        """
+        Attributes:
+            maze_size - how many rooms does the maze have
+            seed - the seed of the random generator, the same seed and algorithm always create the same maze
+            algorithm - how the maze is generated
+            build_rooms - create the rooms and their doors (game objects), otherwise the maze holds only the grid data
+                          and the rooms are created on the first access to rooms
+            room_doors - the grid data of an existing maze (like a maze file), the maze is not generated
+            on_progress - called while the maze is generated with the part of the rooms that were generated
+                          (0 to 1), an exception it raises stops the generation
+        """
         if maze_size < 1:
             logging.warning(f"maze size must be larger than 0 got {maze_size}")
 
-        first_room_in_maze = Room(Maze.FIRST_ROOM_POSITION)
-
-        self.__rooms: List[Room] = [first_room_in_maze]
-        self.__visual_rooms: Dict[Room, Tuple[int, int]] = {
-            first_room_in_maze: Maze.FIRST_ROOM_POSITION}  # maps the room to his place in the array
         self.__maze_size = maze_size  # The size of the maze is how many rooms does it have
-        self.__current_size = 1
-
-        while self.__current_size < maze_size:
-            self.__add_room_to_maze()
+        self.__seed = seed
+        self.__rng = random.Random(seed)
+        self.__on_progress = on_progress
+        self.__rooms: List[Room] = None
+        #  maps the index of every room to its door mask, a dict or the MappedRoomDoors of a maze file
+        self.__room_doors: Mapping[Tuple[int, int], int] = {}
+
+        if room_doors is not None:
+            self.__room_doors = room_doors
+        elif algorithm == MazeAlgorithm.RANDOM_RETRY:
+            self.__generate_random_retry()
+        else:
+            self.__generate_frontier()
+
+        if build_rooms:
+            self.build_rooms()
 
     @property
     def rooms(self):
+        return self.build_rooms()
+
+    @property
+    def seed(self):
+        return self.__seed
+
+    @property
+    def room_doors(self) -> Mapping[Tuple[int, int], int]:
+        #  the grid data of the maze, maps the index of every room to its door mask (see DOOR_BITS)
+        return self.__room_doors
+
+    def __len__(self):
+        return len(self.__room_doors)
+
+    @staticmethod
+    def load(path: str, build_rooms: bool = False) -> "Maze":
+        #  opens a maze file (see maze_file.py), the rooms stay in the file until they are created
+        seed, room_doors = read_maze_file(path)
+        return Maze(len(room_doors), seed, build_rooms=build_rooms, room_doors=room_doors)
+
+    def save(self, path: str) -> None:
+        write_maze_file(path, self.__seed, *self.get_room_arrays())
+
+    def get_room_arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        #  returns the x, y (the index in the maze grid) and door mask of every room, by the order of room_doors
+        if isinstance(self.__room_doors, MappedRoomDoors):
+            return self.__room_doors.arrays
+        rooms_count = len(self.__room_doors)
+        x = np.fromiter((room_index[0] for room_index in self.__room_doors), dtype=np.int32, count=rooms_count)
+        y = np.fromiter((room_index[1] for room_index in self.__room_doors), dtype=np.int32, count=rooms_count)
+        door_masks = np.fromiter(self.__room_doors.values(), dtype=np.uint8, count=rooms_count)
+        return x, y, door_masks
+
+    def build_rooms(self) -> List[Room]:
+        #  creates a Room (and its doors) for every room in the grid data, only in the first call
+        if self.__rooms is None:
+            self.__rooms = [self.create_room(room_index) for room_index in self.__room_doors]
         return self.__rooms
 
+    def create_room(self, room_index: Tuple[int, int]) -> Room:
+        #  creates the Room in the index and its doors from the grid data, without keeping it in the maze
+        room = Room(room_index, self.__rng)
+        for placement in get_door_placements(self.__room_doors[room_index]):
+            room.add_door(placement)
+        return room
+
     def get_all_doors_in_maze(self) -> List[Door]:
-        return [door for room in self.__rooms for door in room.doors]
+        return [door for room in self.rooms for door in room.doors]
 
     @staticmethod
     def __get_new_room_index(current_place: Tuple[int, int], door_placement: DoorPlacement) -> (
@@ -110,58 +211,106 @@ class Maze:
 
     @property
     def rooms_position(self):
-        return self.__visual_rooms.values()
-
-    def __add_room_to_maze(self):
-        # first lets choose a room to add door to
-        room_placement = random.randint(0, self.__current_size - 1)
-        while not self.__rooms[room_placement].is_available():
-            room_placement = random.randint(0, self.__current_size - 1)
-        #  now we have a room to add a door to
-
-        door_placement = self.__rooms[room_placement].add_door()
-        new_room_index = Maze.__get_new_room_index(self.__visual_rooms[self.__rooms[room_placement]],
-                                                   door_placement)  # get the index in the array of the new room that was created
-
-        if new_room_index in self.__visual_rooms.values():
-            #  if there is already room in this place we will start all the process of finding new room
-            #  the place of the room can already be occupied by another room that was built there before
-            self.__rooms[room_placement].remove_door(door_placement)  # we need to remove the door we just added
-            self.__add_room_to_maze()
-            return
-
-        #  now we create a new room
-        new_room = Room(new_room_index)
-        self.__rooms.append(new_room)
-
-        self.__visual_rooms[new_room] = new_room_index  # map the room to his position in the array
-
-        #  and lets add a door to this room (on the opposite side of the door in our old room)
-        new_room.add_door(get_opposite_door_placement(DoorPlacement(door_placement)))
-
-        self.__current_size += 1
+        return self.__room_doors.keys()
+
+    def __generate_frontier(self):
+        """
+        The frontier holds every (room, door placement) that may lead to a free place in the grid.
+        Every step takes a random entry from the frontier, so no room is checked twice and there is no recursion.
+        While generating, the index of a room is packed into one integer (x * stride + y) which is faster than tuples
+        """
+        rng_random = self.__rng.random
+        on_progress = self.__on_progress
+        stride = 2 * self.__maze_size + 1  # no room can be maze_size rooms away from the first room
+        first_room_key = Maze.FIRST_ROOM_POSITION[0] * stride + Maze.FIRST_ROOM_POSITION[1]
+        occupied_rooms = {first_room_key: 0}  # maps the packed index of every room to its door mask
+
+        neighbors = []  # (door bit, packed offset of the room behind the door, door bit of the opposite door)
+        for placement, door_bit in DOOR_BITS.items():
+            x_offset, y_offset = Maze.__get_new_room_index((0, 0), placement)
+            neighbors.append((door_bit, x_offset * stride + y_offset, DOOR_BITS[get_opposite_door_placement(placement)]))
+        frontier = [(first_room_key, neighbor) for neighbor in neighbors]
+
+        while len(occupied_rooms) < self.__maze_size and frontier:
+            #  take a random entry from the frontier, the last entry takes its place so removing it is O(1)
+            entry_index = int(rng_random() * len(frontier))
+            last_entry = frontier.pop()
+            if entry_index < len(frontier):
+                room_key, neighbor = frontier[entry_index]
+                frontier[entry_index] = last_entry
+            else:
+                room_key, neighbor = last_entry
+
+            door_bit, offset, opposite_door_bit = neighbor
+            new_room_key = room_key + offset
+            if new_room_key in occupied_rooms:
+                continue  # another room was built there after this entry was added
+
+            occupied_rooms[room_key] |= door_bit
+            occupied_rooms[new_room_key] = opposite_door_bit
+            if on_progress is not None and len(occupied_rooms) % Maze.PROGRESS_INTERVAL == 0:
+                on_progress(len(occupied_rooms) / self.__maze_size)
+            for new_neighbor in neighbors:
+                if new_neighbor[0] != opposite_door_bit and new_room_key + new_neighbor[1] not in occupied_rooms:
+                    frontier.append((new_room_key, new_neighbor))
+
+        for room_key, door_mask in occupied_rooms.items():
+            x, y = divmod(room_key + self.__maze_size, stride)  # y is shifted so it can't be negative
+            self.__room_doors[(x, y - self.__maze_size)] = door_mask
+
+    def __generate_random_retry(self):
+        """
+        Picks random rooms until a new room can be added next to one of them. Like the frontier, the rooms are kept
+        only as door masks, so the generation doesn't create any game objects
+        """
+        rng_randint = self.__rng.randint
+        all_doors_mask = sum(DOOR_BITS.values())
+        room_indexes = [Maze.FIRST_ROOM_POSITION]  # the rooms by the order they were added
+        self.__room_doors[Maze.FIRST_ROOM_POSITION] = 0
+        on_progress = self.__on_progress
+
+        while len(room_indexes) < self.__maze_size:
+            #  first lets choose a room that can get another door
+            room_index = room_indexes[rng_randint(0, len(room_indexes) - 1)]
+            while self.__room_doors[room_index] == all_doors_mask:
+                room_index = room_indexes[rng_randint(0, len(room_indexes) - 1)]
+
+            door_mask = self.__room_doors[room_index]
+            free_placements = [placement for placement, door_bit in DOOR_BITS.items() if not door_mask & door_bit]
+            door_placement = free_placements[rng_randint(0, len(free_placements) - 1)]
+            new_room_index = Maze.__get_new_room_index(room_index, door_placement)
+            if new_room_index in self.__room_doors:
+                #  there is already room in this place, so all the process of finding a new room starts again
+                continue
+
+            self.__room_doors[room_index] = door_mask | DOOR_BITS[door_placement]
+            #  the new room gets a door on the opposite side of the door in the old room
+            self.__room_doors[new_room_index] = DOOR_BITS[get_opposite_door_placement(door_placement)]
+            room_indexes.append(new_room_index)
+            if on_progress is not None and len(room_indexes) % Maze.PROGRESS_INTERVAL == 0:
+                on_progress(len(room_indexes) / self.__maze_size)
 
     def generate_visual_rooms(self, space_between_rooms: int, start_position: Tuple[int, int]) -> List[
         Tuple[int, int]]:
         #  returns the position of the position in pixels of all the rooms according to the size and the space provided
-        rooms_position = []
-        for room_position in self.rooms_position:
-            rooms_position.append((
-                room_position[0] * space_between_rooms + start_position[0],
-                room_position[1] * space_between_rooms + start_position[1]))
-
-        return rooms_position
+        x, y, _ = self.get_room_arrays()
+        return list(zip((x.astype(np.int64) * space_between_rooms + start_position[0]).tolist(),
+                        (y.astype(np.int64) * space_between_rooms + start_position[1]).tolist()))
 
     def generate_visual_doors(self, space_between_rooms: int, start_position: Tuple[int, int]) -> List[
         Tuple[int, int]]:
-        #  returns the position of the position in pixels of all the rooms according to the size and the space provided
-        doors_position = []
-        for room in self.__rooms:
-            for door_position_offset in room.get_doors_position():
-                doors_position.append((
-                    self.__visual_rooms[room][0] * space_between_rooms + start_position[0] + door_position_offset[
-                        0] * ROOM_SIZE,
-                    self.__visual_rooms[room][1] * space_between_rooms + start_position[1] + door_position_offset[
-                        1] * ROOM_SIZE))
-
-        return doors_position
+        #  returns the position of the position in pixels of all the doors according to the size and the space provided
+        x, y, door_masks = self.get_room_arrays()
+        rows, doors_x, doors_y = [], [], []
+        for placement, door_bit in DOOR_BITS.items():
+            #  the doors of every placement are found together
+            rooms_with_door = np.flatnonzero(door_masks & door_bit)
+            door_position_offset = get_door_room_offset(placement)
+            rows.append(rooms_with_door)
+            doors_x.append(x[rooms_with_door].astype(np.int64) * space_between_rooms + start_position[0] +
+                           door_position_offset[0] * ROOM_SIZE)
+            doors_y.append(y[rooms_with_door].astype(np.int64) * space_between_rooms + start_position[1] +
+                           door_position_offset[1] * ROOM_SIZE)
+        #  the doors of every room are kept together, in the order of DOOR_BITS
+        order = np.argsort(np.concatenate(rows), kind="stable")
+        return list(zip(np.concatenate(doors_x)[order].tolist(), np.concatenate(doors_y)[order].tolist()))
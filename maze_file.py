@@ -0,0 +1,99 @@
+"""
+The binary file format of a maze.
+The file starts with a header (HEADER_FORMAT) that holds the seed of the maze and how many rooms it has, and then a
+record for every room (ROOM_RECORD): the index of the room in the maze grid as two int32 and its door mask (4 bits,
+see maze.DOOR_BITS) in a byte. The records are sorted by the index of the room, so a room is found with a binary search
+and the file can be used through a memory map without reading it first
+"""
+import struct
+from collections.abc import Mapping
+from typing import Iterator, Optional, Tuple
+import numpy as np
+
+MAGIC = b"MAZE"
+VERSION = 1
+HEADER_FORMAT = "<4sHBxqQ"  # magic, version, if the maze has a seed, seed, rooms count
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+ROOM_RECORD = np.dtype([("x", "<i4"), ("y", "<i4"), ("door_mask", "u1")])
+
+
+def get_room_keys(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    #  packs the index of every room into one int64, the records of a file are sorted by it
+    return (x.astype(np.int64) << 32) | (y.astype(np.int64) & 0xFFFFFFFF)
+
+
+class MappedRoomDoors(Mapping):
+    """
+    The grid data of a maze file, maps the index of every room to its door mask like Maze.room_doors.
+    The records stay in the file (memory mapped), so a maze opens without reading its rooms
+    Attributes:
+        records - the sorted ROOM_RECORD array of the rooms
+    """
+
+    def __init__(self, records: np.ndarray):
+        self.__records = records
+        self.__keys: Optional[np.ndarray] = None  # the key of every record, calculated on the first search
+
+    @property
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        #  the x, y and door mask of every room
+        return self.__records["x"], self.__records["y"], self.__records["door_mask"]
+
+    def __len__(self):
+        return len(self.__records)
+
+    def __find(self, room_index: Tuple[int, int]) -> int:
+        #  returns the row of the room, or -1 if the maze doesn't have it
+        if self.__keys is None:
+            self.__keys = get_room_keys(self.__records["x"], self.__records["y"])
+        key = (room_index[0] << 32) | (room_index[1] & 0xFFFFFFFF)
+        row = int(np.searchsorted(self.__keys, key))
+        if row < len(self.__keys) and self.__keys[row] == key:
+            return row
+        return -1
+
+    def __getitem__(self, room_index: Tuple[int, int]) -> int:
+        row = self.__find(room_index)
+        if row < 0:
+            raise KeyError(room_index)
+        return int(self.__records["door_mask"][row])
+
+    def __contains__(self, room_index):
+        return self.__find(room_index) >= 0
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return zip(self.__records["x"].tolist(), self.__records["y"].tolist())
+
+    def items(self):
+        return zip(self, self.__records["door_mask"].tolist())
+
+
+def write_maze_file(path: str, seed: Optional[int], x: np.ndarray, y: np.ndarray, door_masks: np.ndarray) -> None:
+    """
+    Writes the rooms (the index and the door mask of every room) to a maze file
+    """
+    if seed is not None and not isinstance(seed, int):
+        raise TypeError(f"only int seeds can be saved got {type(seed).__name__}")
+    records = np.empty(len(x), dtype=ROOM_RECORD)
+    records["x"], records["y"], records["door_mask"] = x, y, door_masks
+    records = records[np.argsort(get_room_keys(records["x"], records["y"]), kind="stable")]
+    with open(path, "wb") as maze_file:
+        maze_file.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, seed is not None, seed or 0, len(records)))
+        records.tofile(maze_file)
+
+
+def read_maze_file(path: str) -> Tuple[Optional[int], MappedRoomDoors]:
+    """
+    Opens a maze file, returns its seed and its rooms (memory mapped)
+    """
+    with open(path, "rb") as maze_file:
+        header = maze_file.read(HEADER_SIZE)
+    if len(header) < HEADER_SIZE:
+        raise ValueError(f"{path} is not a maze file")
+    magic, version, has_seed, seed, rooms_count = struct.unpack(HEADER_FORMAT, header)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a maze file")
+    if version != VERSION:
+        raise ValueError(f"{path} is a version {version} maze file, only version {VERSION} is supported")
+    records = np.memmap(path, dtype=ROOM_RECORD, mode="r", offset=HEADER_SIZE, shape=(rooms_count,))
+    return (seed if has_seed else None), MappedRoomDoors(records)
@@ -0,0 +1,241 @@
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+import numpy as np
+from maze import Maze, DOOR_BITS, get_opposite_door_placement
+from maze_file import get_room_keys
+from enums import DoorPlacement
+from game_settings import DISTANCE_FIELD_CACHE_SIZE
+
+#  the offset in the maze grid of the room behind every door, in the order of the columns of the adjacency array
+NEIGHBOR_OFFSETS = {DoorPlacement.TOP: (0, -1), DoorPlacement.RIGHT: (1, 0), DoorPlacement.BOTTOM: (0, 1),
+                    DoorPlacement.LEFT: (-1, 0)}
+NO_ROOM = -1
+
+
+class DistanceField(NamedTuple):
+    target: int  # the id of the room the field leads to
+    distances: np.ndarray  # how many doors every room is from the target, NO_ROOM if the target can't be reached
+    next_rooms: np.ndarray  # the id of the next room on the way to the target from every room, NO_ROOM in the target
+
+
+class MazeGraph:
+    """
+    The rooms of a maze as a graph: every room gets an id (its row in the arrays) and the adjacency array holds the
+    ids of the rooms behind its doors. Distance fields to a target room are found with a BFS that handles a whole
+    level of rooms at once, and are kept in an LRU cache, so the next room towards the target is an O(1) lookup.
+    The generated mazes are trees, so when the target moves to a neighbor room its field is updated from the field of
+    the last target instead of searching again
+    Attributes:
+        maze - the maze to build the graph from
+        cache_size - how many distance fields are kept
+    """
+
+    def __init__(self, maze: Maze, cache_size: int = DISTANCE_FIELD_CACHE_SIZE):
+        x, y, door_masks = maze.get_room_arrays()
+        self.__x = np.asarray(x, dtype=np.int32)
+        self.__y = np.asarray(y, dtype=np.int32)
+        keys = get_room_keys(self.__x, self.__y)
+        self.__key_order = np.argsort(keys, kind="stable")
+        self.__sorted_keys = keys[self.__key_order]
+
+        #  the neighbors of every room, a door leads to a room only if the room behind it has the opposite door
+        self.__neighbors = np.full((len(keys), len(DOOR_BITS)), NO_ROOM, dtype=np.int32)
+        door_masks = np.asarray(door_masks)
+        for column, (placement, door_bit) in enumerate(DOOR_BITS.items()):
+            rooms_with_door = np.flatnonzero(door_masks & door_bit)
+            x_offset, y_offset = NEIGHBOR_OFFSETS[placement]
+            neighbors = self.__find_rooms(
+                get_room_keys(self.__x[rooms_with_door] + x_offset, self.__y[rooms_with_door] + y_offset))
+            opposite_door_bit = DOOR_BITS[get_opposite_door_placement(placement)]
+            has_opposite_door = np.zeros(len(neighbors), dtype=np.bool_)
+            found = neighbors != NO_ROOM
+            has_opposite_door[found] = (door_masks[neighbors[found]] & opposite_door_bit) != 0
+            self.__neighbors[rooms_with_door, column] = np.where(has_opposite_door, neighbors, NO_ROOM)
+        edges_count = int(np.count_nonzero(self.__neighbors != NO_ROOM)) // 2  # every door is found from both rooms
+        self.__is_tree = edges_count == len(keys) - 1 and bool(np.all(self.__bfs(0) != NO_ROOM))
+
+        self.__cache_size = cache_size
+        self.__distance_fields: OrderedDict[int, DistanceField] = OrderedDict()
+        self.__tracked_field: Optional[DistanceField] = None  # the field of the room that track_target got last
+        self.__tracked_room_index = None
+        self.__preorder: Optional[np.ndarray] = None  # the preorder of the tree (rooted in room 0), built when needed
+        self.__subtree_sizes: Optional[np.ndarray] = None
+        self.__parents: Optional[np.ndarray] = None
+        self.__searches_count = 0  # how many BFS searches were done
+
+    def __len__(self):
+        return len(self.__sorted_keys)
+
+    @property
+    def neighbors(self) -> np.ndarray:
+        #  the ids of the rooms behind the doors of every room (in the order of DOOR_BITS), NO_ROOM if there is no door
+        return self.__neighbors
+
+    @property
+    def is_tree(self):
+        return self.__is_tree
+
+    @property
+    def searches_count(self):
+        return self.__searches_count
+
+    @property
+    def tracked_field(self) -> Optional[DistanceField]:
+        return self.__tracked_field
+
+    def __find_rooms(self, keys: np.ndarray) -> np.ndarray:
+        #  returns the id of the room of every key, NO_ROOM for keys that are not in the maze
+        rows = np.minimum(np.searchsorted(self.__sorted_keys, keys), len(self.__sorted_keys) - 1)
+        return np.where(self.__sorted_keys[rows] == keys, self.__key_order[rows], NO_ROOM).astype(np.int32)
+
+    def get_room_id(self, room_index: Tuple[int, int]) -> int:
+        #  returns the id of the room in the index of the maze grid, NO_ROOM if the maze doesn't have it
+        return int(self.__find_rooms(get_room_keys(np.array([room_index[0]]), np.array([room_index[1]])))[0])
+
+    def __get_existing_room_id(self, room_index: Tuple[int, int]) -> int:
+        room_id = self.get_room_id(room_index)
+        if room_id == NO_ROOM:
+            raise KeyError(room_index)
+        return room_id
+
+    def get_room_index(self, room_id: int) -> Tuple[int, int]:
+        return int(self.__x[room_id]), int(self.__y[room_id])
+
+    def __bfs(self, target: int) -> np.ndarray:
+        #  returns the distance of every room from the target, every step of the search moves a whole level of rooms
+        distances = np.full(len(self.__sorted_keys), NO_ROOM, dtype=np.int32)
+        distances[target] = 0
+        level = np.array([target], dtype=np.int32)
+        distance = 0
+        while len(level):
+            distance += 1
+            next_level = self.__neighbors[level].ravel()
+            next_level = next_level[next_level != NO_ROOM]
+            next_level = np.unique(next_level[distances[next_level] == NO_ROOM])
+            distances[next_level] = distance
+            level = next_level
+        return distances
+
+    def __get_next_rooms(self, distances: np.ndarray) -> np.ndarray:
+        #  the next room of every room is its neighbor that is closest to the target
+        neighbors = self.__neighbors
+        neighbor_distances = np.where(neighbors != NO_ROOM, distances[neighbors], np.iinfo(np.int32).max)
+        neighbor_distances[neighbor_distances == NO_ROOM] = np.iinfo(np.int32).max  # a neighbor that can't reach
+        next_rooms = neighbors[np.arange(len(neighbors)), neighbor_distances.argmin(axis=1)]
+        next_rooms[distances <= 0] = NO_ROOM  # the target and the rooms that can't reach it
+        return next_rooms
+
+    def __search(self, target: int) -> DistanceField:
+        self.__searches_count += 1
+        distances = self.__bfs(target)
+        return DistanceField(target, distances, self.__get_next_rooms(distances))
+
+    def __build_tree_order(self) -> None:
+        """
+        Builds the preorder and the subtree sizes of the tree rooted in room 0, so the rooms of a subtree are the rooms
+        with a preorder in [preorder of its root, preorder of its root + its size)
+        """
+        levels = []
+        rooms_count = len(self.__sorted_keys)
+        parents = np.full(rooms_count, NO_ROOM, dtype=np.int32)
+        visited = np.zeros(rooms_count, dtype=np.bool_)
+        visited[0] = True
+        level = np.array([0], dtype=np.int32)
+        while len(level):
+            levels.append(level)
+            neighbors = self.__neighbors[level]
+            next_parents = np.repeat(level, neighbors.shape[1])
+            next_level = neighbors.ravel()
+            is_child = next_level != NO_ROOM
+            next_level, next_parents = next_level[is_child], next_parents[is_child]
+            is_child = ~visited[next_level]
+            next_level, next_parents = next_level[is_child], next_parents[is_child]
+            parents[next_level] = next_parents
+            visited[next_level] = True
+            level = next_level
+
+        subtree_sizes = np.ones(rooms_count, dtype=np.int64)
+        for level in reversed(levels[1:]):
+            np.add.at(subtree_sizes, parents[level], subtree_sizes[level])
+
+        preorder = np.zeros(rooms_count, dtype=np.int64)
+        for level in levels[1:]:
+            #  the children of a room come right after it, every child after the subtrees of the children before it
+            level = level[np.argsort(parents[level], kind="stable")]
+            level_parents = parents[level]
+            sizes_before = np.cumsum(subtree_sizes[level]) - subtree_sizes[level]
+            first_sibling = np.flatnonzero(np.r_[True, level_parents[1:] != level_parents[:-1]])
+            sizes_before -= np.repeat(sizes_before[first_sibling], np.diff(np.r_[first_sibling, len(level)]))
+            preorder[level] = preorder[level_parents] + 1 + sizes_before
+
+        self.__parents, self.__subtree_sizes, self.__preorder = parents, subtree_sizes, preorder
+
+    def __in_subtree(self, root: int) -> np.ndarray:
+        first = self.__preorder[root]
+        return (self.__preorder >= first) & (self.__preorder < first + self.__subtree_sizes[root])
+
+    def __move_target(self, field: DistanceField, new_target: int) -> DistanceField:
+        """
+        Returns the field of a neighbor of the target of the field, without searching (only for trees).
+        The rooms on the side of the new target get one door closer and the rest get one door farther, and only the
+        next rooms of the two targets change
+        """
+        if self.__preorder is None:
+            self.__build_tree_order()
+        if self.__parents[new_target] == field.target:
+            closer = self.__in_subtree(new_target)
+        else:
+            closer = ~self.__in_subtree(field.target)
+        distances = field.distances + np.where(closer, -1, 1).astype(np.int32)
+        next_rooms = field.next_rooms.copy()
+        next_rooms[field.target] = new_target
+        next_rooms[new_target] = NO_ROOM
+        return DistanceField(new_target, distances, next_rooms)
+
+    def __cache(self, field: DistanceField) -> DistanceField:
+        self.__distance_fields[field.target] = field
+        self.__distance_fields.move_to_end(field.target)
+        if len(self.__distance_fields) > self.__cache_size:
+            self.__distance_fields.popitem(last=False)
+        return field
+
+    def get_distance_field(self, target_room_index: Tuple[int, int]) -> DistanceField:
+        #  returns the distance field to the room (from the cache if it was used lately)
+        target = self.__get_existing_room_id(target_room_index)
+        field = self.__distance_fields.get(target)
+        if field is not None:
+            self.__distance_fields.move_to_end(target)
+            return field
+        return self.__cache(self.__search(target))
+
+    def track_target(self, room_index: Tuple[int, int]) -> None:
+        """
+        Makes the room the tracked target (like the room of the player), should be called when the target changes rooms.
+        A room next to the last tracked room gets its field from the last field, and a room outside of the maze is
+        ignored (the last field stays)
+        """
+        if room_index == self.__tracked_room_index:
+            return
+        self.__tracked_room_index = room_index
+        target = self.get_room_id(room_index)
+        if target == NO_ROOM:
+            return
+        field = self.__distance_fields.get(target)
+        last_field = self.__tracked_field
+        if field is not None:
+            self.__distance_fields.move_to_end(target)
+        elif self.__is_tree and last_field is not None and target in self.__neighbors[last_field.target]:
+            field = self.__cache(self.__move_target(last_field, target))
+        else:
+            field = self.__cache(self.__search(target))
+        self.__tracked_field = field
+
+    def get_distance(self, room_index: Tuple[int, int], target_room_index: Tuple[int, int]) -> int:
+        #  how many doors are between the rooms, NO_ROOM if the room can't reach the target
+        return int(self.get_distance_field(target_room_index).distances[self.__get_existing_room_id(room_index)])
+
+    def get_next_room(self, room_index: Tuple[int, int], target_room_index: Tuple[int, int]) \
+            -> Optional[Tuple[int, int]]:
+        #  returns the index of the next room on the way to the target, None in the target or if it can't be reached
+        next_room = self.get_distance_field(target_room_index).next_rooms[self.__get_existing_room_id(room_index)]
+        return None if next_room == NO_ROOM else self.get_room_index(next_room)
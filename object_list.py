@@ -0,0 +1,43 @@
+from typing import Dict, Hashable, Iterator, List
+
+
+class ObjectList:
+    """
+    A list of unique items that removes an item in O(1).
+    The removed item is replaced by the last item (swap remove), so the order of the items is not kept.
+    Items should not be removed while the list is iterated, the game removes them only when the frame ends
+    """
+    __slots__ = ("__items", "__indexes")
+
+    def __init__(self):
+        self.__items: List[Hashable] = []
+        self.__indexes: Dict[Hashable, int] = {}  # the index of every item in the list
+
+    def __len__(self):
+        return len(self.__items)
+
+    def __iter__(self) -> Iterator:
+        return iter(self.__items)
+
+    def __contains__(self, item):
+        return item in self.__indexes
+
+    def __getitem__(self, index):
+        return self.__items[index]
+
+    def append(self, item: Hashable) -> None:
+        if item in self.__indexes:
+            return
+        self.__indexes[item] = len(self.__items)
+        self.__items.append(item)
+
+    def remove(self, item: Hashable) -> None:
+        index = self.__indexes.pop(item)
+        last_item = self.__items.pop()
+        if index != len(self.__items):  # the removed item wasn't the last one
+            self.__items[index] = last_item
+            self.__indexes[last_item] = index
+
+    def clear(self) -> None:
+        self.__items.clear()
+        self.__indexes.clear()
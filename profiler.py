@@ -0,0 +1,137 @@
+import csv
+import json
+from typing import Dict, Iterable, Tuple
+import numpy as np
+from meta_classes import Singleton
+from game_settings import PROFILER, PROFILER_DETAILS, PROFILER_FRAMES
+
+FRAME_SECTION = "frame"  # the section of the time of the whole frame
+PERCENTILES = (50, 95, 99)
+
+
+class RingBuffer:
+    """
+    Keeps the last samples that were added in a fixed size numpy array, the oldest sample is replaced by a new one
+    Attributes:
+        capacity - how many samples are kept
+        filled - how many zero samples the buffer starts with
+    """
+    __slots__ = ("__samples", "__index", "__count")
+
+    def __init__(self, capacity: int, filled: int = 0):
+        self.__samples = np.zeros(capacity, dtype=np.float64)
+        self.__count = min(filled, capacity)
+        self.__index = self.__count % capacity  # where the next sample is written
+
+    def __len__(self):
+        return self.__count
+
+    def append(self, sample: float) -> None:
+        self.__samples[self.__index] = sample
+        self.__index = (self.__index + 1) % len(self.__samples)
+        self.__count = min(self.__count + 1, len(self.__samples))
+
+    def values(self) -> np.ndarray:
+        #  the samples from the oldest to the newest
+        if self.__count < len(self.__samples):
+            return self.__samples[:self.__count]
+        return np.roll(self.__samples, -self.__index)
+
+
+class FrameProfiler(metaclass=Singleton):
+    """
+    Keeps how long (in ms) every section of the last frames took, like the phases of the game loop, and
+    with details also every render layer and object type.
+    The samples of a frame are added up until end_frame, a section that had no samples in a frame gets 0.
+    When the profiler is disabled the game doesn't measure anything for it
+    Attributes:
+        enabled - if the game adds samples to the profiler
+        details - if the render layers and the object types are measured too (slower, every object is measured)
+        frames - how many frames are kept
+    """
+
+    def __init__(self, enabled: bool = PROFILER, details: bool = PROFILER_DETAILS, frames: int = PROFILER_FRAMES):
+        self.__enabled = enabled
+        self.__details = enabled and details
+        self.__capacity = frames
+        self.__sections: Dict[str, RingBuffer] = {}
+        self.__frame_samples: Dict[str, float] = {}  # the samples of the frame that didn't end yet
+        self.__frames_count = 0
+
+    @property
+    def enabled(self):
+        return self.__enabled
+
+    @property
+    def details(self):
+        return self.__details
+
+    @property
+    def frames_count(self):
+        #  how many frames ended, including the ones that are not kept anymore
+        return self.__frames_count
+
+    def add_sample(self, section: str, milliseconds: float) -> None:
+        frame_samples = self.__frame_samples
+        frame_samples[section] = frame_samples.get(section, 0) + milliseconds
+
+    def end_frame(self, frame_milliseconds: float) -> None:
+        frame_samples = self.__frame_samples
+        frame_samples[FRAME_SECTION] = frame_milliseconds
+        for section, samples in self.__sections.items():
+            samples.append(frame_samples.pop(section, 0))
+        for section, milliseconds in frame_samples.items():
+            #  a new section, it had no samples in the frames before
+            samples = RingBuffer(self.__capacity, filled=self.__frames_count)
+            samples.append(milliseconds)
+            self.__sections[section] = samples
+        frame_samples.clear()
+        self.__frames_count += 1
+
+    def get_percentiles(self, section: str = FRAME_SECTION, percentiles: Iterable[float] = PERCENTILES) \
+            -> Tuple[float, ...]:
+        samples = self.__sections.get(section)
+        if samples is None or not len(samples):
+            return tuple(0.0 for _ in percentiles)
+        return tuple(np.percentile(samples.values(), list(percentiles)).tolist())
+
+    def get_average_fps(self) -> float:
+        #  the frames divided by their time, and not the average of the fps of every frame (that hides slow frames)
+        samples = self.__sections.get(FRAME_SECTION)
+        if samples is None or not len(samples):
+            return 0.0
+        return len(samples) / (samples.values().sum() / 1000)
+
+    def get_summary(self) -> Dict[str, Dict[str, float]]:
+        summary = {}
+        for section, samples in self.__sections.items():
+            values = samples.values()
+            p50, p95, p99 = np.percentile(values, PERCENTILES).tolist()
+            summary[section] = {"mean_ms": float(values.mean()), "p50_ms": p50, "p95_ms": p95, "p99_ms": p99,
+                                "max_ms": float(values.max())}
+        return summary
+
+    def dump(self, path: str) -> None:
+        """
+        Writes the kept frames to a file, a json file (by the extension) gets the summary of every section and
+        its samples, any other file gets a csv table with a row for every frame and a column for every section
+        """
+        sections = {section: samples.values() for section, samples in self.__sections.items()}
+        if path.endswith(".json"):
+            with open(path, "w") as profile_file:
+                json.dump({"frames": self.__frames_count, "average_fps": self.get_average_fps(),
+                           "summary": self.get_summary(),
+                           "samples": {section: values.tolist() for section, values in sections.items()}},
+                          profile_file, indent=4)
+            return
+
+        with open(path, "w", newline="") as profile_file:
+            writer = csv.writer(profile_file)
+            writer.writerow(sections.keys())
+            #  all the sections have the same kept frames, a section that was added later starts with zeros
+            writer.writerows(np.column_stack(list(sections.values())).tolist() if sections else [])
+
+    def clear(self) -> None:
+        self.__sections.clear()
+        self.__frame_samples.clear()
+        self.__frames_count = 0
@@ -0,0 +1,215 @@
+from typing import List
+import numpy as np
+import pygame as pg
+from camera import Camera
+from collision import CollisionMasks, get_mask_bits
+from game_time import GlobalTime
+from meta_classes import Singleton
+from renderer import RenderLayer
+from utilitiez import get_room_index, get_room_rect
+from game_settings import BLACK, BULLET_SIZE, BULLET_LIFETIME
+
+
+class ProjectileSystem(metaclass=Singleton):
+    """
+    Keeps all the live projectiles in numpy arrays (one row per projectile) and moves them together,
+    so tens of thousands of bullets cost a few vectorized operations a frame instead of an object each.
+    Projectiles are removed when their lifetime is over, when they leave the room of the camera
+    or when they hit a sprite they can collide with (the sprites that were hit are kept in hits)
+    Attributes:
+        width, height - the size of every projectile
+        color - the color of every projectile
+        render_layer - the layer the projectiles are drawn in
+        masks_to_collide_with - the masks of the sprites the projectiles hit
+    """
+    INITIAL_CAPACITY = 256
+    ROWS_PER_BATCH = 512  # how many projectiles are checked together, limits the size of the temporary arrays
+
+    def __init__(self, width: int = BULLET_SIZE, height: int = BULLET_SIZE, color=BLACK,
+                 render_layer: RenderLayer = RenderLayer.BULLET,
+                 masks_to_collide_with=(CollisionMasks.WALLS, CollisionMasks.BUILDINGS, CollisionMasks.ENEMY)):
+        self.__width = width
+        self.__height = height
+        self.__color = color
+        self.__render_layer = render_layer
+        self.__collide_with_bits = get_mask_bits(masks_to_collide_with)
+
+        self.__size = 0
+        self.__positions = np.zeros((ProjectileSystem.INITIAL_CAPACITY, 2), dtype=np.int64)
+        self.__previous_positions = np.zeros((ProjectileSystem.INITIAL_CAPACITY, 2), dtype=np.int64)  # last update
+        self.__remainders = np.zeros((ProjectileSystem.INITIAL_CAPACITY, 2), dtype=np.float64)  # sub pixel movement
+        self.__directions = np.zeros((ProjectileSystem.INITIAL_CAPACITY, 2), dtype=np.float64)
+        self.__speeds = np.zeros(ProjectileSystem.INITIAL_CAPACITY, dtype=np.float64)
+        self.__time_left = np.zeros(ProjectileSystem.INITIAL_CAPACITY, dtype=np.float64)
+        self.__hits: List = []  # the sprites that were hit in the last frame
+
+    def __len__(self):
+        return self.__size
+
+    @property
+    def size(self):
+        #  the width and the height of every projectile
+        return self.__width, self.__height
+
+    @property
+    def color(self):
+        return self.__color
+
+    @property
+    def render_layer(self):
+        return self.__render_layer
+
+    @property
+    def hits(self):
+        return self.__hits
+
+    @property
+    def collide_with_bits(self):
+        #  the mask bits of everything the projectiles hit
+        return self.__collide_with_bits
+
+    @property
+    def positions(self) -> np.ndarray:
+        #  the top left corner of every live projectile (a view, don't keep it after the next update)
+        return self.__positions[:self.__size]
+
+    @staticmethod
+    def __grow_array(array: np.ndarray, capacity: int, size: int) -> np.ndarray:
+        new_array = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+        new_array[:size] = array[:size]
+        return new_array
+
+    def __reserve(self, count: int) -> None:
+        #  makes sure there is room for count more projectiles, the capacity is doubled so growing is rare
+        capacity, size = len(self.__speeds), self.__size
+        if size + count <= capacity:
+            return
+        while capacity < size + count:
+            capacity *= 2
+        self.__positions = ProjectileSystem.__grow_array(self.__positions, capacity, size)
+        self.__previous_positions = ProjectileSystem.__grow_array(self.__previous_positions, capacity, size)
+        self.__remainders = ProjectileSystem.__grow_array(self.__remainders, capacity, size)
+        self.__directions = ProjectileSystem.__grow_array(self.__directions, capacity, size)
+        self.__speeds = ProjectileSystem.__grow_array(self.__speeds, capacity, size)
+        self.__time_left = ProjectileSystem.__grow_array(self.__time_left, capacity, size)
+
+    def fire(self, x, y, target_x, target_y, speed, lifetime: float = BULLET_LIFETIME) -> None:
+        self.fire_many(np.array([x]), np.array([y]), np.array([target_x]), np.array([target_y]), speed, lifetime)
+
+    def fire_many(self, x: np.ndarray, y: np.ndarray, target_x: np.ndarray, target_y: np.ndarray, speed,
+                  lifetime: float = BULLET_LIFETIME) -> None:
+        """
+        Shoot a projectile from every (x, y) towards its target (like a pattern of a bullet hell room)
+        Attributes:
+            speed - how many pixels the projectiles move in a second, one for all of them or one per projectile
+        """
+        count = len(x)
+        self.__reserve(count)
+        rows = slice(self.__size, self.__size + count)
+        dx, dy = np.asarray(target_x, dtype=np.float64) - x, np.asarray(target_y, dtype=np.float64) - y
+        distance = np.abs(dx) + np.abs(dy)
+        distance[distance == 0] = 1  # the target is on the projectile, so it doesn't move
+        self.__positions[rows, 0] = x
+        self.__positions[rows, 1] = y
+        self.__previous_positions[rows] = self.__positions[rows]
+        self.__remainders[rows] = 0
+        self.__directions[rows, 0] = dx / distance
+        self.__directions[rows, 1] = dy / distance
+        self.__speeds[rows] = speed
+        self.__time_left[rows] = lifetime
+        self.__size += count
+
+    def clear(self) -> None:
+        self.__size = 0
+        self.__hits = []
+
+    def update(self, sprites: List) -> None:
+        """
+        Moves all the projectiles and removes the ones that are done, should be called once a frame
+        Attributes:
+            sprites - the sprites the projectiles may hit
+        """
+        self.__hits = []
+        size = self.__size
+        if size == 0:
+            return
+        delta_time = GlobalTime().delta_time
+        positions, remainders = self.__positions[:size], self.__remainders[:size]
+        self.__previous_positions[:size] = positions
+
+        #  like Bullet the whole pixels are moved and the rest is kept for the next frames, but scaled by the frame time
+        remainders += self.__directions[:size] * (self.__speeds[:size] * delta_time)[:, None]
+        steps = np.trunc(remainders)
+        positions += steps.astype(np.int64)
+        remainders -= steps
+
+        time_left = self.__time_left[:size]
+        time_left -= delta_time
+        alive = time_left > 0
+        room_x, room_y, room_width, room_height = get_room_rect(get_room_index(Camera().x, Camera().y))
+        x, y = positions[:, 0], positions[:, 1]
+        #  projectiles that don't touch the room of the camera anymore are removed
+        alive &= (x + self.__width > room_x) & (x < room_x + room_width)
+        alive &= (y + self.__height > room_y) & (y < room_y + room_height)
+        alive &= ~self.__detect_hits(x, y, sprites)
+
+        if not alive.all():
+            self.__keep(alive)
+
+    def remove(self, removed: np.ndarray) -> None:
+        #  removes the projectiles that hit something outside of the projectile system (one bool per live projectile)
+        if removed.any():
+            self.__keep(~removed)
+
+    def __keep(self, alive: np.ndarray) -> None:
+        #  the live projectiles are moved to the start of the arrays
+        size = self.__size
+        self.__size = int(np.count_nonzero(alive))
+        for array in (self.__positions, self.__previous_positions, self.__remainders, self.__directions,
+                      self.__speeds, self.__time_left):
+            array[:self.__size] = array[:size][alive]
+
+    def __detect_hits(self, x: np.ndarray, y: np.ndarray, sprites: List) -> np.ndarray:
+        """
+        Returns which projectiles hit a sprite (the same checks as on_object), the hit sprites are added to hits
+        """
+        hit = np.zeros(len(x), dtype=np.bool_)
+        targets = [sprite for sprite in sprites if sprite.collider.mask_bit & self.__collide_with_bits]
+        if not targets:
+            return hit
+        target_rects = np.array([(target.collider.x, target.collider.y, target.collider.width,
+                                  target.collider.height) for target in targets], dtype=np.float64)
+        target_x, target_y = target_rects[:, 0], target_rects[:, 1]
+        target_right, target_bottom = target_x + target_rects[:, 2], target_y + target_rects[:, 3]
+        hit_targets = np.zeros(len(targets), dtype=np.bool_)
+
+        for start in range(0, len(x), ProjectileSystem.ROWS_PER_BATCH):
+            stop = min(start + ProjectileSystem.ROWS_PER_BATCH, len(x))
+            row_x, row_y = x[start:stop, None], y[start:stop, None]
+            row_right, row_bottom = row_x + self.__width, row_y + self.__height
+            collide = ((target_y <= row_y) & (row_y <= target_bottom)) | ((row_y <= target_y) & (target_y <= row_bottom))
+            collide &= ((target_x <= row_x) & (row_x <= target_right)) | ((row_x <= target_x) & (target_x <= row_right))
+            hit[start:stop] = collide.any(axis=1)
+            hit_targets |= collide.any(axis=0)
+
+        self.__hits = [target for target, was_hit in zip(targets, hit_targets.tolist()) if was_hit]
+        return hit
+
+    def get_rects_in_view(self, view_rect: pg.Rect, interpolation: float = 1) -> np.ndarray:
+        """
+        Returns the (x, y, width, height) of the projectiles that touch the view rect (in world position)
+        Attributes:
+            interpolation - where to place the projectiles between their previous position (0) and their position (1)
+        """
+        positions = self.__positions[:self.__size]
+        if interpolation < 1:
+            previous_positions = self.__previous_positions[:self.__size]
+            positions = previous_positions + np.rint((positions - previous_positions) * interpolation).astype(np.int64)
+        x, y = positions[:, 0], positions[:, 1]
+        in_view = (x + self.__width > view_rect.x) & (x < view_rect.right)
+        in_view &= (y + self.__height > view_rect.y) & (y < view_rect.bottom)
+        rects = np.empty((int(np.count_nonzero(in_view)), 4), dtype=np.int64)
+        rects[:, :2] = positions[in_view]
+        rects[:, 2] = self.__width
+        rects[:, 3] = self.__height
+        return rects
@@ -1,4 +1,12 @@
 from enum import Enum, auto
+import time
+from itertools import chain
+from typing import Callable, Dict, List, Sequence, Tuple
+import numpy as np
+import pygame as pg
+from game_settings import BLACK, CULLING_MARGIN, LAYER_CACHE, DISPLAY_UPDATE_MODE, MAX_DIRTY_RECTS, \
+    MAX_INTERPOLATION_DISTANCE
+from layer_cache import TileCache, SurfaceCache
 
 class RenderMode(Enum):
     NORMAL = 1
@@ -8,6 +16,288 @@ class RenderLayer(Enum):
     ROOM = auto()
     DOOR = auto()
     MINI_MAP = auto()
+    PLAYER_ICON = auto()
     PLAYER = auto()
     GUN = auto()
-    BULLET = auto()
\ No newline at end of file
+    ENEMY = auto()
+    BULLET = auto()
+
+#  layers that don't change after they are created, they can be drawn from cached surfaces
+#  maps every static layer to the render mode of its objects
+STATIC_RENDER_LAYERS = {RenderLayer.ROOM: RenderMode.NORMAL, RenderLayer.DOOR: RenderMode.NORMAL,
+                        RenderLayer.MINI_MAP: RenderMode.UI}
+
+
+class Renderer:
+    """
+    Draws every frame.
+    The objects in view are collected into draw commands grouped by layer and color, the camera offset is applied
+    to all of their rects together (numpy), and every group is drawn with one Surface.blits call
+    Attributes:
+        screen - the surface to draw on
+        camera - the camera the world is shown from
+        render_indexes - the spatial index of the NORMAL objects of every layer (ObjectMetaClass.render_indexes)
+        ui_objects - the UI objects of every layer (ObjectMetaClass.ui_objects)
+        layer_caches - the caches of the static layers (ObjectMetaClass.layer_caches), filled by the renderer
+        dirty_rects_mode - update only the parts of the screen that changed instead of the whole screen
+        array_systems - systems that keep their objects in arrays instead of objects (like the ProjectileSystem),
+                        every system is drawn as one group in its render layer
+        profiler - the FrameProfiler that gets how long every render layer took to draw, None to not measure it
+    """
+
+    def __init__(self, screen: pg.Surface, camera, render_indexes: Dict, ui_objects: Dict, layer_caches: Dict,
+                 dirty_rects_mode: bool = DISPLAY_UPDATE_MODE == "dirty_rects", array_systems: Sequence = (),
+                 profiler=None):
+        self.__screen = screen
+        self.__camera = camera
+        self.__render_indexes = render_indexes
+        self.__ui_objects = ui_objects
+        self.__layer_caches = layer_caches
+        self.__dirty_rects_mode = dirty_rects_mode
+        self.__array_systems = array_systems
+        self.__profiler = profiler
+
+        if LAYER_CACHE:
+            for render_layer, render_mode in STATIC_RENDER_LAYERS.items():
+                if render_mode == RenderMode.NORMAL:
+                    layer_caches[render_layer] = TileCache(render_indexes[render_layer])
+                else:
+                    layer_caches[render_layer] = SurfaceCache(ui_objects[render_layer])
+
+        #  the draw commands of the current frame, (layer cache, None, 0, 0, None, render layer) or
+        #  (None, color, first row, last row, the biggest (width, height) of the rows, render layer)
+        self.__draw_commands: List[Tuple] = []
+        self.__drawn_objects: List = []  # the objects of the draw commands, in the same order as the rows
+        self.__screen_rects: List[List[int]] = []  # the screen rect of every drawn object and then of the arrays
+        self.__solid_surfaces: Dict[Tuple, pg.Surface] = {}  # a surface filled with each color, blitted as rects
+
+        self.__last_screen_rects: Dict = {}  # the screen rect of every (not cached) object that was drawn
+        self.__last_array_rects: List[List[int]] = []  # the screen rects of the array systems that were drawn
+        self.__last_screen_offset = None  # the camera position in the last frame
+        self.__last_overlay_rects: List[pg.Rect] = []
+
+        self.__drawn_objects_count = 0  # how many objects were drawn in the last frame
+        self.__culled_objects_count = 0  # how many objects were skipped in the last frame because they are out of view
+        self.__draw_calls_count = 0
+        self.__dirty_rects_count = 0
+
+    @property
+    def dirty_rects_mode(self):
+        return self.__dirty_rects_mode
+
+    @property
+    def drawn_objects_count(self):
+        return self.__drawn_objects_count
+
+    @property
+    def culled_objects_count(self):
+        return self.__culled_objects_count
+
+    @property
+    def draw_calls_count(self):
+        return self.__draw_calls_count
+
+    @property
+    def dirty_rects_count(self):
+        return self.__dirty_rects_count
+
+    def render(self, draw_overlay: Callable[[], List[pg.Rect]], interpolation: float = 1,
+               previous_positions: Dict = None) -> None:
+        """
+        Draws the frame and updates the display
+        Attributes:
+            draw_overlay - draws on top of the frame (like the debug info) and returns the parts of the screen it drew on
+            interpolation - where to draw the moving objects between their previous position (0) and their position (1)
+            previous_positions - the (x, y) of the moving objects in the previous tick of the simulation
+        """
+        screen_offset = self.__camera.screen_offset()
+        changed_rects = self.__pop_layer_caches_changed_rects(screen_offset)
+        self.__collect_draw_commands(self.__camera.get_view_rect(CULLING_MARGIN), screen_offset, interpolation,
+                                     previous_positions)
+        self.__draw_calls_count = 0
+
+        if not self.__dirty_rects_mode:
+            self.__render_full_frame(screen_offset, draw_overlay)
+            return
+
+        screen_rects = dict(zip(self.__drawn_objects, self.__screen_rects))
+        array_rects = self.__screen_rects[len(self.__drawn_objects):]
+        dirty_rects = None
+        if screen_offset == self.__last_screen_offset:
+            #  the camera didn't move (or jump through a door), so only the objects that changed are drawn again
+            dirty_rects = changed_rects + self.__last_overlay_rects
+            #  the objects of the array systems almost always move, so all of them are drawn again
+            dirty_rects.extend(self.__last_array_rects)
+            dirty_rects.extend(array_rects)
+            for obj, screen_rect in screen_rects.items():
+                last_screen_rect = self.__last_screen_rects.pop(obj, None)
+                if last_screen_rect != screen_rect:
+                    dirty_rects.append(screen_rect)
+                    if last_screen_rect is not None:
+                        dirty_rects.append(last_screen_rect)
+            dirty_rects.extend(self.__last_screen_rects.values())  # objects that are not drawn anymore
+            if len(dirty_rects) > MAX_DIRTY_RECTS:
+                dirty_rects = None
+        self.__last_screen_rects = screen_rects
+        self.__last_array_rects = array_rects
+        self.__last_screen_offset = screen_offset
+
+        if dirty_rects is None:
+            self.__dirty_rects_count = 1
+            self.__render_full_frame(screen_offset, draw_overlay)
+            return
+
+        for dirty_rect in dirty_rects:
+            #  every dirty rect is cleared and all the layers are drawn in it again
+            self.__screen.set_clip(dirty_rect)
+            self.__screen.fill(BLACK)
+            self.__execute_draw_commands(pg.Rect(dirty_rect).move(screen_offset), screen_offset)
+        self.__screen.set_clip(None)
+        self.__dirty_rects_count = len(dirty_rects)
+        self.__last_overlay_rects = draw_overlay()
+        pg.display.update(dirty_rects + self.__last_overlay_rects)
+
+    def __render_full_frame(self, screen_offset, draw_overlay: Callable[[], List[pg.Rect]]) -> None:
+        self.__screen.fill(BLACK)
+        self.__execute_draw_commands(self.__camera.get_view_rect(), screen_offset)
+        self.__last_overlay_rects = draw_overlay()
+        pg.display.flip()
+
+    def __pop_layer_caches_changed_rects(self, screen_offset) -> List[pg.Rect]:
+        #  returns the parts of the screen where the cached layers changed (in screen position)
+        changed_rects = []
+        for render_layer, layer_cache in self.__layer_caches.items():
+            if STATIC_RENDER_LAYERS[render_layer] == RenderMode.NORMAL:
+                changed_rects.extend(rect.move(-screen_offset[0], -screen_offset[1])
+                                     for rect in layer_cache.pop_changed_rects())
+            else:
+                changed_rects.extend(layer_cache.pop_changed_rects())
+        return changed_rects
+
+    def __collect_draw_commands(self, view_rect: pg.Rect, screen_offset, interpolation: float,
+                                previous_positions: Dict) -> None:
+        """
+        Collects the objects in the view rect (in world position) into draw commands and calculates their screen rects
+        """
+        draw_commands = []
+        drawn_objects = []
+        world_rows = []  # (first row, last row) of the rows that are in world position and need the camera offset
+        array_commands = []  # the draw command and the screen rects of every array system that is drawn
+        self.__culled_objects_count = 0
+        for render_layer in RenderLayer:
+            layer_cache = self.__layer_caches.get(render_layer)
+            if layer_cache is not None:
+                draw_commands.append((layer_cache, None, 0, 0, None, render_layer))
+                continue
+
+            #  only the objects in the view are drawn, the spatial index finds them without checking every object
+            render_index = self.__render_indexes[render_layer]
+            objects_in_view = [obj for obj in render_index.query(*view_rect) if view_rect.colliderect(obj.rect)]
+            self.__culled_objects_count += len(render_index) - len(objects_in_view)
+
+            first_world_row = len(drawn_objects)
+            for objects in (objects_in_view, self.__ui_objects[render_layer]):
+                color_groups: Dict[Tuple, List] = {}
+                for obj in objects:
+                    color_groups.setdefault(obj.color, []).append(obj)
+                for color, objects_with_color in color_groups.items():
+                    draw_commands.append([None, color, len(drawn_objects), len(drawn_objects) + len(objects_with_color),
+                                          None, render_layer])
+                    drawn_objects.extend(objects_with_color)
+                if objects is objects_in_view:
+                    world_rows.append((first_world_row, len(drawn_objects)))
+
+            for array_system in self.__array_systems:
+                if array_system.render_layer != render_layer:
+                    continue
+                #  the rows of the array systems come after the rows of all the objects, their rects are already arrays
+                system_rects = array_system.get_rects_in_view(view_rect, interpolation)
+                system_rects[:, :2] -= screen_offset
+                self.__culled_objects_count += len(array_system) - len(system_rects)
+                if len(system_rects):
+                    array_command = [None, array_system.color, 0, len(system_rects),
+                                     system_rects[:, 2:].max(axis=0).tolist(), render_layer]
+                    draw_commands.append(array_command)
+                    array_commands.append((array_command, system_rects))
+
+        rects = np.fromiter(chain.from_iterable(obj.rect for obj in drawn_objects), dtype=np.int64,
+                            count=4 * len(drawn_objects)).reshape(-1, 4)
+        if previous_positions and interpolation < 1:
+            Renderer.__interpolate(rects, drawn_objects, interpolation, previous_positions)
+        world_position = np.zeros(len(drawn_objects), dtype=np.bool_)
+        for first_row, last_row in world_rows:
+            world_position[first_row:last_row] = True
+        rects[world_position, :2] -= screen_offset  # the camera offset of all the objects at once
+
+        #  the groups of objects, the commands of the array systems already have their size
+        groups = [draw_command for draw_command in draw_commands
+                  if draw_command[0] is None and draw_command[4] is None]
+        if groups:
+            #  the size of the solid surface every group needs
+            max_sizes = np.maximum.reduceat(rects[:, 2:], [group[2] for group in groups]).tolist()
+            for group, max_size in zip(groups, max_sizes):
+                group[4] = max_size
+
+        screen_rects = rects.tolist()
+        for array_command, system_rects in array_commands:
+            array_command[2] += len(screen_rects)
+            array_command[3] += len(screen_rects)
+            screen_rects.extend(system_rects.tolist())
+
+        self.__draw_commands = draw_commands
+        self.__drawn_objects = drawn_objects
+        self.__screen_rects = screen_rects
+        self.__drawn_objects_count = len(screen_rects)
+
+    @staticmethod
+    def __interpolate(rects: np.ndarray, drawn_objects: List, interpolation: float, previous_positions: Dict) -> None:
+        #  moves the rects of the objects that have a previous position back towards it (all of them together)
+        rows = []
+        previous = []
+        for row, obj in enumerate(drawn_objects):
+            previous_position = previous_positions.get(obj)
+            if previous_position is not None:
+                rows.append(row)
+                previous.extend(previous_position)
+        if not rows:
+            return
+        moved = rects[rows, :2] - np.array(previous, dtype=np.int64).reshape(-1, 2)
+        moved[np.abs(moved).max(axis=1) > MAX_INTERPOLATION_DISTANCE] = 0  # jumped (through a door)
+        rects[rows, :2] -= np.rint(moved * (1 - interpolation)).astype(np.int64)
+
+    def __get_solid_surface(self, color, width, height) -> pg.Surface:
+        #  returns a surface filled with the color that is at least width x height
+        surface = self.__solid_surfaces.get(color)
+        if surface is None or surface.get_width() < width or surface.get_height() < height:
+            if surface is not None:
+                width, height = max(width, surface.get_width()), max(height, surface.get_height())
+            surface = pg.Surface((max(width, 1), max(height, 1)))
+            if pg.display.get_surface() is not None:
+                surface = surface.convert()
+            surface.fill(color)
+            self.__solid_surfaces[color] = surface
+        return surface
+
+    def __execute_draw_commands(self, view_rect: pg.Rect, screen_offset) -> None:
+        """
+        Draws the draw commands of the frame
+        Attributes:
+            view_rect - the part of the world that is drawn (in world position), used by the layer caches
+            screen_offset - the world position of the top left corner of the screen
+        """
+        screen_rects = self.__screen_rects
+        profiler = self.__profiler
+        for layer_cache, color, first_row, last_row, max_size, render_layer in self.__draw_commands:
+            if profiler is not None:
+                draw_start = time.perf_counter()
+            if layer_cache is not None:
+                #  the layer is drawn from its cached surfaces
+                self.__draw_calls_count += layer_cache.render(self.__screen, view_rect, screen_offset)
+            else:
+                rects = screen_rects[first_row:last_row]
+                solid_surface = self.__get_solid_surface(color, *max_size)
+                self.__screen.blits([(solid_surface, rect, (0, 0, rect[2], rect[3])) for rect in rects],
+                                    doreturn=False)
+                self.__draw_calls_count += 1
+            if profiler is not None:
+                profiler.add_sample(f"layer {render_layer.name}", (time.perf_counter() - draw_start) * 1000)
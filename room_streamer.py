@@ -0,0 +1,64 @@
+from typing import Dict, Tuple, Set
+from game_objects import Object
+from maze import Maze, Room
+from camera import Camera
+from renderer import RenderMode, RenderLayer
+from game_settings import WHITE, ROOM_VIEW_DISTANCE
+from utilitiez import get_room_index, get_room_rect
+
+
+class RoomStreamer:
+    """
+    Keeps only the rooms near the camera in the game.
+    The maze stays as grid data, and the room object and the doors of a room are created when the room gets
+    within view_distance rooms of the camera's room and destroyed when the camera walks away from it
+    Attributes:
+        maze - the maze to take the rooms from
+        view_distance - how many rooms in every direction from the camera's room are kept in the game
+    """
+
+    def __init__(self, maze: Maze, view_distance: int = ROOM_VIEW_DISTANCE):
+        self.__maze = maze
+        self.__view_distance = view_distance
+        self.__loaded_rooms: Dict[Tuple[int, int], Tuple[Object, Room]] = {}  # maps the index to the room objects
+        self.__center_room_index = None  # the index of the camera's room in the last update
+
+    @property
+    def loaded_rooms_count(self):
+        return len(self.__loaded_rooms)
+
+    def is_loaded(self, room_index: Tuple[int, int]) -> bool:
+        return room_index in self.__loaded_rooms
+
+    def update(self, camera: Camera) -> None:
+        center_room_index = get_room_index(camera.x, camera.y)
+        if center_room_index == self.__center_room_index:
+            return  # the camera is still in the same room
+        self.__center_room_index = center_room_index
+
+        room_doors = self.__maze.room_doors
+        rooms_in_view: Set[Tuple[int, int]] = set()
+        for x in range(center_room_index[0] - self.__view_distance, center_room_index[0] + self.__view_distance + 1):
+            for y in range(center_room_index[1] - self.__view_distance, center_room_index[1] + self.__view_distance + 1):
+                if (x, y) in room_doors:
+                    rooms_in_view.add((x, y))
+
+        for room_index in [room_index for room_index in self.__loaded_rooms if room_index not in rooms_in_view]:
+            self.__unload_room(room_index)
+        for room_index in rooms_in_view:
+            if room_index not in self.__loaded_rooms:
+                self.__load_room(room_index)
+
+    def __load_room(self, room_index: Tuple[int, int]) -> None:
+        room_object = Object(*get_room_rect(room_index), WHITE, RenderLayer.ROOM, RenderMode.NORMAL)
+        self.__loaded_rooms[room_index] = (room_object, self.__maze.create_room(room_index))
+
+    def __unload_room(self, room_index: Tuple[int, int]) -> None:
+        room_object, room = self.__loaded_rooms.pop(room_index)
+        room_object.destroy()
+        room.destroy()
+
+    def unload_all(self) -> None:
+        for room_index in list(self.__loaded_rooms):
+            self.__unload_room(room_index)
+        self.__center_room_index = None
@@ -0,0 +1,76 @@
+from typing import List
+import pygame as pg
+from game_objects import ObjectMetaClass
+from renderer import RenderLayer, RenderMode
+from game_settings import SIMULATION_DISTANCE, FAR_ROOMS_UPDATE_INTERVAL, SPACE_BETWEEN_ROOM, ROOM_SIZE
+from utilitiez import get_room_index, get_room_rect
+
+
+class SimulationScope:
+    """
+    Chooses which objects are updated in a tick, so the cost of a tick doesn't grow with the maze.
+    The objects in the rooms within distance rooms of the player's room (the active rooms) are updated every tick,
+    and the objects of the other rooms are frozen, or updated once every far_update_interval ticks.
+    UI objects are always updated, and objects without an update are never updated
+    Attributes:
+        distance - how many rooms in every direction from the player's room are active
+        far_update_interval - how many ticks pass between the updates of the far rooms, 0 never updates them
+    """
+
+    def __init__(self, distance: int = SIMULATION_DISTANCE, far_update_interval: int = FAR_ROOMS_UPDATE_INTERVAL):
+        self.__distance = distance
+        self.__far_update_interval = far_update_interval
+        self.__center_room_index = None  # the index of the player's room
+        #  the part of the world the active rooms are in, an object is in a room if its center is closest to the room
+        self.__active_rect = pg.Rect(0, 0, 0, 0)
+        self.__active_cells_count = 0  # how many cells of the render indexes the active rect covers
+        self.__ticks = 0
+        self.__far_tick = False  # if the far rooms are updated in this tick
+
+    @property
+    def center_room_index(self):
+        return self.__center_room_index
+
+    @property
+    def active_rect(self):
+        return self.__active_rect
+
+    def update(self, center_x, center_y) -> None:
+        #  should be called once a tick, before the objects are updated, with the position of the player
+        self.__ticks += 1
+        self.__far_tick = self.__far_update_interval > 0 and self.__ticks % self.__far_update_interval == 0
+        center_room_index = get_room_index(center_x, center_y)
+        if center_room_index == self.__center_room_index:
+            return
+        self.__center_room_index = center_room_index
+        #  the space between the rooms is split between them
+        margin = (SPACE_BETWEEN_ROOM - ROOM_SIZE) // 2
+        first_room_rect = pg.Rect(get_room_rect((center_room_index[0] - self.__distance,
+                                                 center_room_index[1] - self.__distance)))
+        last_room_rect = pg.Rect(get_room_rect((center_room_index[0] + self.__distance,
+                                                center_room_index[1] + self.__distance)))
+        self.__active_rect = first_room_rect.union(last_room_rect).inflate(2 * margin, 2 * margin)
+        first_column, first_row, last_column, last_row = \
+            ObjectMetaClass.render_indexes[RenderLayer.ROOM].get_cell_range(*self.__active_rect)
+        self.__active_cells_count = (last_column - first_column + 1) * (last_row - first_row + 1)
+
+    def get_objects_to_update(self, render_layer: RenderLayer) -> List:
+        #  returns the objects of the layer that are updated in this tick
+        updatable_objects = ObjectMetaClass.updatable_objects.get(render_layer)
+        if not updatable_objects:
+            return []
+        if self.__far_tick or self.__center_room_index is None:
+            return list(updatable_objects)
+
+        is_active = self.__active_rect.collidepoint
+        if len(updatable_objects) <= self.__active_cells_count:
+            #  a few objects are checked faster one by one than by looking in all the active cells
+            return [obj for obj in updatable_objects
+                    if is_active(obj.rect.center) or obj.render_mode == RenderMode.UI]
+
+        #  only the objects near the active rooms are checked, the spatial index finds them without checking every object
+        objects = [obj for obj in ObjectMetaClass.render_indexes[render_layer].query(*self.__active_rect)
+                   if obj in updatable_objects and is_active(obj.rect.center)]
+        objects.extend(obj for obj in ObjectMetaClass.ui_objects[render_layer] if obj in updatable_objects)
+        objects.sort(key=lambda obj: obj.handle)  # the order of the spatial index changes between runs
+        return objects
@@ -0,0 +1,100 @@
+import math
+from collections import defaultdict
+from typing import DefaultDict, Dict, Hashable, Iterator, Set, Tuple
+
+CellRange = Tuple[int, int, int, int]  # (first column, first row, last column, last row) - all inclusive
+
+
+class SpatialHash:
+    """
+    A uniform grid that buckets items by the cells their bounding box covers.
+    An item that is bigger than a cell is stored in every cell it touches, so two boxes that overlap
+    (even only on the border) always share at least one cell.
+    Attributes:
+        cell_size - the width and height of a cell in pixels
+    """
+
+    def __init__(self, cell_size: int):
+        if cell_size <= 0:
+            raise ValueError(f"cell size must be larger than 0 got {cell_size}")
+        self.__cell_size = cell_size
+        self.__cells: DefaultDict[Tuple[int, int], Set[Hashable]] = defaultdict(set)
+        self.__item_cells: Dict[Hashable, CellRange] = {}  # maps every item to the cells it is stored in
+
+    @property
+    def cell_size(self):
+        return self.__cell_size
+
+    def __len__(self):
+        return len(self.__item_cells)
+
+    def __contains__(self, item):
+        return item in self.__item_cells
+
+    def get_cell(self, x, y) -> Tuple[int, int]:
+        #  returns the cell that contains the point (x, y)
+        return math.floor(x / self.__cell_size), math.floor(y / self.__cell_size)
+
+    def get_cell_range(self, x, y, width, height) -> CellRange:
+        first_column, first_row = self.get_cell(x, y)
+        last_column, last_row = self.get_cell(x + width, y + height)
+        return first_column, first_row, last_column, last_row
+
+    @staticmethod
+    def __cells_in_range(cell_range: CellRange) -> Iterator[Tuple[int, int]]:
+        first_column, first_row, last_column, last_row = cell_range
+        for column in range(first_column, last_column + 1):
+            for row in range(first_row, last_row + 1):
+                yield column, row
+
+    def insert(self, item: Hashable, x, y, width, height) -> None:
+        if item in self.__item_cells:
+            self.move(item, x, y, width, height)
+            return
+        cell_range = self.get_cell_range(x, y, width, height)
+        self.__item_cells[item] = cell_range
+        for cell in SpatialHash.__cells_in_range(cell_range):
+            self.__cells[cell].add(item)
+
+    def move(self, item: Hashable, x, y, width, height) -> None:
+        """
+        Update the cells of an item that changed its position, items that stay in the same cells cost nothing
+        """
+        new_cell_range = self.get_cell_range(x, y, width, height)
+        if self.__item_cells[item] == new_cell_range:
+            return
+        self.remove(item)
+        self.__item_cells[item] = new_cell_range
+        for cell in SpatialHash.__cells_in_range(new_cell_range):
+            self.__cells[cell].add(item)
+
+    def remove(self, item: Hashable) -> None:
+        for cell in SpatialHash.__cells_in_range(self.__item_cells.pop(item)):
+            items_in_cell = self.__cells[cell]
+            items_in_cell.discard(item)
+            if not items_in_cell:
+                del self.__cells[cell]  # don't keep empty cells of places that nothing is in anymore
+
+    def query(self, x, y, width, height) -> Set[Hashable]:
+        """
+        Returns all the items that share a cell with the given box, the caller still has to check if they really overlap
+        """
+        found = set()
+        cells = self.__cells
+        for cell in SpatialHash.__cells_in_range(self.get_cell_range(x, y, width, height)):
+            items_in_cell = cells.get(cell)
+            if items_in_cell:
+                found.update(items_in_cell)
+        return found
+
+    def query_item(self, item: Hashable) -> Set[Hashable]:
+        #  same as query but uses the cells the item is already stored in
+        found = set()
+        cells = self.__cells
+        for cell in SpatialHash.__cells_in_range(self.__item_cells[item]):
+            found.update(cells[cell])
+        return found
+
+    def clear(self) -> None:
+        self.__cells.clear()
+        self.__item_cells.clear()
@@ -0,0 +1,60 @@
+import random
+import unittest
+from collision import Collider, CollisionMasks, CollisionMode, CollisionWorld
+
+MASKS = (CollisionMasks.ENEMY, CollisionMasks.PLAYER, CollisionMasks.BULLET)
+
+
+class ColliderOwner:
+    #  the collision world only needs the collider of a sprite
+    def __init__(self, name, x, y, width, height, mask, masks_to_collide_with):
+        self.name = name
+        self.collider = Collider(x, y, width, height, mask, masks_to_collide_with, owner=self)
+
+
+class TestCollisionModes(unittest.TestCase):
+    def setUp(self):
+        self.world = CollisionWorld()
+        self.addCleanup(self.world.set_mode, self.world.mode)
+
+    def __detect_collisions(self, owners):
+        #  returns the collision of every owner in the frame
+        self.world.detect_collisions(owners)
+        collisions = {owner.name: (owner.collider.collision.name, tuple(owner.collider.collistion_positions))
+                      for owner in owners if owner.collider.collision is not None}
+        self.world.reset_collisions()
+        return collisions
+
+    def __run_frames(self, mode):
+        """
+        Creates the same colliders in every mode and returns their collisions in a few frames, some of the colliders
+        move between the frames
+        """
+        self.world.set_mode(mode)
+        rng = random.Random(0)
+        owners = []
+        for name in range(150):
+            mask = rng.choice(MASKS)
+            owners.append(ColliderOwner(name, rng.randint(0, 600), rng.randint(0, 600), rng.randint(5, 60),
+                                        rng.randint(5, 60), mask, tuple(rng.sample(MASKS, rng.randint(1, 3)))))
+        frames = []
+        try:
+            for _ in range(3):
+                frames.append(self.__detect_collisions(owners))
+                for owner in rng.sample(owners, 40):
+                    owner.collider.update(owner.collider.x + rng.randint(-50, 50),
+                                          owner.collider.y + rng.randint(-50, 50))
+        finally:
+            for owner in owners:
+                owner.collider.destroy()
+        return frames
+
+    def test_modes_find_the_same_collisions(self):
+        brute_force_frames = self.__run_frames(CollisionMode.BRUTE_FORCE)
+        self.assertTrue(all(brute_force_frames))
+        self.assertEqual(self.__run_frames(CollisionMode.SPATIAL_HASH), brute_force_frames)
+        self.assertEqual(self.__run_frames(CollisionMode.VECTORIZED), brute_force_frames)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+import unittest
+from game_time import Timer, TimerScheduler
+
+
+class TestTimerScheduler(unittest.TestCase):
+    def test_cancel_inside_callback(self):
+        #  canceling timers in a callback compacts the heap while the scheduler updates
+        scheduler = TimerScheduler()
+        activated = []
+        later_timers = [Timer(5, activated.append, "later", scheduler=scheduler) for _ in range(3)]
+
+        def cancel_later_timers():
+            activated.append("a")
+            for timer in later_timers:
+                timer.cancel_timer()
+
+        Timer(1, cancel_later_timers, scheduler=scheduler)
+        Timer(1, activated.append, "b", scheduler=scheduler)
+        scheduler.update(1.0)
+        self.assertEqual(len(scheduler), 0)
+        scheduler.update(2.0)
+        scheduler.update(6.0)
+        self.assertEqual(activated, ["a", "b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import time
+import unittest
+from level_loader import LevelLoadCancelled, LevelLoader, LoadProgress, build_level
+from maze import Maze
+
+LOAD_TIMEOUT = 30  # seconds
+
+
+class TestLevelLoader(unittest.TestCase):
+    def setUp(self):
+        self.level_loader = LevelLoader()
+        self.addCleanup(self.level_loader.cancel)
+
+    def __wait_for_level(self):
+        end_time = time.monotonic() + LOAD_TIMEOUT
+        while time.monotonic() < end_time:
+            level = self.level_loader.get_loaded_level()
+            if level is not None:
+                return level
+            time.sleep(0.01)
+        self.fail("the level wasn't loaded in time")
+
+    def test_cancelled_progress_stops_the_load(self):
+        progress = LoadProgress()
+        progress.cancel()
+        with self.assertRaises(LevelLoadCancelled):
+            build_level(Maze.PROGRESS_INTERVAL * 2, 0, None, progress)
+        self.assertEqual(progress.fraction, 0)
+
+    def test_cancel(self):
+        self.level_loader.load(Maze.PROGRESS_INTERVAL * 50, 0)
+        self.level_loader.cancel()
+        self.assertFalse(self.level_loader.loading)
+        self.assertIsNone(self.level_loader.get_loaded_level())
+
+    def test_new_load_replaces_the_last_one(self):
+        #  the worker stops the cancelled load, so the new level arrives and the cancelled one is never taken
+        self.level_loader.load(Maze.PROGRESS_INTERVAL * 50, 0)
+        self.level_loader.load(100, 1)
+        level = self.__wait_for_level()
+        self.assertEqual(len(level.maze), 100)
+        self.assertEqual(level.maze.seed, 1)
+        self.assertFalse(self.level_loader.loading)
+        self.assertIsNone(self.level_loader.get_loaded_level())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from maze import Maze
+from maze_file import MappedRoomDoors, read_maze_file
+
+
+class TestMazeFile(unittest.TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.path = os.path.join(temp_dir.name, "maze.bin")
+
+    def test_save_and_load(self):
+        maze = Maze(500, 7, build_rooms=False)
+        maze.save(self.path)
+        loaded_maze = Maze.load(self.path)
+        self.assertEqual(loaded_maze.seed, 7)
+        self.assertEqual(len(loaded_maze), len(maze))
+        self.assertEqual(dict(loaded_maze.room_doors.items()), dict(maze.room_doors))
+
+    def test_rooms_are_memory_mapped(self):
+        maze = Maze(200, 3, build_rooms=False)
+        maze.save(self.path)
+        seed, room_doors = read_maze_file(self.path)
+        self.assertIsInstance(room_doors, MappedRoomDoors)
+        for array in room_doors.arrays:
+            self.assertIsInstance(array, np.memmap)
+        #  every room is found in the file without reading it into a dict
+        for room_index, door_mask in maze.room_doors.items():
+            self.assertIn(room_index, room_doors)
+            self.assertEqual(room_doors[room_index], door_mask)
+        missing_room = (max(x for x, _ in maze.room_doors) + 1, 0)
+        self.assertNotIn(missing_room, room_doors)
+        with self.assertRaises(KeyError):
+            room_doors[missing_room]
+
+    def test_no_seed(self):
+        Maze(10, build_rooms=False).save(self.path)
+        self.assertIsNone(Maze.load(self.path).seed)
+
+    def test_not_a_maze_file(self):
+        with open(self.path, "wb") as maze_file:
+            maze_file.write(b"not a maze")
+        with self.assertRaises(ValueError):
+            read_maze_file(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import random
+import unittest
+from collections import deque
+import numpy as np
+from enums import DoorPlacement
+from maze import Maze, DOOR_BITS, get_opposite_door_placement
+from maze_graph import MazeGraph, NEIGHBOR_OFFSETS, NO_ROOM
+
+
+def get_distances(room_doors, target):
+    #  a simple BFS over the door masks, a door leads to a room only if the room behind it has the opposite door
+    distances = {target: 0}
+    rooms_to_visit = deque([target])
+    while rooms_to_visit:
+        room_index = rooms_to_visit.popleft()
+        for placement, door_bit in DOOR_BITS.items():
+            x_offset, y_offset = NEIGHBOR_OFFSETS[placement]
+            neighbor = (room_index[0] + x_offset, room_index[1] + y_offset)
+            if room_doors[room_index] & door_bit and neighbor not in distances and \
+                    room_doors.get(neighbor, 0) & DOOR_BITS[get_opposite_door_placement(placement)]:
+                distances[neighbor] = distances[room_index] + 1
+                rooms_to_visit.append(neighbor)
+    return distances
+
+
+class TestMazeGraph(unittest.TestCase):
+    def setUp(self):
+        self.maze = Maze(400, 11, build_rooms=False)
+        self.maze_graph = MazeGraph(self.maze)
+
+    def test_bfs(self):
+        self.assertTrue(self.maze_graph.is_tree)
+        for target in list(self.maze.room_doors)[::50]:
+            distances = get_distances(self.maze.room_doors, target)
+            field = self.maze_graph.get_distance_field(target)
+            for room_index in self.maze.room_doors:
+                room_id = self.maze_graph.get_room_id(room_index)
+                self.assertEqual(field.distances[room_id], distances[room_index])
+                if room_index != target:
+                    #  the next room is one door closer to the target
+                    next_room = self.maze_graph.get_next_room(room_index, target)
+                    self.assertEqual(distances[next_room], distances[room_index] - 1)
+            self.assertIsNone(self.maze_graph.get_next_room(target, target))
+
+    def test_missing_door_on_the_other_side(self):
+        #  a door without a door on the other side doesn't connect the rooms
+        room_doors = {(0, 0): DOOR_BITS[DoorPlacement.TOP], (0, -1): 0}
+        maze_graph = MazeGraph(Maze(len(room_doors), build_rooms=False, room_doors=room_doors))
+        self.assertFalse(maze_graph.is_tree)
+        self.assertEqual(maze_graph.get_distance((0, -1), (0, 0)), NO_ROOM)
+
+    def test_track_target_updates_the_tree(self):
+        #  walking the target between neighbor rooms updates the field instead of searching again
+        fresh_maze_graph = MazeGraph(self.maze, cache_size=0)
+        rng = random.Random(0)
+        room_id = 0
+        for _ in range(60):
+            self.maze_graph.track_target(self.maze_graph.get_room_index(room_id))
+            tracked_field = self.maze_graph.tracked_field
+            field = fresh_maze_graph.get_distance_field(self.maze_graph.get_room_index(room_id))
+            self.assertEqual(tracked_field.target, room_id)
+            np.testing.assert_array_equal(tracked_field.distances, field.distances)
+            np.testing.assert_array_equal(tracked_field.next_rooms, field.next_rooms)
+            neighbors = self.maze_graph.neighbors[room_id]
+            room_id = int(rng.choice(neighbors[neighbors != NO_ROOM]))
+        self.assertEqual(self.maze_graph.searches_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from object_list import ObjectList
+
+
+class TestObjectList(unittest.TestCase):
+    def setUp(self):
+        self.object_list = ObjectList()
+        for item in "abcd":
+            self.object_list.append(item)
+
+    def test_append_ignores_duplicates(self):
+        self.object_list.append("a")
+        self.assertEqual(list(self.object_list), ["a", "b", "c", "d"])
+
+    def test_swap_remove(self):
+        #  the last item takes the place of the removed item
+        self.object_list.remove("b")
+        self.assertEqual(list(self.object_list), ["a", "d", "c"])
+        self.assertNotIn("b", self.object_list)
+        #  the index of the moved item was updated, so it is removed from its new place
+        self.object_list.remove("d")
+        self.assertEqual(list(self.object_list), ["a", "c"])
+        self.object_list.remove("c")
+        self.object_list.remove("a")
+        self.assertEqual(len(self.object_list), 0)
+
+    def test_remove_last_item(self):
+        self.object_list.remove("d")
+        self.assertEqual(list(self.object_list), ["a", "b", "c"])
+        self.object_list.append("d")
+        self.assertEqual(self.object_list[3], "d")
+
+    def test_remove_missing_item(self):
+        with self.assertRaises(KeyError):
+            self.object_list.remove("e")
+
+    def test_clear(self):
+        self.object_list.clear()
+        self.assertEqual(len(self.object_list), 0)
+        self.object_list.append("a")
+        self.assertEqual(list(self.object_list), ["a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from spatial_hash import SpatialHash
+
+
+class TestSpatialHash(unittest.TestCase):
+    def setUp(self):
+        self.spatial_hash = SpatialHash(100)
+
+    def test_query_finds_items_that_share_a_cell(self):
+        self.spatial_hash.insert("a", 10, 10, 20, 20)
+        self.spatial_hash.insert("b", 250, 250, 20, 20)
+        self.assertEqual(self.spatial_hash.query(0, 0, 50, 50), {"a"})
+        self.assertEqual(self.spatial_hash.query(150, 150, 200, 200), {"b"})
+        self.assertEqual(self.spatial_hash.query(500, 500, 10, 10), set())
+
+    def test_touching_boxes_share_a_cell(self):
+        #  boxes that overlap only on their border are still found, like on_object finds them
+        self.spatial_hash.insert("a", 0, 0, 100, 100)
+        self.spatial_hash.insert("b", 100, 100, 10, 10)
+        self.assertIn("a", self.spatial_hash.query_item("b"))
+        self.assertIn("b", self.spatial_hash.query_item("a"))
+
+    def test_negative_positions(self):
+        self.spatial_hash.insert("a", -30, -30, 10, 10)
+        self.assertEqual(self.spatial_hash.get_cell(-30, -30), (-1, -1))
+        self.assertEqual(self.spatial_hash.query(-50, -50, 10, 10), {"a"})
+        self.assertEqual(self.spatial_hash.query(10, 10, 10, 10), set())
+
+    def test_move(self):
+        self.spatial_hash.insert("a", 10, 10, 20, 20)
+        self.spatial_hash.move("a", 510, 510, 20, 20)
+        self.assertEqual(self.spatial_hash.query(0, 0, 50, 50), set())
+        self.assertEqual(self.spatial_hash.query(500, 500, 50, 50), {"a"})
+        #  inserting an item again moves it
+        self.spatial_hash.insert("a", 10, 10, 20, 20)
+        self.assertEqual(len(self.spatial_hash), 1)
+        self.assertEqual(self.spatial_hash.query(0, 0, 50, 50), {"a"})
+        self.assertEqual(self.spatial_hash.query(500, 500, 50, 50), set())
+
+    def test_remove(self):
+        self.spatial_hash.insert("a", 10, 10, 150, 150)
+        self.spatial_hash.insert("b", 20, 20, 10, 10)
+        self.spatial_hash.remove("a")
+        self.assertNotIn("a", self.spatial_hash)
+        self.assertEqual(len(self.spatial_hash), 1)
+        self.assertEqual(self.spatial_hash.query(0, 0, 300, 300), {"b"})
+        with self.assertRaises(KeyError):
+            self.spatial_hash.remove("a")
+
+    def test_invalid_cell_size(self):
+        with self.assertRaises(ValueError):
+            SpatialHash(0)
+
+
+if __name__ == "__main__":
+    unittest.main()
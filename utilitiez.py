@@ -1,4 +1,6 @@
 import math
+from typing import Tuple
+from game_settings import ROOM_SIZE, SPACE_BETWEEN_ROOM, START_ROOM_POSITION
 
 def on_object(object_x, object_y, object_width, object_height, object_to_check_x, object_to_check_y, object_to_check_width, object_to_check_height) -> bool:
     """
@@ -8,3 +10,15 @@ def on_object(object_x, object_y, object_width, object_height, object_to_check_x
             and ((object_to_check_x <= object_x <= object_to_check_x + object_to_check_width) or (object_x <= object_to_check_x <= object_x + object_width)):
         return True
     return False
+
+
+def get_room_index(x, y) -> Tuple[int, int]:
+    #  returns the index in the maze grid of the room that is closest to the world position (in pixels)
+    return (round((x - START_ROOM_POSITION[0] - ROOM_SIZE / 2) / SPACE_BETWEEN_ROOM),
+            round((y - START_ROOM_POSITION[1] - ROOM_SIZE / 2) / SPACE_BETWEEN_ROOM))
+
+
+def get_room_rect(room_index: Tuple[int, int]) -> Tuple[int, int, int, int]:
+    #  returns the (x, y, width, height) of the room in the index of the maze grid (in pixels)
+    return (room_index[0] * SPACE_BETWEEN_ROOM + START_ROOM_POSITION[0],
+            room_index[1] * SPACE_BETWEEN_ROOM + START_ROOM_POSITION[1], ROOM_SIZE, ROOM_SIZE)